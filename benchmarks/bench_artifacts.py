@@ -0,0 +1,57 @@
+"""Cost of attaching to a deployed contract: re-reading the compiler output
+every time (as `load_contract` did) vs the cached `ArtifactRegistry`.
+
+Needs compiled contracts, run with
+``python -m benchmarks.bench_artifacts [path/to/contracts.json]``.
+"""
+import json
+import sys
+import time
+
+from web3 import HTTPProvider, Web3
+
+from src.artifacts import CONTRACTS_JSON, ArtifactRegistry
+from src.contracts.SpritesRegistry import SpritesRegistry
+
+ATTACHES = 1_000
+# any address, attaching doesn't talk to the node
+ADDRESS = "0x" + "11" * 20
+
+
+def attach_uncached(web3, path):
+    with open(path) as filehandle:
+        contracts = json.load(filehandle)
+    contract = contracts["contracts"]["contracts/SpritesRegistry.sol:SpritesRegistry"]
+    factory = web3.eth.contract(abi=contract["abi"], bytecode=contract["bin"])
+    return SpritesRegistry(factory(address=ADDRESS))
+
+
+def main(path=CONTRACTS_JSON):
+    web3 = Web3(HTTPProvider("http://localhost:8545"))
+    artifacts = ArtifactRegistry(path)
+
+    start = time.perf_counter()
+    artifacts.attach(
+        web3, "SpritesRegistry.sol", "SpritesRegistry", SpritesRegistry, ADDRESS
+    )
+    first = time.perf_counter() - start
+    print(f"first attach  {first * 1e3:>10.3f} ms")
+
+    for name, attach in [
+        ("uncached", lambda: attach_uncached(web3, path)),
+        (
+            "registry",
+            lambda: artifacts.attach(
+                web3, "SpritesRegistry.sol", "SpritesRegistry", SpritesRegistry, ADDRESS
+            ),
+        ),
+    ]:
+        start = time.perf_counter()
+        for _ in range(ATTACHES):
+            attach()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {elapsed / ATTACHES * 1e6:>10.1f} us/attach")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,103 @@
+"""Calldata encoding throughput: generated wrappers through web3 vs ``--fast``.
+
+Uses the ABI of the registry functions run most (no compiled contracts or
+node needed). Run with ``python -m benchmarks.bench_calldata``.
+"""
+import time
+
+import astor
+from web3 import HTTPProvider, Web3
+
+from src import calldata, code_gen
+from src.batch import UPDATE_WORDS
+from src.channel import ChannelState, Payment
+from src.tests.conftest import ACCOUNTS
+
+ITERATIONS = 5_000
+ADDRESS = ACCOUNTS["deployer"].address
+
+
+def _function(name, inputs, outputs=()):
+    return {
+        "constant": False,
+        "inputs": [{"name": arg, "type": type_str} for arg, type_str in inputs],
+        "name": name,
+        "outputs": [{"name": "", "type": type_str} for type_str in outputs],
+        "payable": False,
+        "stateMutability": "nonpayable",
+        "type": "function",
+    }
+
+
+ABI = [
+    _function(
+        "update",
+        [
+            ("channelID", "uint256"),
+            ("sig", "uint256[3]"),
+            ("credits", "int256[2]"),
+            ("withdrawals", "uint256[2]"),
+            ("round", "int256"),
+            ("preimageHashes", "bytes32[4]"),
+            ("recipients", "address[4]"),
+            ("amounts", "uint256[4]"),
+            ("expiries", "uint256[4]"),
+        ],
+    ),
+    _function("getState", [("channelID", "uint256")]),
+    _function("updateMany", [("words", "uint256[]")], ["uint256"]),
+]
+
+
+def wrappers(web3):
+    """The registry wrapper as generated without and with ``--fast``."""
+    contract = web3.eth.contract(abi=ABI)(address=ADDRESS)
+    classes = {}
+    for fast in (False, True):
+        class_def = code_gen.make_python_contract("SpritesRegistry", ABI, fast=fast)
+        namespace = {"calldata": calldata}
+        exec(astor.to_source(code_gen.wrap_module([class_def])), namespace)
+        classes[fast] = namespace["SpritesRegistry"](contract)
+    return classes[False], classes[True]
+
+
+def timed(encode, args):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        encode(*args)
+    return ITERATIONS / (time.perf_counter() - start)
+
+
+def main():
+    web3 = Web3(HTTPProvider("http://localhost:8545"))
+    registry, fast_registry = wrappers(web3)
+
+    payment = Payment(
+        preimage_hash=b"\x01" * 32, recipient=ACCOUNTS["bob"].address, amount=5
+    )
+    state = ChannelState(channel_id=3, credits=(-5, 5), round=7, payments=[payment])
+    update_args = state.sign(ACCOUNTS["alice"].privateKey).state_update_arguments()
+    cases = [
+        ("update", update_args),
+        ("getState", (3,)),
+        ("updateMany", (list(range(UPDATE_WORDS * 10)),)),
+    ]
+
+    print(f"{'function':<12} {'web3 calls/s':>14} {'fast calls/s':>14} {'speedup':>8}")
+    for name, args in cases:
+        expected = getattr(registry, name)(*args)._encode_transaction_data()
+        fast = getattr(fast_registry, f"{name}_calldata")
+        assert "0x" + fast(*args).hex() == expected
+
+        slow_rate = timed(
+            lambda *a: getattr(registry, name)(*a)._encode_transaction_data(), args
+        )
+        fast_rate = timed(fast, args)
+        print(
+            f"{name:<12} {slow_rate:>14,.0f} {fast_rate:>14,.0f} "
+            f"{fast_rate / slow_rate:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
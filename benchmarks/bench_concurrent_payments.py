@@ -0,0 +1,57 @@
+"""Payments per second through one channel with N payments in flight.
+
+A conditional payment stays open until its preimage arrives, e. g. from
+further down a route. That delay is simulated with `SETTLE_DELAY`; each of
+the N workers opens a payment, waits and completes it, so one slot carries
+at most one payment per delay. Run with
+``python -m benchmarks.bench_concurrent_payments``.
+"""
+import asyncio
+import time
+
+from src.channel import ChannelState, Player
+from src.tests.conftest import ACCOUNTS
+from src.util import MAX_PAYMENTS
+
+SETTLE_DELAY = 0.01  # seconds
+PAYMENTS_PER_WORKER = 100
+PREIMAGE = b"\x01" * 32
+
+
+def exchange(payer, payee, proposal):
+    payer.receive_countersignature(payee.receive_payment(proposal))
+    return proposal
+
+
+async def worker(payer, payee):
+    for _ in range(PAYMENTS_PER_WORKER):
+        proposal = payer.make_payment(0, 1, PREIMAGE, expiry=100)
+        slot, _ = exchange(payer, payee, proposal).command()
+        await asyncio.sleep(SETTLE_DELAY)
+        exchange(payer, payee, payer.complete_payment(0, slot=slot))
+
+
+def run(num_in_flight):
+    payer, payee = Player(ACCOUNTS["alice"]), Player(ACCOUNTS["bob"])
+    state = ChannelState(channel_id=0, deposits=(10 ** 18, 0))
+    payer.add_channel(state, payee.account.address)
+    payee.add_channel(state.to_other(), payer.account.address)
+
+    loop = asyncio.new_event_loop()
+    workers = [worker(payer, payee) for _ in range(num_in_flight)]
+    start = time.perf_counter()
+    try:
+        loop.run_until_complete(asyncio.gather(*workers, loop=loop))
+    finally:
+        loop.close()
+    return num_in_flight * PAYMENTS_PER_WORKER / (time.perf_counter() - start)
+
+
+def main():
+    print(f"settle delay {SETTLE_DELAY * 1000:.0f} ms")
+    for num_in_flight in range(1, MAX_PAYMENTS + 1):
+        print(f"{num_in_flight} in flight: {run(num_in_flight):>8,.0f} payments/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Gas used by the registry and preimage manager, compared with a baseline.
+
+Runs a dispute through one channel (create, deposit, update with a
+conditional payment, reveal the preimage, trigger, finalize, withdraw), an
+update with 1 to MAX_PAYMENTS payments in flight, and the batched
+`updateMany` and `submitPreimages`, and records `gasUsed` of
+every receipt. The report is written as JSON (to the temp directory by
+default) and compared with the baseline; the exit status is 1 if an
+operation got more expensive than the tolerance allows or there is no
+baseline to compare with.
+
+Needs geth on localhost:8545 and compiled contracts in ``out/``. Run with
+``python -m benchmarks.bench_gas [--baseline PATH] [--update-baseline]``.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from src.batch import pack_updates
+from src.channel import Channel, ChannelState
+from src.util import (
+    DELTA,
+    GAS,
+    MAX_PAYMENTS,
+    check_tx,
+    fund_token,
+    mint,
+    wait_blocks,
+)
+
+from .common import connect, create_channels, deploy, funded_accounts
+
+BASELINE = os.path.join(os.path.dirname(__file__), "gas_baseline.json")
+REPORT = os.path.join(tempfile.gettempdir(), "gas_report.json")
+# relative increase that counts as a regression
+TOLERANCE = 0.01
+DEPOSIT = 100
+BATCH_SIZE = 10
+PREIMAGE = b"\x01" * 32
+
+
+def gas_used(web3, call, sender):
+    tx_hash = call.transact({"from": sender.address, "gas": GAS})
+    return check_tx(web3, tx_hash).gasUsed
+
+
+def dispute(web3, registry, preimage_manager, token, left, right):
+    """Gas of each call of a dispute settling a conditional payment."""
+    gas = {}
+    create = registry.createChannel(right.address, token._contract.address)
+    receipt = check_tx(web3, create.transact({"from": left.address, "gas": GAS}))
+    gas["createChannel"] = receipt.gasUsed
+    channel_id = web3.toInt(hexstr=receipt.logs[0].data)
+    channel = Channel(web3, registry, preimage_manager, token, channel_id, left, right)
+    gas["deposit"] = channel.deposit(left, DEPOSIT).gasUsed
+
+    state = channel.get_state(left).conditional_payment(
+        recipient=right.address,
+        amount=DEPOSIT // 2,
+        expiry=web3.eth.blockNumber + DELTA,
+        preimage=PREIMAGE,
+    )
+    args = state.sign(left.privateKey).state_update_arguments()
+    gas["update"] = gas_used(web3, registry.update(*args), right)
+    gas["submitPreimage"] = gas_used(
+        web3, preimage_manager.submitPreimage(PREIMAGE), right
+    )
+    gas["trigger"] = gas_used(web3, registry.trigger(channel_id), right)
+    wait_blocks(web3, DELTA + 1)
+    gas["finalize"] = gas_used(web3, registry.finalize(channel_id), right)
+    gas["withdraw"] = gas_used(web3, registry.withdraw(channel_id), right)
+    return gas
+
+
+def payments(web3, registry, preimage_manager, token, left, right):
+    """Gas of an update with 1 to MAX_PAYMENTS conditional payments."""
+    gas = {}
+    channel_ids = create_channels(web3, registry, token, MAX_PAYMENTS, left, right)
+    for count, channel_id in enumerate(channel_ids, 1):
+        channel = Channel(
+            web3, registry, preimage_manager, token, channel_id, left, right
+        )
+        channel.deposit(left, DEPOSIT)
+        state = channel.get_state(left)
+        for i in range(count):
+            state = state.conditional_payment(
+                recipient=right.address,
+                amount=DEPOSIT // MAX_PAYMENTS,
+                expiry=web3.eth.blockNumber + DELTA,
+                preimage=bytes([i + 0x10]) * 32,
+            )
+        args = state.sign(left.privateKey).state_update_arguments()
+        gas[f"update/{count} payments"] = gas_used(web3, registry.update(*args), right)
+    return gas
+
+
+def batched(web3, registry, preimage_manager, token, left, right):
+    """Gas per channel of `updateMany` and per preimage of `submitPreimages`."""
+    channel_ids = create_channels(web3, registry, token, BATCH_SIZE, left, right)
+    states = [
+        ChannelState(channel_id=channel_id, round=0).sign(left.privateKey)
+        for channel_id in channel_ids
+    ]
+    [words] = pack_updates(states)
+    preimages = [bytes([i + 2]) * 32 for i in range(BATCH_SIZE)]
+    update_gas = gas_used(web3, registry.updateMany(words), right)
+    submit_gas = gas_used(web3, preimage_manager.submitPreimages(preimages), right)
+    return {
+        f"updateMany/{BATCH_SIZE}": update_gas // BATCH_SIZE,
+        f"submitPreimages/{BATCH_SIZE}": submit_gas // BATCH_SIZE,
+    }
+
+
+def measure(web3):
+    registry, preimage_manager, token = deploy(web3)
+    left, right = funded_accounts(web3)
+    deployer = web3.eth.accounts[0]
+    mint(web3, token, deployer)
+    # one deposit for the dispute and one per channel of `payments`
+    funds = DEPOSIT * (1 + MAX_PAYMENTS)
+    check_tx(web3, fund_token(web3, token, deployer, left.address, funds))
+    contracts = (registry, preimage_manager, token, left, right)
+    return {
+        **dispute(web3, *contracts),
+        **payments(web3, *contracts),
+        **batched(web3, *contracts),
+    }
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Print both reports side by side, return the operations that regressed."""
+    regressions = []
+    print(f"{'operation':<22} {'baseline':>10} {'gas':>10} {'change':>8}")
+    for name, gas in report.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<22} {'-':>10} {gas:>10,} {'new':>8}")
+            continue
+        change = (gas - base) / base
+        print(f"{name:<22} {base:>10,} {gas:>10,} {change:>+8.1%}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--report", default=REPORT)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store the report as the new baseline",
+    )
+    args = parser.parse_args()
+
+    report = measure(connect())
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"wrote baseline {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}, create it with --update-baseline")
+        return 1
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"gas regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
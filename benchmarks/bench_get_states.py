@@ -0,0 +1,58 @@
+"""Reading many channel states: `getState` per channel vs `getStates`.
+
+Needs geth on localhost:8545 and compiled contracts in ``out/``.
+Run with ``python -m benchmarks.bench_get_states``.
+"""
+import time
+
+from src.batch import BatchReader, get_states
+from src.channel import Channel
+
+from .common import connect, create_channels, deploy, funded_accounts
+
+CHANNEL_COUNTS = [10, 100, 1_000]
+
+
+def timed(fun, *args, **kwargs):
+    start = time.perf_counter()
+    result = fun(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    web3 = connect()
+    registry, preimage_manager, token = deploy(web3)
+    left, right = funded_accounts(web3)
+    channel_ids = create_channels(
+        web3, registry, token, max(CHANNEL_COUNTS), left, right
+    )
+    tx_args = {"from": left.address}
+
+    print(f"{'channels':>8} {'method':<12} {'gas':>12} {'seconds':>10}")
+    for num_channels in CHANNEL_COUNTS:
+        ids = channel_ids[:num_channels]
+
+        def get_each():
+            return [registry.getState(channel_id).call(tx_args) for channel_id in ids]
+
+        gas = sum(
+            registry.getState(channel_id).estimateGas(tx_args) for channel_id in ids
+        )
+        _, seconds = timed(get_each)
+        print(f"{num_channels:>8} {'getState':<12} {gas:>12,} {seconds:>10.3f}")
+
+        channels = [
+            Channel(web3, registry, preimage_manager, token, channel_id, left, right)
+            for channel_id in ids
+        ]
+        reader = BatchReader(web3)
+        _, seconds = timed(reader.read, channels, fields=["state"])
+        print(f"{num_channels:>8} {'batch':<12} {gas:>12,} {seconds:>10.3f}")
+
+        gas = registry.getStates(ids, left.address).estimateGas(tx_args)
+        _, seconds = timed(get_states, registry, ids, left.address, page_size=len(ids))
+        print(f"{num_channels:>8} {'getStates':<12} {gas:>12,} {seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
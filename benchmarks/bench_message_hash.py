@@ -0,0 +1,49 @@
+"""Channel state message hashing: fixed-layout encoder vs. `pack`.
+
+Run with ``python -m benchmarks.bench_message_hash``.
+"""
+import timeit
+
+from src.channel import MESSAGE_INPUTS, ChannelState, Payment
+from src.util import hash_message, pack
+
+NUM_OPS = 50_000
+
+
+def reference_message_hash(state):
+    state_data = state.state_data()
+    message_parts = (state_data[k] for k in MESSAGE_INPUTS)
+    return hash_message(pack(message_parts))
+
+
+def make_state():
+    payment = Payment(
+        preimage_hash=b"\x01" * 32,
+        recipient="0xa49aad37c34e92236690b93e291ae5f10daf7cbe",
+        amount=7,
+        expiry=1234,
+    )
+    return ChannelState(
+        channel_id=42,
+        deposits=[10, 20],
+        credits=[-7, 3],
+        withdrawals=[0, 1],
+        round=12,
+        payments=[payment],
+    )
+
+
+def main():
+    state = make_state()
+    assert state.message_hash() == reference_message_hash(state)
+
+    for name, fun in [
+        ("reference", reference_message_hash),
+        ("fixed layout", ChannelState.message_hash),
+    ]:
+        seconds = timeit.timeit(lambda: fun(state), number=NUM_OPS)
+        print(f"{name:>12}: {NUM_OPS / seconds:>10,.0f} hashes/s")
+
+
+if __name__ == "__main__":
+    main()
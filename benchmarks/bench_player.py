@@ -0,0 +1,45 @@
+"""Sustained off-chain payments per second on one core.
+
+Every payment is an open and a complete exchange between two players in
+the same process: four signatures and four signature recoveries.
+Run with ``python -m benchmarks.bench_player``.
+"""
+import time
+
+from src import signer
+from src.channel import ChannelState, Player
+from src.tests.conftest import ACCOUNTS
+
+NUM_PAYMENTS = 2_000
+NUM_CHANNELS = 10
+PREIMAGE = b"\x01" * 32
+
+
+def run():
+    payer, payee = Player(ACCOUNTS["alice"]), Player(ACCOUNTS["bob"])
+    for channel_id in range(NUM_CHANNELS):
+        state = ChannelState(channel_id=channel_id, deposits=(10 ** 18, 0))
+        payer.add_channel(state, payee.account.address)
+        payee.add_channel(state.to_other(), payer.account.address)
+
+    start = time.perf_counter()
+    for i in range(NUM_PAYMENTS):
+        channel_id = i % NUM_CHANNELS
+        proposal = payer.make_payment(channel_id, 1, PREIMAGE, expiry=100)
+        payer.receive_countersignature(payee.receive_payment(proposal))
+        proposal = payer.complete_payment(channel_id)
+        payer.receive_countersignature(payee.receive_payment(proposal))
+    return NUM_PAYMENTS / (time.perf_counter() - start)
+
+
+def main():
+    print(f"signer backend: {signer.DEFAULT_BACKEND}")
+    print(f"{run():>10,.0f} payments/s")
+    # the payee verifies the hash the payer just signed and vice versa
+    ChannelState.enable_hash_cache(maxsize=1_000)
+    print(f"{run():>10,.0f} payments/s with message hash cache")
+    ChannelState.disable_hash_cache()
+
+
+if __name__ == "__main__":
+    main()
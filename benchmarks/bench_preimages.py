@@ -0,0 +1,55 @@
+"""Revealing preimages: one `submitPreimage` each vs a `PreimageQueue`.
+
+Needs geth on localhost:8545 and compiled contracts in ``out/``.
+Run with ``python -m benchmarks.bench_preimages``.
+"""
+import os
+import time
+
+from src.preimages import PreimageQueue
+from src.util import GAS, check_txs
+
+from .common import connect, deploy
+
+PREIMAGE_COUNTS = [1, 10, 100]
+
+
+def submit_each(web3, preimage_manager, preimages, sender):
+    tx_hashes = [
+        preimage_manager.submitPreimage(preimage).transact({"from": sender, "gas": GAS})
+        for preimage in preimages
+    ]
+    return check_txs(web3, tx_hashes)
+
+
+def submit_queued(web3, preimage_manager, preimages, sender):
+    queue = PreimageQueue(web3, preimage_manager, sender)
+    for preimage in preimages:
+        queue.add(preimage)
+    return queue.flush()
+
+
+def main():
+    web3 = connect()
+    _, preimage_manager, _ = deploy(web3)
+    sender = web3.eth.accounts[0]
+
+    print(
+        f"{'preimages':>9} {'method':<8} {'txs':>5} {'gas/preimage':>12} {'seconds':>8}"
+    )
+    for num_preimages in PREIMAGE_COUNTS:
+        for name, submit in [("single", submit_each), ("queue", submit_queued)]:
+            # new preimages, so that every submission stores a timestamp
+            preimages = [os.urandom(32) for _ in range(num_preimages)]
+            start = time.perf_counter()
+            receipts = submit(web3, preimage_manager, preimages, sender)
+            seconds = time.perf_counter() - start
+            gas = sum(receipt.gasUsed for receipt in receipts) / num_preimages
+            print(
+                f"{num_preimages:>9} {name:<8} {len(receipts):>5} "
+                f"{gas:>12,.0f} {seconds:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""JSON-RPC requests to wait for receipts: the retry loop `check_tx` used
+before vs `wait_for_receipts`, on a simulated node (no chain needed).
+
+Run with ``python -m benchmarks.bench_receipts``.
+"""
+from src.testing import SimulatedNode
+from src.util import wait_for_receipts
+
+BLOCK_TIME = 1.0
+TX_COUNTS = [1, 10, 100]
+
+
+def retry_each(node, tx_hashes):
+    # `check_tx` retried on the AttributeError of `None.status` without delay
+    for tx_hash in tx_hashes:
+        while node.eth.getTransactionReceipt(tx_hash) is None:
+            pass
+
+
+def main():
+    print(f"{'txs':>5} {'method':<18} {'requests':>9}")
+    for num_txs in TX_COUNTS:
+        for name, wait in [
+            ("retry each", retry_each),
+            ("wait_for_receipts", wait_for_receipts),
+        ]:
+            node = SimulatedNode(BLOCK_TIME)
+            wait(node, node.send(num_txs))
+            print(f"{num_txs:>5} {name:<18} {sum(node.counts.values()):>9,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Route queries and capacity updates on a random graph of 100k channels.
+
+Updates are payments of a few units in random channels.
+Run with ``python -m benchmarks.bench_routing``.
+"""
+import random
+import time
+
+from src.channel import ChannelState
+from src.routing import ChannelGraph
+
+NUM_NODES = 20_000
+NUM_CHANNELS = 100_000
+NUM_QUERIES = 1_000
+NUM_UPDATES = 10_000
+MAX_DEPOSIT = 100
+MAX_AMOUNT = 50
+
+
+def timed(function, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    rng = random.Random(0)
+    graph = ChannelGraph()
+    states = []
+    start = time.perf_counter()
+    for channel_id in range(NUM_CHANNELS):
+        left, right = rng.sample(range(NUM_NODES), 2)
+        deposits = (rng.randrange(MAX_DEPOSIT), rng.randrange(MAX_DEPOSIT))
+        states.append(ChannelState(channel_id, deposits))
+        graph.add_channel(states[-1], left, right)
+    print(f"build: {time.perf_counter() - start:.2f}s for {len(graph):,} channels")
+
+    queries = [
+        (*rng.sample(range(NUM_NODES), 2), rng.randrange(1, MAX_AMOUNT))
+        for _ in range(NUM_QUERIES)
+    ]
+    for k in (1, 3):
+        for label in ("uncached", "cached"):
+            arguments = iter(queries)
+
+            def query():
+                graph.find_paths(*next(arguments), k)
+
+            print(f"{timed(query, NUM_QUERIES):>10,.0f} {label} queries/s, k={k}")
+
+    def pay():
+        channel_id = rng.randrange(NUM_CHANNELS)
+        state = states[channel_id]
+        amount = min(rng.randrange(1, 5), state.deposits[0] + state.credits[0])
+        credits = (state.credits[0] - amount, state.credits[1] + amount)
+        states[channel_id] = state.to(credits=credits)
+        graph.update_state(states[channel_id], graph.players[channel_id][0])
+
+    cached = len(graph._cache)
+    for _ in range(100):
+        pay()
+    print(f"{len(graph._cache):,} of {cached:,} cached answers left after 100 payments")
+    print(f"{timed(pay, NUM_UPDATES):>10,.0f} updates/s")
+
+
+if __name__ == "__main__":
+    main()
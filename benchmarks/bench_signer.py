@@ -0,0 +1,43 @@
+"""Signing and recovery: `Account` vs. cached signers per backend.
+
+Run with ``python -m benchmarks.bench_signer``.
+"""
+import os
+import timeit
+
+from eth_account import Account
+
+from src import signer
+from src.tests.conftest import ACCOUNTS
+
+NUM_OPS = 2_000
+PRIVATE_KEY = ACCOUNTS["alice"].privateKey
+
+
+def rate(fun):
+    return NUM_OPS / timeit.timeit(fun, number=NUM_OPS)
+
+
+def main():
+    msg_hash = os.urandom(32)
+    signature = Account.signHash(msg_hash, PRIVATE_KEY)
+    vrs = (signature.v, signature.r, signature.s)
+
+    cases = [
+        ("Account", "sign", lambda: Account.signHash(msg_hash, PRIVATE_KEY)),
+        ("Account", "recover", lambda: Account.recoverHash(msg_hash, vrs=vrs)),
+    ]
+    for backend in sorted(signer.SIGNERS):
+        signer_ = signer.get_signer(PRIVATE_KEY, backend)
+        recover = signer.SIGNERS[backend].recover_hash
+        cases += [
+            (backend, "sign", lambda signer_=signer_: signer_.sign_hash(msg_hash)),
+            (backend, "recover", lambda recover=recover: recover(msg_hash, vrs)),
+        ]
+
+    for name, operation, fun in cases:
+        print(f"{name:>10} {operation:>8}: {rate(fun):>10,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
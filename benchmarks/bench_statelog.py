@@ -0,0 +1,70 @@
+"""Write throughput of the state log under different durability settings.
+
+Run with ``python -m benchmarks.bench_statelog [directory]``, the directory
+should be on the disk to measure (default: a temporary directory).
+"""
+import sys
+import tempfile
+import threading
+import time
+
+from src.channel import ChannelState
+from src.statelog import StateLog
+from src.tests.conftest import ACCOUNTS
+
+NUM_STATES = 20_000
+NUM_THREADS = 16
+ALICE = ACCOUNTS["alice"]
+
+
+def append_serially(state_log, signed_states):
+    for signed_state in signed_states:
+        state_log.append(signed_state)
+
+
+def append_concurrently(state_log, signed_states):
+    def append(start):
+        append_serially(state_log, signed_states[start::NUM_THREADS])
+
+    threads = [
+        threading.Thread(target=append, args=(start,)) for start in range(NUM_THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run(directory, name, durability, append, signed_states):
+    path = f"{directory}/{name}.log"
+    with StateLog(path, durability=durability) as state_log:
+        start = time.perf_counter()
+        append(state_log, signed_states)
+        state_log.sync()
+        seconds = time.perf_counter() - start
+        fsyncs = state_log.fsyncs
+    rate = len(signed_states) / seconds
+    print(f"{name:<28} {rate:>12,.0f} states/s {fsyncs:>8} fsyncs")
+
+
+def main(directory=None):
+    signed_states = [
+        ChannelState(channel_id=i % 1_000, round=i).sign(ALICE.privateKey)
+        for i in range(NUM_STATES)
+    ]
+    few = signed_states[:2_000]
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        run(tmp, "none", "none", append_serially, signed_states)
+        run(tmp, "interval (10 ms)", "interval", append_serially, signed_states)
+        run(
+            tmp,
+            f"always, {NUM_THREADS} threads",
+            "always",
+            append_concurrently,
+            signed_states,
+        )
+        run(tmp, "always, 1 thread", "always", append_serially, few)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,80 @@
+"""Memory and throughput of channel state objects.
+
+Run with ``python -m benchmarks.bench_states``.
+"""
+import timeit
+import tracemalloc
+
+from src.channel import ChannelState, Payment, SignedState
+from src.util import ZERO_ADDRESS
+
+NUM_STATES = 100_000
+NUM_OPS = 100_000
+
+SIG = [27, 2 ** 255 - 19, 2 ** 254 + 7]
+PREIMAGE = b"\x01" * 32
+
+
+def make_state():
+    return ChannelState(
+        channel_id=1,
+        deposits=[10, 20],
+        credits=[-3, 3],
+        withdrawals=[0, 0],
+        round=5,
+        payments=[Payment(amount=0)],
+    )
+
+
+def memory_per_state(num_states=NUM_STATES):
+    state = make_state()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    states = []
+    for _ in range(num_states):
+        state = state.conditional_payment(
+            recipient=ZERO_ADDRESS, amount=0, expiry=0, preimage=PREIMAGE
+        )
+        states.append(state)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / num_states
+
+
+def ops_per_second(stmt, num_ops=NUM_OPS):
+    state = make_state()
+    signed = SignedState(sig=SIG, **{k: getattr(state, k) for k in FIELDS})
+    namespace = {
+        "ChannelState": ChannelState,
+        "PREIMAGE": PREIMAGE,
+        "args": tuple(getattr(state, k) for k in FIELDS),
+        "signed": signed,
+        "state": state,
+    }
+    seconds = timeit.timeit(stmt, globals=namespace, number=num_ops)
+    return num_ops / seconds
+
+
+FIELDS = ["channel_id", "deposits", "credits", "withdrawals", "round", "payments"]
+
+OPERATIONS = {
+    "conditional_payment": (
+        "state.conditional_payment("
+        "recipient=state.payments[0].recipient, amount=1, expiry=1, preimage=PREIMAGE)"
+    ),
+    "to_other": "state.to_other()",
+    "to_unsigned": "signed.to_unsigned()",
+    "to(round=...)": "state.to(round=state.round + 1)",
+    "ChannelState(...)": "ChannelState(*args)",
+    "ChannelState.trusted(...)": "ChannelState.trusted(*args)",
+}
+
+
+def main():
+    print(f"memory per state: {memory_per_state():.0f} bytes")
+    for name, stmt in OPERATIONS.items():
+        print(f"{name:>26}: {ops_per_second(stmt):>12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
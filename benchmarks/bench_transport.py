@@ -0,0 +1,96 @@
+"""Payments per second and request latency over the localhost transport.
+
+The payee serves from a separate process, the payer runs one task per
+channel over a single pipelined connection. Every payment is an open and a
+complete exchange. Run with ``python -m benchmarks.bench_transport``.
+"""
+import asyncio
+import multiprocessing
+import time
+
+from src.channel import ChannelState, Player
+from src.tests.conftest import ACCOUNTS
+from src.transport import MAX_IN_FLIGHT, PeerConnection, PeerServer
+
+NUM_CHANNELS = [1, 10, 100, 1_000]
+PAYMENTS_PER_CHANNEL = 2_000
+PREIMAGE = b"\x01" * 32
+
+
+def _players(num_channels):
+    payer, payee = Player(ACCOUNTS["alice"]), Player(ACCOUNTS["bob"])
+    for channel_id in range(num_channels):
+        state = ChannelState(channel_id=channel_id, deposits=(10 ** 18, 0))
+        payer.add_channel(state, payee.account.address)
+        payee.add_channel(state.to_other(), payer.account.address)
+    return payer, payee
+
+
+def _serve(num_channels, address):
+    _, payee = _players(num_channels)
+    loop = asyncio.new_event_loop()
+    server = PeerServer(payee.receive_payment)
+    address.put(loop.run_until_complete(server.start()))
+    loop.run_forever()
+
+
+async def _pay(payer, connection, channel_id, count, latencies):
+    for _ in range(count):
+        for propose in (
+            lambda: payer.make_payment(channel_id, 1, PREIMAGE, expiry=100),
+            lambda: payer.complete_payment(channel_id),
+        ):
+            start = time.perf_counter()
+            countersigned = await connection.request(propose())
+            payer.receive_countersignature(countersigned)
+            latencies.append(time.perf_counter() - start)
+
+
+async def _run(payer, host, port, num_channels):
+    connection = await PeerConnection.connect(host, port, MAX_IN_FLIGHT)
+    per_channel = max(PAYMENTS_PER_CHANNEL // num_channels, 1)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            _pay(payer, connection, channel_id, per_channel, latencies)
+            for channel_id in range(num_channels)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    await connection.close()
+    return per_channel * num_channels / elapsed, sorted(latencies)
+
+
+def run(num_channels):
+    address = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=_serve, args=(num_channels, address), daemon=True
+    )
+    server.start()
+    try:
+        host, port = address.get()
+        payer, _ = _players(num_channels)
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(_run(payer, host, port, num_channels))
+        finally:
+            loop.close()
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    print(f"{'channels':>8} {'payments/s':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for num_channels in NUM_CHANNELS:
+        payments_per_second, latencies = run(num_channels)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(
+            f"{num_channels:>8} {payments_per_second:>12,.0f} {p50:>8.2f} {p99:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
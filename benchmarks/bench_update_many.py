@@ -0,0 +1,79 @@
+"""Gas per channel of disputes: one `update` per channel vs `updateMany`.
+
+Every channel gets a state with all payment slots in use, the worst case
+`UPDATE_GAS` bounds, signed by the left player and submitted by the right
+one. Needs geth on localhost:8545 and compiled contracts in ``out/``. Run
+with ``python -m benchmarks.bench_update_many``.
+"""
+from src.batch import UPDATE_GAS, UPDATE_MANY_GAS, UPDATE_WORDS, pack_updates
+from src.channel import ChannelState, Payment
+from src.util import GAS, MAX_PAYMENTS, check_txs
+
+from .common import connect, create_channels, deploy, funded_accounts
+
+CHANNEL_COUNTS = [1, 10, 50]
+
+
+def signed_states(channel_ids, left, right):
+    return [
+        ChannelState(
+            channel_id=channel_id,
+            round=0,
+            payments=[
+                Payment(
+                    preimage_hash=bytes([slot + 1]) * 32,
+                    recipient=right.address,
+                    amount=1,
+                    expiry=100,
+                )
+                for slot in range(MAX_PAYMENTS)
+            ],
+        ).sign(left.privateKey)
+        for channel_id in channel_ids
+    ]
+
+
+def single_updates(web3, registry, states, sender):
+    tx_hashes = [
+        registry.update(*state.state_update_arguments()).transact(
+            {"from": sender.address, "gas": GAS}
+        )
+        for state in states
+    ]
+    return check_txs(web3, tx_hashes)
+
+
+def batched_updates(web3, registry, states, sender):
+    tx_hashes = []
+    for words in pack_updates(states):
+        gas = UPDATE_MANY_GAS + len(words) // UPDATE_WORDS * UPDATE_GAS
+        tx_hashes.append(
+            registry.updateMany(words).transact({"from": sender.address, "gas": gas})
+        )
+    return check_txs(web3, tx_hashes)
+
+
+def main():
+    web3 = connect()
+    registry, _, token = deploy(web3)
+    left, right = funded_accounts(web3)
+
+    print(f"UPDATE_GAS bound: {UPDATE_GAS:,}")
+    print(f"{'channels':>8} {'method':<12} {'txs':>5} {'gas/channel':>12}")
+    for num_channels in CHANNEL_COUNTS:
+        for name, submit in [
+            ("update", single_updates),
+            ("updateMany", batched_updates),
+        ]:
+            # fresh channels, so that both write the same storage words
+            channel_ids = create_channels(
+                web3, registry, token, num_channels, left, right
+            )
+            states = signed_states(channel_ids, left, right)
+            receipts = submit(web3, registry, states, right)
+            gas = sum(receipt.gasUsed for receipt in receipts) / num_channels
+            print(f"{num_channels:>8} {name:<12} {len(receipts):>5} {gas:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
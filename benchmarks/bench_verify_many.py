@@ -0,0 +1,43 @@
+"""Scaling of `verify_many` with the number of worker processes.
+
+Run with ``python -m benchmarks.bench_verify_many``.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.channel import ChannelState, verify_many
+from src.tests.conftest import ACCOUNTS
+
+NUM_STATES = 4_000
+ALICE = ACCOUNTS["alice"]
+
+
+def worker_counts():
+    counts = [1]
+    while counts[-1] * 2 <= os.cpu_count():
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+def main():
+    signed_states = [
+        ChannelState(channel_id=i, round=i).sign(ALICE.privateKey)
+        for i in range(NUM_STATES)
+    ]
+    addresses = [ALICE.address] * NUM_STATES
+
+    for max_workers in worker_counts():
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # warm up the pool
+            warm_up = slice(0, max_workers)
+            verify_many(signed_states[warm_up], addresses[warm_up], executor=executor)
+            start = time.perf_counter()
+            results = verify_many(signed_states, addresses, executor=executor)
+            seconds = time.perf_counter() - start
+        assert not any(results)
+        print(f"{max_workers:>3} workers: {NUM_STATES / seconds:>10,.0f} states/s")
+
+
+if __name__ == "__main__":
+    main()
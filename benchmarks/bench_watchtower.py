@@ -0,0 +1,55 @@
+"""Reaction time of the watchtower to a burst of triggers.
+
+Needs geth on localhost:8545 and compiled contracts in ``out/``.
+Run with ``python -m benchmarks.bench_watchtower [num_channels] [num_shards]``.
+"""
+import statistics
+import sys
+
+from src.channel import ChannelState
+from src.tests.conftest import GETH_URL
+from src.util import GAS, check_txs
+from src.watchtower import ShardedWatchtower
+
+from .common import connect, create_channels, deploy, funded_accounts
+
+NUM_CHANNELS = 200
+NUM_SHARDS = 4
+
+
+def main(num_channels=NUM_CHANNELS, num_shards=NUM_SHARDS):
+    web3 = connect()
+    registry, _, token = deploy(web3)
+    left, right = funded_accounts(web3)
+    channel_ids = create_channels(web3, registry, token, num_channels, left, right)
+
+    tower = ShardedWatchtower(GETH_URL, registry._contract.address, num_shards)
+    tower.start()
+    for channel_id in channel_ids:
+        signed_state = ChannelState(channel_id=channel_id, round=0).sign(
+            right.privateKey
+        )
+        tower.watch(signed_state, left.address)
+
+    # the counterparty triggers all channels at once
+    tx_hashes = [
+        registry.trigger(channel_id).transact({"from": right.address, "gas": GAS})
+        for channel_id in channel_ids
+    ]
+    check_txs(web3, tx_hashes)
+
+    reactions = tower.reactions(num_channels, timeout=60)
+    tower.stop()
+
+    seconds = sorted(reaction.seconds for reaction in reactions)
+    blocks = [reaction.mined_block - reaction.event_block for reaction in reactions]
+    in_time = sum(reaction.submitted_before_deadline for reaction in reactions)
+    print(f"{num_channels} channels, {num_shards} shards")
+    print(f"event -> submitted median {statistics.median(seconds) * 1000:.1f} ms")
+    print(f"event -> submitted max    {seconds[-1] * 1000:.1f} ms")
+    print(f"event -> mined median     {statistics.median(blocks)} blocks")
+    print(f"mined before deadline     {in_time}/{num_channels}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,88 @@
+"""Size and speed of the wire encoding compared to JSON and pickle.
+
+Run with ``python -m benchmarks.bench_wire``.
+"""
+import json
+import pickle
+import timeit
+
+import attr
+
+from src import wire
+from src.channel import ChannelState, Payment, SignedState
+from src.tests.conftest import ACCOUNTS
+
+NUM_OPS = 20_000
+
+
+def to_json(signed_state):
+    data = attr.asdict(signed_state)
+    for payment in data["payments"]:
+        payment["preimage_hash"] = payment["preimage_hash"].hex()
+    return json.dumps(data).encode()
+
+
+def from_json(encoded):
+    data = json.loads(encoded)
+    payments = data.pop("payments")
+    for payment in payments:
+        payment["preimage_hash"] = bytes.fromhex(payment["preimage_hash"])
+    return SignedState(payments=[Payment(**payment) for payment in payments], **data)
+
+
+def peek_json(encoded):
+    data = json.loads(encoded)
+    return data["channel_id"], data["round"]
+
+
+def peek_pickle(encoded):
+    signed_state = pickle.loads(encoded)
+    return signed_state.channel_id, signed_state.round
+
+
+def peek_wire(encoded):
+    view = wire.SignedStateView(encoded)
+    return view.channel_id, view.round
+
+
+FORMATS = {
+    "wire": (wire.encode, wire.decode, peek_wire),
+    "json": (to_json, from_json, peek_json),
+    "pickle": (pickle.dumps, pickle.loads, peek_pickle),
+}
+
+
+def rate(fun, arg):
+    return NUM_OPS / timeit.timeit(lambda: fun(arg), number=NUM_OPS)
+
+
+def main():
+    payment = Payment(
+        preimage_hash=b"\x01" * 32,
+        recipient=ACCOUNTS["bob"].address,
+        amount=10,
+        expiry=1_000_000,
+        command="open",
+    )
+    signed_state = ChannelState(
+        channel_id=12,
+        deposits=(100, 100),
+        credits=(-10, 0),
+        withdrawals=(0, 0),
+        round=42,
+        payments=[payment],
+    ).sign(ACCOUNTS["alice"].privateKey)
+
+    header = ["encode/s", "decode/s", "peek/s"]
+    print(f"{'format':<8} {'bytes':>6}", *(f"{h:>12}" for h in header))
+    for name, (encode, decode, peek) in FORMATS.items():
+        encoded = encode(signed_state)
+        assert decode(encoded) == signed_state
+        print(
+            f"{name:<8} {len(encoded):>6} {rate(encode, signed_state):>12,.0f} "
+            f"{rate(decode, encoded):>12,.0f} {rate(peek, encoded):>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
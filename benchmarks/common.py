@@ -0,0 +1,52 @@
+"""Chain setup for the benchmarks that need a chain, geth or eth-tester."""
+from src import util
+from src.contracts.dappsys import DSToken
+from src.contracts.PreimageManager import PreimageManager
+from src.contracts.SpritesRegistry import SpritesRegistry
+from src.tests.conftest import ACCOUNTS, BACKEND, GETH_URL
+from src.util import GAS, check_txs, deploy_contract, fund_account
+
+
+def connect(url=GETH_URL):
+    """Web3 on geth, or in-process with SPRITES_BACKEND=eth-tester."""
+    if BACKEND == "eth-tester":
+        private_keys = [account.privateKey for account in ACCOUNTS.values()]
+        web3, _ = util.connect_tester(private_keys)
+        return web3
+    return util.connect(url)
+
+
+def deploy(web3, deployer=None):
+    """Return freshly deployed registry, preimage manager and token."""
+    deployer = deployer or web3.eth.accounts[0]
+    preimage_manager = deploy_contract(
+        web3, deployer, "PreimageManager.sol", "PreimageManager", PreimageManager
+    )
+    registry = deploy_contract(
+        web3,
+        deployer,
+        "SpritesRegistry.sol",
+        "SpritesRegistry",
+        SpritesRegistry,
+        args=[preimage_manager._contract.address],
+    )
+    token = deploy_contract(
+        web3, deployer, "dappsys.sol", "DSToken", DSToken, args=[deployer]
+    )
+    return registry, preimage_manager, token
+
+
+def funded_accounts(web3, names=("alice", "bob")):
+    for name in names:
+        fund_account(web3, web3.eth.accounts[0], ACCOUNTS[name])
+    return [ACCOUNTS[name] for name in names]
+
+
+def create_channels(web3, registry, token, num_channels, left, right):
+    """Open `num_channels` channels between two accounts, return the ids."""
+    create = registry.createChannel(right.address, token._contract.address)
+    tx_hashes = [
+        create.transact({"from": left.address, "gas": GAS}) for _ in range(num_channels)
+    ]
+    receipts = check_txs(web3, tx_hashes)
+    return [web3.toInt(hexstr=receipt.logs[0].data) for receipt in receipts]
@@ -8,8 +8,25 @@ contract PreimageManager {
             timestamp[keccak256(x)] = block.number;
     }
 
+    // Many preimages in one transaction, e. g. of all hops of a route.
+    function submitPreimages(bytes32[] xs) public {
+        for (uint i = 0; i < xs.length; i++) {
+            bytes32 h = keccak256(xs[i]);
+            if (timestamp[h] == 0)
+                timestamp[h] = block.number;
+        }
+    }
+
     function revealedBefore(bytes32 h, uint T) public view returns (bool) {
         uint t = timestamp[h];
         return (t > 0 && t <= T);
     }
+
+    function revealedBeforeMany(bytes32[] hs, uint T) public view returns (bool[] revealed) {
+        revealed = new bool[](hs.length);
+        for (uint i = 0; i < hs.length; i++) {
+            uint t = timestamp[hs[i]];
+            revealed[i] = (t > 0 && t <= T);
+        }
+    }
 }
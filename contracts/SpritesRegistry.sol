@@ -11,13 +11,17 @@ interface PreimageManager {
     function revealedBefore(bytes32 h, uint T) external returns (bool);
 }
 
-// Note: Initial version does NOT support concurrent conditional payments!
+// Up to MAX_PAYMENTS conditional payments can be in flight per channel.
 
 contract SpritesRegistry {
 
     // Blocks for grace period
     uint constant DELTA = 10;
 
+    // Slots for concurrent conditional payments, an empty slot has amount 0.
+    // The client needs to use the same number.
+    uint constant MAX_PAYMENTS = 4;
+
     struct Player {
       address addr;
       int credit;
@@ -45,8 +49,8 @@ contract SpritesRegistry {
       Status status;
       uint deadline;
 
-      // Conditional payment
-      Payment payment;
+      // Conditional payments
+      Payment[MAX_PAYMENTS] payments;
     }
 
 
@@ -54,6 +58,8 @@ contract SpritesRegistry {
     event EventInit(uint channelID);
     event EventUpdate(uint channelID, int round);
     event EventPending(uint channelID, uint start, uint deadline);
+    event EventDeposit(uint channelID);
+    event EventFinalize(uint channelID);
 
     // Utility functions
     modifier onlyplayers (uint channelID){
@@ -97,26 +103,14 @@ contract SpritesRegistry {
     function createChannel(address other, address tokenAddress) public returns (uint) {
       uint channelID = channelCounter;
 
-      // using memory here reduces gas cost from ~ 300k to 200k
-      Channel memory channel;
-      Payment memory payment;
+      // Only write the non-zero fields, the payment slots start out empty.
+      Channel storage channel = channels[channelID];
 
       channel.tokenAddress = tokenAddress;
       channel.left.addr = msg.sender;
       channel.right.addr = other;
 
       channel.bestRound = -1;
-      channel.status = Status.OK;
-      channel.deadline = 0; // not sure
-
-      payment.expiry = 0;
-      payment.amount = 0;
-      payment.preimageHash = bytes32(0);
-      payment.recipient =  0;
-
-      channel.payment = payment;
-
-      channels[channelID] = channel;
 
       channelCounter += 1;
 
@@ -151,12 +145,21 @@ contract SpritesRegistry {
 
       Player storage player = lookupPlayer(channelID);
       player.deposit += amount;
+
+      EventDeposit(channelID);
     }
 
     function getDeposit(uint channelID) public view returns (uint) {
       return lookupPlayer(channelID).deposit;
     }
 
+    // Addresses of the left and right player
+    function getPlayers(uint channelID) public view returns (address[2] players) {
+      Channel storage channel = channels[channelID];
+      players[0] = channel.left.addr;
+      players[1] = channel.right.addr;
+    }
+
     function getStatus(uint channelID) public view returns (Status) {
       return channels[channelID].status;
     }
@@ -188,22 +191,33 @@ contract SpritesRegistry {
         int[2] credits,
         uint[2] withdrawals,
         int bestRound,
-        bytes32 preimageHash,
-        address recipient,
-        uint amount,
-        uint expiry
+        bytes32[MAX_PAYMENTS] preimageHashes,
+        address[MAX_PAYMENTS] recipients,
+        uint[MAX_PAYMENTS] amounts,
+        uint[MAX_PAYMENTS] expiries
       )
     {
-      Player storage player = lookupPlayer(channelID);
-      Player storage other = lookupOtherPlayer(channelID);
-      // Channel storage channel = channels[channelID];
-      Payment storage payment = channels[channelID].payment;
+      // The fields are read by helpers: with all the return values, locals
+      // and loop variables in one frame getState is close to the 16 stack
+      // slots the EVM can reach.
+      Channel storage channel = channels[channelID];
+      (deposits, credits, withdrawals) = readPlayers(channel, msg.sender);
+      bestRound = channel.bestRound;
+      (preimageHashes, recipients, amounts, expiries) = readPayments(channel);
+    }
 
-      bestRound = channels[channelID].bestRound;
-      preimageHash = payment.preimageHash;
-      recipient = payment.recipient;
-      amount = payment.amount;
-      expiry = payment.expiry;
+    // Deposits, credits and withdrawals in the perspective of `perspective`,
+    // or of the left player if that's not a player.
+    function readPlayers(Channel storage channel, address perspective)
+      internal view
+      returns (uint[2] deposits, int[2] credits, uint[2] withdrawals)
+    {
+      Player storage player = channel.left;
+      Player storage other = channel.right;
+      if (channel.right.addr == perspective) {
+        player = channel.right;
+        other = channel.left;
+      }
 
       deposits[0] = player.deposit;
       deposits[1] = other.deposit;
@@ -213,31 +227,96 @@ contract SpritesRegistry {
       withdrawals[1] = other.withdrawal;
     }
 
+    function readPayments(Channel storage channel)
+      internal view
+      returns (
+        bytes32[MAX_PAYMENTS] preimageHashes,
+        address[MAX_PAYMENTS] recipients,
+        uint[MAX_PAYMENTS] amounts,
+        uint[MAX_PAYMENTS] expiries
+      )
+    {
+      for (uint i = 0; i < MAX_PAYMENTS; i++) {
+        Payment storage payment = channel.payments[i];
+        preimageHashes[i] = payment.preimageHash;
+        recipients[i] = payment.recipient;
+        amounts[i] = payment.amount;
+        expiries[i] = payment.expiry;
+      }
+    }
+
+    // Number of words per channel returned by getStates
+    uint constant STATE_WORDS = 7 + 4 * MAX_PAYMENTS;
+
+    // The values of getState for many channels flattened into one array,
+    // signed values are in two's complement. Each state is in the perspective
+    // of `perspective`, or of the left player if that's not a player.
+    function getStates(uint[] channelIDs, address perspective)
+      public view returns (uint[] words)
+    {
+      words = new uint[](channelIDs.length * STATE_WORDS);
+      for (uint i = 0; i < channelIDs.length; i++) {
+        writeState(words, i * STATE_WORDS, channels[channelIDs[i]], perspective);
+      }
+    }
+
+    function writeState(
+        uint[] memory words,
+        uint offset,
+        Channel storage channel,
+        address perspective
+    ) internal view {
+      Player storage player = channel.left;
+      Player storage other = channel.right;
+      if (channel.right.addr == perspective) {
+        player = channel.right;
+        other = channel.left;
+      }
+
+      words[offset] = player.deposit;
+      words[offset + 1] = other.deposit;
+      words[offset + 2] = uint(player.credit);
+      words[offset + 3] = uint(other.credit);
+      words[offset + 4] = player.withdrawal;
+      words[offset + 5] = other.withdrawal;
+      words[offset + 6] = uint(channel.bestRound);
+      // same order as getState: all hashes, recipients, amounts, expiries
+      offset += 7;
+      for (uint i = 0; i < MAX_PAYMENTS; i++) {
+        Payment storage payment = channel.payments[i];
+        words[offset + i] = uint(payment.preimageHash);
+        words[offset + MAX_PAYMENTS + i] = uint(payment.recipient);
+        words[offset + 2 * MAX_PAYMENTS + i] = payment.amount;
+        words[offset + 3 * MAX_PAYMENTS + i] = payment.expiry;
+      }
+    }
+
     function compute_hash(
         uint channelID,
         int[2] credits,
         uint[2] withdrawals,
         int round,
-        bytes32 preimageHash,
-        address recipient,
-        uint amount,
-        uint expiry
+        bytes32[MAX_PAYMENTS] preimageHashes,
+        address[MAX_PAYMENTS] recipients,
+        uint[MAX_PAYMENTS] amounts,
+        uint[MAX_PAYMENTS] expiries
     ) private pure returns (bytes32) {
 
-      // message length is 32 * number of (flattened) arguments to keccak
-      bytes memory prefix = "\x19Ethereum Signed Message:\n320";
+      // message length is 32 * number of (flattened) arguments to keccak,
+      // (6 + 4 * MAX_PAYMENTS) * 32
+      bytes memory prefix = "\x19Ethereum Signed Message:\n704";
+      // Array elements are padded to 32 bytes, like the client pads every
+      // input (including the 20 byte addresses).
       return keccak256(
         prefix,
         channelID,
         credits,
         withdrawals,
         round,
-        preimageHash,
-        // Addresses are 20 bytes, but currently the client code
-        // pads every input to 32 bytes.
-        bytes32(recipient),
-        amount,
-        expiry
+        preimageHashes,
+        recipients,
+        amounts,
+        expiries
        );
     }
 
@@ -247,10 +326,10 @@ contract SpritesRegistry {
         int[2] credits,
         uint[2] withdrawals,
         int round,
-        bytes32 preimageHash,
-        address recipient,
-        uint amount,
-        uint expiry
+        bytes32[MAX_PAYMENTS] preimageHashes,
+        address[MAX_PAYMENTS] recipients,
+        uint[MAX_PAYMENTS] amounts,
+        uint[MAX_PAYMENTS] expiries
     )
     public onlyplayers(channelID)
     view {
@@ -267,7 +346,7 @@ contract SpritesRegistry {
 
       // Check the signature of the other party
       bytes32 messageHash = compute_hash(
-          channelID, credits, withdrawals, round, preimageHash, recipient, amount, expiry
+          channelID, credits, withdrawals, round, preimageHashes, recipients, amounts, expiries
       );
       Player storage other = lookupOtherPlayer(channelID);
       isSignatureOkay(other.addr, messageHash, sig);
@@ -279,21 +358,106 @@ contract SpritesRegistry {
         int[2] credits,
         uint[2] withdrawals,
         int round,
-        bytes32 preimageHash,
-        address recipient,
-        uint amount,
-        uint expiry
+        bytes32[MAX_PAYMENTS] preimageHashes,
+        address[MAX_PAYMENTS] recipients,
+        uint[MAX_PAYMENTS] amounts,
+        uint[MAX_PAYMENTS] expiries
     ) public onlyplayers(channelID)
     {
-        verifyUpdate(channelID, sig, credits, withdrawals, round, preimageHash, recipient, amount, expiry);
+        verifyUpdate(
+            channelID, sig, credits, withdrawals, round, preimageHashes, recipients, amounts, expiries
+        );
 
-        updatePayment(channelID, preimageHash, recipient, amount, expiry);
+        updatePayments(channelID, preimageHashes, recipients, amounts, expiries);
         updatePlayers(channelID, credits, withdrawals);
         updateChannel(channelID, round);
 
         EventUpdate(channelID, round);
     }
 
+    // Words per update of `updateMany`, the flattened arguments of `update`:
+    // channelID, sig, credits, withdrawals, round and the payment arrays.
+    uint constant UPDATE_WORDS = 9 + 4 * MAX_PAYMENTS;
+
+    struct Update {
+      uint channelID;
+      uint[3] sig;
+      int[2] credits;
+      uint[2] withdrawals;
+      int round;
+      bytes32[MAX_PAYMENTS] preimageHashes;
+      address[MAX_PAYMENTS] recipients;
+      uint[MAX_PAYMENTS] amounts;
+      uint[MAX_PAYMENTS] expiries;
+    }
+
+    // Applies many updates in one transaction, for disputes in many channels.
+    // Invalid updates (not a player, old round, bad signature, over
+    // withdrawal) are skipped instead of reverting the batch. Every applied
+    // update emits EventUpdate.
+    function updateMany(uint[] words) public returns (uint applied) {
+        require(words.length % UPDATE_WORDS == 0);
+        for (uint offset = 0; offset < words.length; offset += UPDATE_WORDS) {
+            Update memory u = readUpdate(words, offset);
+            if (!isValidUpdate(u)) {
+                continue;
+            }
+            updatePayments(u.channelID, u.preimageHashes, u.recipients, u.amounts, u.expiries);
+            updatePlayers(u.channelID, u.credits, u.withdrawals);
+            updateChannel(u.channelID, u.round);
+
+            EventUpdate(u.channelID, u.round);
+            applied += 1;
+        }
+    }
+
+    function readUpdate(uint[] words, uint offset) private pure returns (Update memory u) {
+      uint i;
+      u.channelID = words[offset];
+      for (i = 0; i < 3; i++) {
+        u.sig[i] = words[offset + 1 + i];
+      }
+      u.credits[0] = int(words[offset + 4]);
+      u.credits[1] = int(words[offset + 5]);
+      u.withdrawals[0] = words[offset + 6];
+      u.withdrawals[1] = words[offset + 7];
+      u.round = int(words[offset + 8]);
+      offset += 9;
+      for (i = 0; i < MAX_PAYMENTS; i++) {
+        u.preimageHashes[i] = bytes32(words[offset + i]);
+        u.recipients[i] = address(words[offset + MAX_PAYMENTS + i]);
+        u.amounts[i] = words[offset + 2 * MAX_PAYMENTS + i];
+        u.expiries[i] = words[offset + 3 * MAX_PAYMENTS + i];
+      }
+    }
+
+    // The checks of `update` and `updatePlayers`, without reverting.
+    function isValidUpdate(Update memory u) private view returns (bool) {
+      Channel storage channel = channels[u.channelID];
+      bool isLeft = channel.left.addr == msg.sender;
+      if (!isLeft && channel.right.addr != msg.sender) {
+        return false;
+      }
+      if (u.round <= channel.bestRound) {
+        return false;
+      }
+
+      bytes32 messageHash = compute_hash(
+          u.channelID, u.credits, u.withdrawals, u.round,
+          u.preimageHashes, u.recipients, u.amounts, u.expiries
+      );
+      address otherAddr = isLeft ? channel.right.addr : channel.left.addr;
+      if (recoverAddress(messageHash, u.sig) != otherAddr) {
+        return false;
+      }
+
+      // credits and withdrawals are in the perspective of the other party
+      uint playerDeposit = isLeft ? channel.left.deposit : channel.right.deposit;
+      uint otherDeposit = isLeft ? channel.right.deposit : channel.left.deposit;
+      return int(u.withdrawals[1]) <= int(playerDeposit) + u.credits[1]
+          && int(u.withdrawals[0]) <= int(otherDeposit) + u.credits[0];
+    }
+
     function updatePlayers(
         uint channelID,
         int[2] credits,
@@ -321,18 +485,28 @@ contract SpritesRegistry {
       channels[channelID].bestRound = round;
     }
 
-    function updatePayment(
+    function updatePayments(
         uint channelID,
-        bytes32 preimageHash,
-        address recipient,
-        uint amount,
-        uint expiry
+        bytes32[MAX_PAYMENTS] preimageHashes,
+        address[MAX_PAYMENTS] recipients,
+        uint[MAX_PAYMENTS] amounts,
+        uint[MAX_PAYMENTS] expiries
     ) private {
-        Payment storage payment = channels[channelID].payment;
-        payment.preimageHash = preimageHash;
-        payment.recipient = recipient;
-        payment.amount = amount;
-        payment.expiry = expiry;
+        Payment[MAX_PAYMENTS] storage payments = channels[channelID].payments;
+        for (uint i = 0; i < MAX_PAYMENTS; i++) {
+            Payment storage payment = payments[i];
+            // skip unchanged slots, rewriting a slot costs 4 SSTOREs
+            if (payment.amount == amounts[i]
+                && payment.preimageHash == preimageHashes[i]
+                && payment.recipient == recipients[i]
+                && payment.expiry == expiries[i]) {
+                continue;
+            }
+            payment.preimageHash = preimageHashes[i];
+            payment.recipient = recipients[i];
+            payment.amount = amounts[i];
+            payment.expiry = expiries[i];
+        }
     }
 
     // Causes a timeout for the finalize time
@@ -347,14 +521,17 @@ contract SpritesRegistry {
 
     function finalize(uint channelID) public onlyplayers(channelID) {
         Channel storage channel = channels[channelID];
-        Payment storage payment = channel.payment;
 
         require(channel.status == Status.PENDING);
         require(block.number > channel.deadline);
 
         // Finalize is safe to call multiple times
         // If "trigger" occurs before a hashlock expires, finalize will need to be called again
-        if (payment.amount > 0 && block.number > payment.expiry) {
+        for (uint i = 0; i < MAX_PAYMENTS; i++) {
+            Payment storage payment = channel.payments[i];
+            if (payment.amount == 0 || block.number <= payment.expiry) {
+                continue;
+            }
 
             bool revealed = pm.revealedBefore(payment.preimageHash, payment.expiry);
             bool paymentToRight = payment.recipient == channel.right.addr;
@@ -376,5 +553,7 @@ contract SpritesRegistry {
         channel.right.withdrawal += uint(int(channel.right.deposit) + channel.right.credit);
         channel.left.credit = - int(channel.left.deposit);
         channel.right.credit = - int(channel.right.deposit);
+
+        EventFinalize(channelID);
     }
 }
@@ -0,0 +1,79 @@
+"""Compiled contracts of ``out/contracts.json``, loaded once per process.
+
+The compiler output is read on first use, each contract's ABI (a JSON
+string in the output) is parsed when first needed, and contract factories
+and attached contracts are cached on each web3 instance.
+"""
+import json
+import os
+import threading
+
+CONTRACTS_JSON = os.path.join("out", "contracts.json")
+# Attribute of web3 instances with their factories, (path, fname, name) ->
+# factory, and attached contracts, (path, fname, name, address) -> contract.
+# They reference web3 and would keep it alive in a registry-wide cache.
+CACHE = "_sprites_contracts"
+
+
+class ArtifactRegistry:
+    def __init__(self, path=CONTRACTS_JSON):
+        self.path = path
+        self._lock = threading.Lock()
+        # "contracts/<fname>:<name>" -> compiler output
+        self._contracts = None
+        # (fname, name) -> parsed ABI
+        self._abis = {}
+
+    def _load(self):
+        if self._contracts is None:
+            with self._lock:
+                if self._contracts is None:
+                    with open(self.path) as filehandle:
+                        self._contracts = json.load(filehandle)["contracts"]
+        return self._contracts
+
+    def contract(self, fname, name):
+        """Compiler output of contract `name` in `fname`, e. g. its ``bin``."""
+        path = os.path.join("contracts", f"{fname}:{name}")
+        return self._load()[path]
+
+    def abi(self, fname, name):
+        key = (fname, name)
+        abi = self._abis.get(key)
+        if abi is None:
+            abi = self.contract(fname, name)["abi"]
+            if isinstance(abi, str):
+                abi = json.loads(abi)
+            self._abis[key] = abi
+        return abi
+
+    def _cache(self, web3):
+        with self._lock:
+            if not hasattr(web3, CACHE):
+                setattr(web3, CACHE, {})
+        return getattr(web3, CACHE)
+
+    def factory(self, web3, fname, name):
+        """Contract class of `web3.eth.contract`, for deploying or attaching."""
+        cache = self._cache(web3)
+        key = (self.path, fname, name)
+        factory = cache.get(key)
+        if factory is None:
+            bytecode = self.contract(fname, name)["bin"]
+            factory = web3.eth.contract(abi=self.abi(fname, name), bytecode=bytecode)
+            cache[key] = factory
+        return factory
+
+    def attach(self, web3, fname, name, cls, address):
+        """Wrap the deployed contract at `address` in `cls`."""
+        # building the contract functions from the ABI is the slow part
+        cache = self._cache(web3)
+        key = (self.path, fname, name, address)
+        contract = cache.get(key)
+        if contract is None:
+            contract = self.factory(web3, fname, name)(address=address)
+            cache[key] = contract
+        return cls(contract)
+
+
+ARTIFACTS = ArtifactRegistry()
@@ -0,0 +1,210 @@
+"""Asyncio versions of `Channel` and of the generated contract wrappers.
+
+web3 4 has no asynchronous providers, the blocking requests run on an
+executor and waiting for receipts happens on the event loop. This lets
+transactions and reads of many channels proceed concurrently in one loop.
+"""
+import asyncio
+import functools
+import logging
+import time
+
+import attr
+from web3.exceptions import BadFunctionCallOutput
+
+from .channel import GAS, Channel, ChannelState
+from .exceptions import TransactionTimeout
+from .util import (
+    DELTA,
+    RECEIPT_POLL_MAX,
+    RECEIPT_POLL_MIN,
+    RECEIPT_TIMEOUT,
+    TransactionFailed,
+    check_receipt,
+)
+
+log = logging.getLogger(__name__)
+
+
+async def _run(executor, fun, *args, **kwargs):
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, functools.partial(fun, *args, **kwargs))
+
+
+async def check_tx(web3, tx_hash, executor=None, timeout=RECEIPT_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    delay = RECEIPT_POLL_MIN
+    receipt = await _run(executor, web3.eth.getTransactionReceipt, tx_hash)
+    while receipt is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TransactionTimeout(f"no receipt after {timeout}s: {tx_hash}")
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(2 * delay, RECEIPT_POLL_MAX)
+        receipt = await _run(executor, web3.eth.getTransactionReceipt, tx_hash)
+
+    return check_receipt(receipt)
+
+
+class AsyncContractFunction:
+    def __init__(self, function, executor=None):
+        self._function = function
+        self._executor = executor
+
+    async def call(self, transaction=None):
+        return await _run(self._executor, self._function.call, transaction)
+
+    async def transact(self, transaction=None):
+        return await _run(self._executor, self._function.transact, transaction)
+
+    async def estimateGas(self, transaction=None):
+        return await _run(self._executor, self._function.estimateGas, transaction)
+
+
+class AsyncContract:
+    """Wraps a contract class from `src/contracts` (e. g. `SpritesRegistry`).
+
+    Methods take the same arguments as on the wrapped contract but return
+    `AsyncContractFunction`s whose `call`/`transact` are coroutines.
+    """
+
+    def __init__(self, contract, executor=None):
+        self._contract = contract._contract
+        self._wrapped = contract
+        self._executor = executor
+
+    def __getattr__(self, name):
+        method = getattr(self._wrapped, name)
+
+        @functools.wraps(method)
+        def wrapper(*args):
+            return AsyncContractFunction(method(*args), self._executor)
+
+        return wrapper
+
+
+@attr.s(auto_attribs=True)
+class AsyncChannel:
+    """Same interface and exceptions as `Channel` but with coroutines.
+
+    Uses the wrapped channel's `replica` and `preimage_queue` like `Channel`.
+    """
+
+    channel: Channel
+    executor: object = None
+
+    def __attrs_post_init__(self):
+        self.web3 = self.channel.web3
+        self.channel_id = self.channel.channel_id
+        self.registry = AsyncContract(self.channel.registry, self.executor)
+        self.preimage_manager = AsyncContract(
+            self.channel.preimage_manager, self.executor
+        )
+
+    async def _transact(self, function, tx_args):
+        tx_hash = await function.transact(tx_args)
+        return await check_tx(self.web3, tx_hash, self.executor)
+
+    def _invalidate_replica(self):
+        self.channel._invalidate_replica()
+
+    async def deposit(self, sender, amount, token=None):
+        token = AsyncContract(token or self.channel.token, self.executor)
+        tx_args = {"from": sender.address, "gas": GAS}
+
+        registry_address = self.channel.registry._contract.address
+        await self._transact(token.approve(registry_address, amount), tx_args)
+
+        receipt = await self._transact(
+            self.registry.deposit(self.channel_id, amount), tx_args
+        )
+        self._invalidate_replica()
+        return receipt
+
+    async def get_deposit(self, who=None, side=None):
+        who = who or getattr(self.channel, side)
+        return await self.registry.getDeposit(self.channel_id).call(
+            {"from": who.address}
+        )
+
+    async def get_status(self):
+        return await self.registry.getStatus(self.channel_id).call()
+
+    async def get_deadline(self):
+        return await self.registry.getDeadline(self.channel_id).call()
+
+    async def get_withdrawn(self, who):
+        return await self.registry.getWithdrawn(self.channel_id).call(
+            {"from": who.address}
+        )
+
+    async def withdraw(self, who=None, side=None):
+        who = who or getattr(self.channel, side)
+        await self._transact(
+            self.registry.withdraw(self.channel_id), {"from": who.address, "gas": GAS}
+        )
+
+    async def trigger(self, who=None, side=None):
+        who = who or getattr(self.channel, side)
+        await self._transact(
+            self.registry.trigger(self.channel_id), {"from": who.address, "gas": GAS}
+        )
+        self._invalidate_replica()
+
+    async def finalize(self, who=None, side=None):
+        who = who or getattr(self.channel, side)
+        await self._transact(
+            self.registry.finalize(self.channel_id), {"from": who.address, "gas": GAS}
+        )
+        self._invalidate_replica()
+
+    async def get_state(self, who):
+        state = await self.registry.getState(self.channel_id).call(
+            {"from": who.address}
+        )
+        return ChannelState.from_contract(self.channel_id, state)
+
+    async def conditional_payment(self, sender, recipient, amount, preimage):
+        replica = self.channel.replica
+        if replica is None:
+            channel_state, block_number = await asyncio.gather(
+                self.get_state(sender),
+                _run(self.executor, getattr, self.web3.eth, "blockNumber"),
+            )
+        else:
+            # syncing a stale replica makes requests, like `Channel` the
+            # expiry is based on the replica's block
+            channel_state = await _run(self.executor, replica.get_state, sender)
+            block_number = replica.synced_block
+        new_state = channel_state.conditional_payment(
+            amount=amount,
+            recipient=recipient,
+            expiry=block_number + DELTA,
+            preimage=preimage,
+        )
+        return new_state.sign(private_key=sender.privateKey)
+
+    async def update(self, who, args, check=False):
+        log.debug("updating state %s %s", who, args)
+        call = self.registry.update(*args)
+        tx_args = {"from": who.address, "gas": GAS}
+
+        if check:
+            try:
+                await call.call(tx_args)
+            except BadFunctionCallOutput as exc:
+                raise TransactionFailed from exc
+
+        await self._transact(call, tx_args)
+        self._invalidate_replica()
+
+    async def submit_preimage(self, who, preimage):
+        """Reveal `preimage`, with a queue only return its receipt's future."""
+        if self.channel.preimage_queue is not None:
+            log.debug("queueing preimage %s", preimage)
+            return asyncio.wrap_future(self.channel.preimage_queue.add(preimage))
+        log.debug("submitting preimage %s", preimage)
+        await self._transact(
+            self.preimage_manager.submitPreimage(preimage),
+            {"from": who.address, "gas": GAS},
+        )
@@ -0,0 +1,234 @@
+"""Bulk reads of many channels, with JSON-RPC batches or `getStates`, and
+batched dispute updates with `updateMany`."""
+import json
+import logging
+
+from eth_abi import decode_abi
+from eth_abi.exceptions import DecodingError
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3 import HTTPProvider
+from web3.exceptions import BadFunctionCallOutput
+from web3.utils.abi import get_abi_output_types, map_abi_data
+from web3.utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3.utils.request import make_post_request
+
+from .channel import GAS, ChannelState, Payment
+from .events import decode_log
+from .util import MAX_PAYMENTS, check_txs, chunked
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+# channels per `getStates` call, keeps the response size and gas bounded
+PAGE_SIZE = 200
+# words per channel returned by `SpritesRegistry.getStates`
+STATE_WORDS = 7 + 4 * MAX_PAYMENTS
+# words per update of `SpritesRegistry.updateMany`
+UPDATE_WORDS = 9 + 4 * MAX_PAYMENTS
+# Gas bounds of `updateMany`. An update writes at most every payment word,
+# both players' credit and withdrawal and the round, in the worst case each
+# going from zero to non-zero. Its calldata is at most 68 gas per byte, the
+# allowance covers the signature check, storage reads and decoding.
+SSTORE_SET_GAS = 20_000
+CALLDATA_BYTE_GAS = 68
+UPDATE_STORAGE_WORDS = 4 * MAX_PAYMENTS + 5
+UPDATE_GAS = (
+    UPDATE_STORAGE_WORDS * SSTORE_SET_GAS
+    + UPDATE_WORDS * 32 * CALLDATA_BYTE_GAS
+    + 20_000
+)
+UPDATE_MANY_GAS = 30_000
+
+# field -> (registry function, whether the result depends on msg.sender)
+READERS = {
+    "state": ("getState", True),
+    "deposit": ("getDeposit", True),
+    "status": ("getStatus", False),
+    "deadline": ("getDeadline", False),
+    "withdrawn": ("getWithdrawn", True),
+}
+FIELDS = list(READERS)
+
+
+def decode_call_result(function, return_data):
+    """Decode `eth_call` output of a contract function like `call` does."""
+    output_types = get_abi_output_types(function.abi)
+    try:
+        output_data = decode_abi(output_types, HexBytes(return_data))
+    except DecodingError as exc:
+        raise BadFunctionCallOutput(
+            f"Could not decode {function.fn_name} return data {return_data}"
+        ) from exc
+    normalized_data = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, output_data)
+    return normalized_data[0] if len(normalized_data) == 1 else normalized_data
+
+
+class BatchReader:
+    """Reads channel fields with one HTTP request per `batch_size` calls.
+
+    Providers other than `HTTPProvider` don't support batches, for those
+    the calls are made one by one.
+    """
+
+    def __init__(self, web3, batch_size=BATCH_SIZE):
+        self.web3 = web3
+        self.batch_size = batch_size
+
+    def _calls(self, channels, fields, who):
+        for index, channel in enumerate(channels):
+            sender = who or channel.left
+            for field in fields:
+                name, needs_sender = READERS[field]
+                function = getattr(channel.registry, name)(channel.channel_id)
+                transaction = {
+                    "to": channel.registry._contract.address,
+                    "data": function._encode_transaction_data(),
+                }
+                if needs_sender:
+                    transaction["from"] = sender.address
+                yield index, field, function, transaction
+
+    def _batch_call(self, transactions):
+        provider = self.web3.providers[0]
+        if not isinstance(provider, HTTPProvider):
+            return [self.web3.eth.call(transaction) for transaction in transactions]
+
+        request = [
+            {"jsonrpc": "2.0", "id": i, "method": "eth_call", "params": [tx, "latest"]}
+            for i, tx in enumerate(transactions)
+        ]
+        raw_response = make_post_request(
+            provider.endpoint_uri,
+            json.dumps(request).encode(),
+            **provider.get_request_kwargs(),
+        )
+        responses = sorted(json.loads(raw_response), key=lambda r: r["id"])
+        for response in responses:
+            if "error" in response:
+                raise ValueError(response["error"])
+        return [response["result"] for response in responses]
+
+    def read(self, channels, fields=FIELDS, who=None):
+        """Return one dict per channel mapping field names to values.
+
+        `state` is decoded into a `ChannelState` like `Channel.get_state`.
+        Fields that depend on the caller are read from the perspective of
+        `who`, by default the `left` party of each channel.
+        """
+        channels = list(channels)
+        unknown = set(fields) - set(READERS)
+        if unknown:
+            raise ValueError(f"unknown fields {sorted(unknown)}, use {FIELDS}")
+
+        results = [{} for _ in channels]
+        calls = list(self._calls(channels, fields, who))
+        for batch in chunked(calls, self.batch_size):
+            log.debug("reading batch of %s calls", len(batch))
+            return_data = self._batch_call([tx for *_, tx in batch])
+            for (index, field, function, _), data in zip(batch, return_data):
+                value = decode_call_result(function, data)
+                if field == "state":
+                    channel_id = channels[index].channel_id
+                    value = ChannelState.from_contract(channel_id, value)
+                results[index][field] = value
+
+        return results
+
+
+def _signed(word):
+    return word - (1 << 256) if word >> 255 else word
+
+
+def state_from_words(channel_id, words):
+    """Decode one channel's words from `SpritesRegistry.getStates`."""
+    deposits = tuple(words[0:2])
+    credits = (_signed(words[2]), _signed(words[3]))
+    withdrawals = tuple(words[4:6])
+    # all preimage hashes, then all recipients, amounts and expiries
+    payments = []
+    for slot in range(MAX_PAYMENTS):
+        start = 7 + slot
+        preimage_hash, recipient, amount, expiry = words[start::MAX_PAYMENTS]
+        payments.append(
+            Payment.trusted(
+                preimage_hash.to_bytes(32, "big"),
+                to_checksum_address(recipient.to_bytes(32, "big")[-20:]),
+                amount,
+                expiry,
+            )
+        )
+    return ChannelState.trusted(
+        channel_id, deposits, credits, withdrawals, _signed(words[6]), tuple(payments)
+    )
+
+
+def get_states(registry, channel_ids, perspective, page_size=PAGE_SIZE):
+    """Read the states of many channels with one `getStates` call per page.
+
+    Unlike `Channel.get_state` the caller needs not be a player, states are
+    in the perspective of the address `perspective` (or of the left player
+    of channels where `perspective` doesn't play).
+    """
+    states = []
+    for page in chunked(list(channel_ids), page_size):
+        words = registry.getStates(page, perspective).call()
+        for index, channel_id in enumerate(page):
+            start = index * STATE_WORDS
+            end = start + STATE_WORDS
+            states.append(state_from_words(channel_id, words[start:end]))
+    return states
+
+
+def _word(value):
+    if isinstance(value, bytes):
+        return int.from_bytes(value, "big")
+    if isinstance(value, str):
+        return int(value, 16)
+    # two's complement of negative credits and rounds
+    return value % (1 << 256)
+
+
+def update_words(signed_state):
+    """The `update` arguments of `signed_state` flattened for `updateMany`."""
+    words = []
+    for argument in signed_state.state_update_arguments():
+        if isinstance(argument, (tuple, list)):
+            words.extend(map(_word, argument))
+        else:
+            words.append(_word(argument))
+    return words
+
+
+def pack_updates(signed_states, gas_limit=GAS, update_gas=UPDATE_GAS):
+    """Split updates into `updateMany` words of at most `gas_limit` gas each."""
+    per_batch = (gas_limit - UPDATE_MANY_GAS) // update_gas
+    if per_batch < 1:
+        raise ValueError(f"gas limit {gas_limit} too low for one update")
+    for batch in chunked(list(signed_states), per_batch):
+        yield [word for signed_state in batch for word in update_words(signed_state)]
+
+
+def update_many(
+    web3, registry, signed_states, sender, gas_limit=GAS, update_gas=UPDATE_GAS
+):
+    """Submit the updates with one `updateMany` transaction per batch.
+
+    Like for `Channel.update` the states are signed by the counterparty of
+    `sender` in each channel. The contract skips invalid updates, returns the
+    ids of the channels that were updated.
+    """
+    tx_hashes = []
+    for words in pack_updates(signed_states, gas_limit, update_gas):
+        gas = UPDATE_MANY_GAS + len(words) // UPDATE_WORDS * update_gas
+        call = registry.updateMany(words)
+        tx_hashes.append(call.transact({"from": sender, "gas": gas}))
+    log.debug("submitted %s updateMany transactions", len(tx_hashes))
+
+    receipts = check_txs(web3, tx_hashes)
+    events = (decode_log(entry) for receipt in receipts for entry in receipt.logs)
+    return [
+        event.channel_id
+        for event in events
+        if event is not None and event.name == "EventUpdate"
+    ]
@@ -0,0 +1,169 @@
+"""Calldata encoding without web3's function lookup and argument normalization.
+
+Wrappers generated with ``python_code_gen --fast`` hold one `Function` per
+contract function: its 4-byte selector as a literal and an encoder built
+once from the argument types. Elementary types, fixed size arrays and
+dynamic arrays of static types are encoded word by word, other types (e. g.
+``bytes``) fall back to `eth_abi.encode_abi`.
+"""
+import re
+
+from eth_abi import encode_abi
+from eth_utils import decode_hex
+
+WORD_SIZE = 32
+ARRAY = re.compile(r"^(.+)\[(\d*)\]$")
+# `<type><bits>` of the elementary types with a size
+SIZED = re.compile(r"^(uint|int|bytes)(\d+)$")
+
+
+def _uint_encoder(bits):
+    def encode(value):
+        if value < 0 or value >> bits:
+            raise ValueError(f"{value} out of range for uint{bits}")
+        return value.to_bytes(WORD_SIZE, "big")
+
+    return encode
+
+
+def _int_encoder(bits):
+    bound = 1 << (bits - 1)
+
+    def encode(value):
+        if not -bound <= value < bound:
+            raise ValueError(f"{value} out of range for int{bits}")
+        return value.to_bytes(WORD_SIZE, "big", signed=True)
+
+    return encode
+
+
+def _bytes_encoder(size):
+    def encode(value):
+        value = bytes(value)
+        if len(value) > size:
+            raise ValueError(f"{len(value)} bytes are too long for bytes{size}")
+        return value.ljust(WORD_SIZE, b"\0")
+
+    return encode
+
+
+def _encode_address(value):
+    address = decode_hex(value)
+    if len(address) != 20:
+        raise ValueError(f"not an address: {value!r}")
+    return address.rjust(WORD_SIZE, b"\0")
+
+
+def _encode_bool(value):
+    if not isinstance(value, bool):
+        raise TypeError(f"not a bool: {value!r}")
+    return value.to_bytes(WORD_SIZE, "big")
+
+
+def _elementary_encoder(type_str):
+    """Encoder of a single word type, or None."""
+    if type_str == "address":
+        return _encode_address
+    if type_str == "bool":
+        return _encode_bool
+    match = SIZED.match(type_str)
+    if match is None:
+        return None
+    kind, size = match.group(1), int(match.group(2))
+    if kind == "uint":
+        return _uint_encoder(size)
+    if kind == "int":
+        return _int_encoder(size)
+    return _bytes_encoder(size)
+
+
+def _array_encoder(element, length):
+    def encode(values):
+        if len(values) != length:
+            raise ValueError(f"expected {length} values, got {len(values)}")
+        return b"".join(map(element, values))
+
+    return encode
+
+
+def _dynamic_array_encoder(element):
+    def encode(values):
+        return len(values).to_bytes(WORD_SIZE, "big") + b"".join(map(element, values))
+
+    return encode
+
+
+def _static_encoder(type_str):
+    """Encoder of a static type (elementary or fixed size array), or None."""
+    match = ARRAY.match(type_str)
+    if match is None:
+        return _elementary_encoder(type_str)
+    base, length = match.groups()
+    element = _static_encoder(base)
+    if element is None or not length:
+        return None
+    return _array_encoder(element, int(length))
+
+
+def _head_words(type_str):
+    match = ARRAY.match(type_str)
+    if match is None:
+        return 1
+    base, length = match.groups()
+    return int(length) * _head_words(base) if length else 1
+
+
+def encoder(types):
+    """Function encoding the arguments of `types`, a tuple, without selector."""
+    types = list(types)
+    parts = []
+    for type_str in types:
+        static = _static_encoder(type_str)
+        if static is not None:
+            parts.append((static, False))
+            continue
+        match = ARRAY.match(type_str)
+        element = _static_encoder(match.group(1)) if match else None
+        if element is None or match.group(2):
+            # bytes, string, nested dynamic types or tuples
+            return lambda args: encode_abi(types, args)
+        parts.append((_dynamic_array_encoder(element), True))
+
+    if not any(dynamic for _, dynamic in parts):
+        encoders = [encode for encode, _ in parts]
+
+        def encode_static(args):
+            return b"".join([encode(arg) for encode, arg in zip(encoders, args)])
+
+        return encode_static
+
+    head_size = WORD_SIZE * sum(map(_head_words, types))
+
+    def encode_dynamic(args):
+        head, tail = [], []
+        offset = head_size
+        for (encode, dynamic), arg in zip(parts, args):
+            data = encode(arg)
+            if dynamic:
+                head.append(offset.to_bytes(WORD_SIZE, "big"))
+                tail.append(data)
+                offset += len(data)
+            else:
+                head.append(data)
+        return b"".join(head + tail)
+
+    return encode_dynamic
+
+
+class Function:
+    """Selector and argument encoder of one contract function."""
+
+    def __init__(self, selector, types):
+        self.selector = decode_hex(selector)
+        self.types = list(types)
+        self._encode = encoder(self.types)
+
+    def encode(self, *args):
+        if len(args) != len(self.types):
+            raise TypeError(f"expected {len(self.types)} arguments, got {len(args)}")
+        return self.selector + self._encode(args)
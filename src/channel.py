@@ -1,17 +1,18 @@
-import copy
 import logging
-from typing import Dict, List
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
 import attr
 from attr.validators import instance_of
-from eth_account import Account
 from eth_utils import keccak
 from web3 import Web3
 from web3.exceptions import BadFunctionCallOutput
 
+from .cache import LRUCache
 from .contracts.dappsys import DSToken
 from .contracts.PreimageManager import PreimageManager
 from .contracts.SpritesRegistry import SpritesRegistry
+from .signer import recover_hash
 from .exceptions import (
     BadSignature,
     ForbiddenStateChange,
@@ -22,18 +23,20 @@ from .exceptions import (
 from .util import (
     COMMANDS,
     DELTA,
+    MAX_PAYMENTS,
     ZERO_ADDRESS,
     ZERO_PREIMAGE_HASH,
     TransactionFailed,
     check_tx,
-    hash_message,
-    pack,
+    chunked,
+    hash_state_message,
     sign,
 )
 
 log = logging.getLogger(__name__)
 
 GAS = 4_000_000
+VERIFY_CHUNK_SIZE = 256
 
 # XXX If this is changed in contract need to update here.
 # TODO get it from SpritesRegistry signature directly.
@@ -43,18 +46,52 @@ UPDATE_ARGUMENTS = [
     "credits",
     "withdrawals",
     "round",
-    "preimage_hash",
-    "recipient",
-    "amount",
-    "expiry",
+    "preimage_hashes",
+    "recipients",
+    "amounts",
+    "expiries",
 ]
 MESSAGE_INPUTS = [arg for arg in UPDATE_ARGUMENTS if arg != "sig"]
 
 
-@attr.s
+def _make_trusted_constructor(cls):
+    # Generated once per class: sets the slots directly, without running the
+    # converters and validators of the attrs generated __init__.
+    fields = attr.fields(cls)
+    namespace = {"new": object.__new__}
+    for field in fields:
+        namespace[f"default_{field.name}"] = field.default
+        namespace[f"set_{field.name}"] = getattr(cls, field.name).__set__
+
+    arguments = ", ".join(f"{field.name}=default_{field.name}" for field in fields)
+    lines = [f"def trusted(cls, {arguments}):", "    instance = new(cls)"]
+    lines += [f"    set_{field.name}(instance, {field.name})" for field in fields]
+    lines += ["    return instance"]
+
+    exec("\n".join(lines), namespace)
+    return namespace["trusted"]
+
+
+_TRUSTED_CONSTRUCTORS = {}
+
+
+@attr.s(slots=True)
 class Base:
     def to(self, *args, **kwargs):
-        return attr.evolve(copy.deepcopy(self), *args, **kwargs)
+        return attr.evolve(self, *args, **kwargs)
+
+    @classmethod
+    def trusted(cls, *args, **kwargs):
+        """Create an instance without running converters and validators.
+
+        Only use this for values that already have the right types, e. g. the
+        output of contract calls or of other (validated) instances.
+        """
+        try:
+            constructor = _TRUSTED_CONSTRUCTORS[cls]
+        except KeyError:
+            constructor = _TRUSTED_CONSTRUCTORS[cls] = _make_trusted_constructor(cls)
+        return constructor(cls, *args, **kwargs)
 
 
 @attr.s(auto_attribs=True)
@@ -67,6 +104,14 @@ class Channel(Base):
     channel_id: int
     left: str
     right: str
+    # optional `replica.ChannelReplica` used instead of reading the chain
+    replica: object = attr.ib(default=None, repr=False, cmp=False)
+    # optional `preimages.PreimageQueue` shared with other channels
+    preimage_queue: object = attr.ib(default=None, repr=False, cmp=False)
+
+    def _invalidate_replica(self):
+        if self.replica is not None:
+            self.replica.stale = True
 
     def deposit(self, sender, amount, token=None):
 
@@ -82,6 +127,7 @@ class Channel(Base):
         # can we inject the tx arguments instead?
         tx_hash = self.registry.deposit(self.channel_id, amount).transact(tx_args)
         receipt = check_tx(self.web3, tx_hash)
+        self._invalidate_replica()
 
         return receipt
 
@@ -113,6 +159,7 @@ class Channel(Base):
             {"from": who.address, "gas": GAS}
         )
         check_tx(self.web3, tx_hash)
+        self._invalidate_replica()
 
     def finalize(self, who=None, side=None):
         who = who or getattr(self, side)
@@ -120,17 +167,23 @@ class Channel(Base):
             {"from": who.address, "gas": GAS}
         )
         check_tx(self.web3, tx_hash)
+        self._invalidate_replica()
 
     def get_state(self, who):
         state = self.registry.getState(self.channel_id).call({"from": who.address})
-        payment = Payment(*state[-4:])
-        channel_state = ChannelState(self.channel_id, *state[:-4], payment=payment)
-        return channel_state
+        return ChannelState.from_contract(self.channel_id, state)
 
     def conditional_payment(self, sender, recipient, amount, preimage):
         # create new desired channel state
-        channel_state = self.get_state(sender)
-        expiry = self.web3.eth.blockNumber + DELTA
+        if self.replica is None:
+            channel_state = self.get_state(sender)
+            block_number = self.web3.eth.blockNumber
+        else:
+            # the replica's block lags by at most its max age, this makes the
+            # expiry earlier, never later
+            channel_state = self.replica.get_state(sender)
+            block_number = self.replica.synced_block
+        expiry = block_number + DELTA
         new_state = channel_state.conditional_payment(
             amount=amount, recipient=recipient, expiry=expiry, preimage=preimage
         )
@@ -150,15 +203,20 @@ class Channel(Base):
 
         tx_hash = call.transact(tx_args)
         check_tx(self.web3, tx_hash)
+        self._invalidate_replica()
 
     def submit_preimage(self, who, preimage):
+        """Reveal `preimage`, with a queue only return its receipt's future."""
+        if self.preimage_queue is not None:
+            log.debug("queueing preimage %s", preimage)
+            return self.preimage_queue.add(preimage)
         log.debug("submitting preimage %s", preimage)
         tx_args = {"from": who.address, "gas": GAS}
         tx_hash = self.preimage_manager.submitPreimage(preimage).transact(tx_args)
         check_tx(self.web3, tx_hash)
 
 
-@attr.s
+@attr.s(slots=True, frozen=True)
 class Payment(Base):
     preimage_hash = attr.ib(
         converter=bytes, validator=instance_of(bytes), default=ZERO_PREIMAGE_HASH
@@ -168,25 +226,93 @@ class Payment(Base):
     expiry = attr.ib(validator=instance_of(int), default=0)
     command = attr.ib(default=None)
 
-    def channel_state_update_arguments(self):
-        return {
-            k: v for k, v in attr.asdict(self).items() if k in set(UPDATE_ARGUMENTS)
-        }
+    def same_as(self, other):
+        """Equality of the signed fields, ignoring the command."""
+        return (
+            self.amount == other.amount
+            and self.preimage_hash == other.preimage_hash
+            and self.recipient == other.recipient
+            and self.expiry == other.expiry
+        )
 
 
-@attr.s
+EMPTY_PAYMENTS = (Payment(),) * MAX_PAYMENTS
+
+
+def _pad_payments(payments):
+    payments = tuple(payments)
+    count = len(payments)
+    if count > MAX_PAYMENTS:
+        raise ValueError(f"at most {MAX_PAYMENTS} payments, got {count}")
+    return payments + EMPTY_PAYMENTS[count:]
+
+
+def _check_payments(instance, attribute, payments):
+    for payment in payments:
+        if not isinstance(payment, Payment):
+            raise TypeError(f"{attribute.name} must be Payments, got {payment!r}")
+
+
+@attr.s(slots=True, frozen=True)
 class ChannelState(Base):
+    # Instances are immutable, derived states share unchanged members
+    # (e. g. the payment or the two-element tuples) with their parent.
     channel_id = attr.ib(validator=instance_of(int), default=0)
-    deposits = attr.ib(validator=instance_of(list), default=[0, 0])
-    credits = attr.ib(validator=instance_of(list), default=[0, 0])
-    withdrawals = attr.ib(validator=instance_of(list), default=[0, 0])
+    deposits = attr.ib(converter=tuple, validator=instance_of(tuple), default=(0, 0))
+    credits = attr.ib(converter=tuple, validator=instance_of(tuple), default=(0, 0))
+    withdrawals = attr.ib(converter=tuple, validator=instance_of(tuple), default=(0, 0))
     round = attr.ib(validator=instance_of(int), default=0)
-    payment = attr.ib(validator=instance_of(Payment), default=Payment())
+    # MAX_PAYMENTS slots of concurrent conditional payments, shorter
+    # sequences are padded with empty slots
+    payments = attr.ib(
+        converter=_pad_payments, validator=_check_payments, default=EMPTY_PAYMENTS
+    )
+
+    # Opt-in cache of message hashes keyed by the message inputs,
+    # see `enable_hash_cache`.
+    _hash_cache = None
+
+    @staticmethod
+    def enable_hash_cache(maxsize):
+        ChannelState._hash_cache = LRUCache(maxsize)
+        return ChannelState._hash_cache
+
+    @staticmethod
+    def disable_hash_cache():
+        ChannelState._hash_cache = None
+
+    @classmethod
+    def from_contract(cls, channel_id, state):
+        """Decode the return values of `SpritesRegistry.getState`."""
+        deposits, credits, withdrawals, round = state[:-4]
+        payments = tuple(map(Payment.trusted, *state[-4:]))
+        return cls.trusted(
+            channel_id,
+            tuple(deposits),
+            tuple(credits),
+            tuple(withdrawals),
+            round,
+            payments,
+        )
+
+    def payment_arguments(self):
+        """The payment slots as the contract takes them, one tuple per field."""
+        payments = self.payments
+        return (
+            tuple(payment.preimage_hash for payment in payments),
+            tuple(payment.recipient for payment in payments),
+            tuple(payment.amount for payment in payments),
+            tuple(payment.expiry for payment in payments),
+        )
 
     def state_data(self):
+        preimage_hashes, recipients, amounts, expiries = self.payment_arguments()
         return {
             **self.channel_state_update_arguments(),
-            **self.payment.channel_state_update_arguments(),
+            "preimage_hashes": preimage_hashes,
+            "recipients": recipients,
+            "amounts": amounts,
+            "expiries": expiries,
         }
 
     def to_other(self):
@@ -205,35 +331,112 @@ class ChannelState(Base):
             k: v for k, v in attr.asdict(self).items() if k in set(UPDATE_ARGUMENTS)
         }
 
+    def message_inputs(self):
+        return (
+            self.channel_id,
+            self.credits,
+            self.withdrawals,
+            self.round,
+            *self.payment_arguments(),
+        )
+
     def message_hash(self):
-        state_data = self.state_data()
-        message_parts = (state_data[k] for k in MESSAGE_INPUTS)
-        return hash_message(pack(message_parts))
+        message_inputs = self.message_inputs()
+        cache = ChannelState._hash_cache
+        if cache is None:
+            return hash_state_message(*message_inputs)
+        return cache.get_or_compute(message_inputs, hash_state_message, *message_inputs)
 
     def sign(self, private_key):
         log.debug("signing %s", self)
         signature = sign(self.message_hash(), private_key)
-        sig = [signature.v, signature.r, signature.s]
-        return SignedState(sig=sig, **attr.asdict(self, recurse=False))
+        sig = (signature.v, signature.r, signature.s)
+        return SignedState.trusted(sig=sig, **attr.asdict(self, recurse=False))
 
     def make_payment(self, amount, recipient, expiry, preimage):
         preimage_hash = keccak(preimage)
         return Payment(preimage_hash, recipient, amount, expiry)
 
+    def pending_slots(self):
+        return [slot for slot, payment in enumerate(self.payments) if payment.amount]
+
+    def _pending_slot(self, slot):
+        if slot is None:
+            pending = self.pending_slots()
+            if len(pending) != 1:
+                raise PaymentError(f"{len(pending)} payments pending, pass the slot")
+            return pending[0]
+        if not self.payments[slot].amount:
+            raise PaymentError(f"No payment in slot {slot}")
+        return slot
+
+    def _with_payment(self, slot, payment):
+        payments = self.payments
+        end = slot + 1
+        return payments[:slot] + (payment,) + payments[end:]
+
     def conditional_payment(self, recipient, amount, expiry, preimage):
+        """Open a payment in the first free slot."""
         log.debug("adding payment %s to %s", amount, recipient)
-        # XXX need to reserve credits for payment
+        payments = self.payments
+        free = [slot for slot in range(MAX_PAYMENTS) if not payments[slot].amount]
+        if not free:
+            raise PaymentError(f"All {MAX_PAYMENTS} payment slots in use")
         payment = self.make_payment(amount, recipient, expiry, preimage)
-        new_credits = [self.credits[0] - amount, self.credits[1]]
-        new_state = self.to(payment=payment, round=self.round + 1, credits=new_credits)
-        return new_state
+        new_credits = (self.credits[0] - amount, self.credits[1])
+        return self.to(
+            payments=self._with_payment(free[0], payment),
+            round=self.round + 1,
+            credits=new_credits,
+        )
 
-    def complete_payment(self):
-        log.debug("completing payment %s", self.payment)
-        # credit current payment to other party
-        credits = [self.credits[0], self.credits[1] + self.payment.amount]
-        # reset pending payment
-        return self.evolve(credits=credits, payment=Payment())
+    def complete_payment(self, slot=None):
+        """Complete the payment in `slot`, by default the only pending one."""
+        slot = self._pending_slot(slot)
+        payment = self.payments[slot]
+        log.debug("completing payment %s", payment)
+        # credit the payment to other party
+        credits = (self.credits[0], self.credits[1] + payment.amount)
+        # reset the slot
+        payments = self._with_payment(slot, Payment())
+        return self.to(credits=credits, payments=payments, round=self.round + 1)
+
+    def cancel_payment(self, slot=None):
+        slot = self._pending_slot(slot)
+        payment = self.payments[slot]
+        log.debug("cancelling payment %s", payment)
+        # return the reserved credits
+        credits = (self.credits[0] + payment.amount, self.credits[1])
+        payments = self._with_payment(slot, Payment())
+        return self.to(credits=credits, payments=payments, round=self.round + 1)
+
+    def changed_slot(self, new_state):
+        """The only payment slot `new_state` changes, commands don't count."""
+        changed = [
+            slot
+            for slot, (old, new) in enumerate(zip(self.payments, new_state.payments))
+            if not old.same_as(new)
+        ]
+        if len(changed) != 1:
+            raise PaymentError(f"Expected one payment to change, got {len(changed)}")
+        return changed[0]
+
+    def command(self):
+        """`(slot, command)` of the slot carrying a command, or `(None, None)`."""
+        for slot, payment in enumerate(self.payments):
+            if payment.command is not None:
+                return slot, payment.command
+        return None, None
+
+    def with_command(self, slot, command):
+        """Set the command of `slot` and clear the others."""
+        payments = []
+        for index, payment in enumerate(self.payments):
+            wanted = command if index == slot else None
+            if payment.command != wanted:
+                payment = payment.to(command=wanted)
+            payments.append(payment)
+        return self.to(payments=payments)
 
     def _check_credit(self, new_state):
 
@@ -271,10 +474,16 @@ class ChannelState(Base):
         if new_state.round <= self.round:
             raise PaymentError(f"Round not advanced")
 
-    def _validate_open(self, new_state):
+    def _check_recipient(self, payment, recipient):
+        if recipient is not None and payment.recipient != recipient:
+            raise PaymentError(f"Payment is to {payment.recipient}, not {recipient}")
+
+    def _validate_open(self, new_state, recipient=None):
 
-        new_amount = new_state.payment.amount
-        old_amount = self.payment.amount
+        slot = self.changed_slot(new_state)
+        new_amount = new_state.payments[slot].amount
+        old_amount = self.payments[slot].amount
+        self._check_recipient(new_state.payments[slot], recipient)
 
         if old_amount != 0:
             raise PaymentError(f"Payment already in process")
@@ -288,13 +497,20 @@ class ChannelState(Base):
                 f"credit={self.credits[0]}"
             )
 
-        elif new_state.credits[0] != self.credits[0] - new_state.payment.amount:
+        elif new_state.credits[0] != self.credits[0] - new_amount:
             raise PaymentError("Credits for payment not correctly reserved")
 
-    def _validate_complete(self, new_state):
+        elif new_state.credits[1] != self.credits[1]:
+            raise PaymentError("Recipient credits changed")
+
+        self._check_unchanged(new_state, ["deposits", "withdrawals"])
+
+    def _validate_complete(self, new_state, recipient=None):
 
-        new_amount = new_state.payment.amount
-        old_amount = self.payment.amount
+        slot = self.changed_slot(new_state)
+        new_amount = new_state.payments[slot].amount
+        old_amount = self.payments[slot].amount
+        self._check_recipient(self.payments[slot], recipient)
 
         if old_amount == 0:
             raise PaymentError(f"No payment to complete")
@@ -310,10 +526,12 @@ class ChannelState(Base):
 
         self._check_unchanged(new_state, ["deposits", "withdrawals"])
 
-    def _validate_cancel(self, new_state):
+    def _validate_cancel(self, new_state, recipient=None):
 
-        new_amount = new_state.payment.amount
-        old_amount = self.payment.amount
+        slot = self.changed_slot(new_state)
+        new_amount = new_state.payments[slot].amount
+        old_amount = self.payments[slot].amount
+        self._check_recipient(self.payments[slot], recipient)
 
         if old_amount == 0:
             raise PaymentError(f"No payment to cancel")
@@ -324,6 +542,11 @@ class ChannelState(Base):
         if self.credits[0] + old_amount != new_state.credits[0]:
             raise PaymentError(f"Payment amount wrongly credited")
 
+        elif self.credits[1] != new_state.credits[1]:
+            raise PaymentError("Recipient credits changed")
+
+        self._check_unchanged(new_state, ["deposits", "withdrawals"])
+
     def _check_unchanged(self, new_state, attributes):
         for attribute in attributes:
             if getattr(self, attribute) != getattr(new_state, attribute):
@@ -333,8 +556,16 @@ class ChannelState(Base):
         self._check_credit(new_state)
         self._check_deposit(new_state)
         self._check_withdrawal(new_state)
+        for old, new in zip(self.payments, new_state.payments):
+            if not old.same_as(new):
+                raise ForbiddenStateChange("Payments changed")
 
-    def validate(self, new_state, command=None):
+    def validate(self, new_state, command=None, recipient=None):
+        """Check the transition to `new_state`, in the proposer's perspective.
+
+        With a `recipient` the payment the command applies to must be to it,
+        the proposer only opens, completes and cancels its own payments.
+        """
 
         self._check_round_number(new_state)
 
@@ -342,24 +573,37 @@ class ChannelState(Base):
             raise ValueError(f"command {command} not in {COMMANDS} (or None)")
 
         if command == "open":
-            self._validate_open(new_state)
+            self._validate_open(new_state, recipient)
         elif command == "complete":
-            self._validate_complete(new_state)
+            self._validate_complete(new_state, recipient)
         elif command == "cancel":
-            self._validate_cancel(new_state)
+            self._validate_cancel(new_state, recipient)
         else:
             # non-commands simply update the state?
             self._validate_update(new_state)
 
 
-@attr.s
+@attr.s(slots=True, frozen=True)
 class SignedState(ChannelState):
     # XXX don't want default here, but can't have mandatory attributes
     # after optional ones.
-    sig = attr.ib(validator=instance_of(list), default=None)
+    sig = attr.ib(converter=tuple, validator=instance_of(tuple), default=None)
+
+    # Opt-in cache of recovered addresses keyed by (message hash, sig),
+    # see `enable_address_cache`.
+    _address_cache = None
+
+    @staticmethod
+    def enable_address_cache(maxsize):
+        SignedState._address_cache = LRUCache(maxsize)
+        return SignedState._address_cache
+
+    @staticmethod
+    def disable_address_cache():
+        SignedState._address_cache = None
 
     def to_unsigned(self) -> ChannelState:
-        return ChannelState(
+        return ChannelState.trusted(
             **attr.asdict(
                 self, recurse=False, filter=lambda attribute, _: attribute.name != "sig"
             )
@@ -367,21 +611,205 @@ class SignedState(ChannelState):
 
     def recover_address(self):
         msg_hash = self.message_hash()
-        return Account.recoverHash(msg_hash, vrs=self.sig)
+        cache = SignedState._address_cache
+        if cache is None:
+            return recover_hash(msg_hash, self.sig)
+        key = (bytes(msg_hash), self.sig)
+        return cache.get_or_compute(key, recover_hash, msg_hash, self.sig)
 
     def verify_signature(self, address):
         if self.recover_address() != address:
             raise BadSignature("Recovered address incorrect")
 
 
-@attr.s(auto_attribs=True)
+def _verify_chunk(chunk):
+    results = []
+    for signed_state, address in chunk:
+        try:
+            signed_state.verify_signature(address)
+        except Exception as exc:  # report per state, don't stop the batch
+            results.append(exc)
+        else:
+            results.append(None)
+    return results
+
+
+def verify_many(
+    signed_states,
+    expected_addresses,
+    executor=None,
+    max_workers=None,
+    chunk_size=VERIFY_CHUNK_SIZE,
+):
+    """Verify the signatures of many states, in chunks on a process pool.
+
+    Returns one entry per state: `None` if it was signed by the expected
+    address, the raised exception (usually `BadSignature`) otherwise.
+
+    Pass an `executor` to reuse a pool across calls, otherwise a pool with
+    `max_workers` processes is created for this call. `max_workers=1`
+    verifies on the calling thread.
+    """
+    signed_states = list(signed_states)
+    expected_addresses = list(expected_addresses)
+    if len(signed_states) != len(expected_addresses):
+        raise ValueError(
+            f"got {len(signed_states)} states but "
+            f"{len(expected_addresses)} addresses"
+        )
+
+    pairs = list(zip(signed_states, expected_addresses))
+    chunks = list(chunked(pairs, chunk_size))
+
+    if executor is None and max_workers == 1:
+        chunk_results = map(_verify_chunk, chunks)
+        return [result for results in chunk_results for result in results]
+
+    own_executor = executor is None
+    executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        chunk_results = executor.map(_verify_chunk, chunks)
+        return [result for results in chunk_results for result in results]
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+@attr.s
 class Player:
-    channels: Dict[str, Channel]
-    payments: Dict[str, List[Payment]]
+    """Off-chain payments of one account over its channels.
+
+    The payer proposes a signed state (`make_payment`, `complete_payment`,
+    `cancel_payment`), the payee validates it and returns its own signature
+    of the same state (`receive_payment`), and the payer stores that
+    countersignature (`receive_countersignature`). A proposal the payee
+    rejects or that got lost is dropped with `abandon_proposal`, otherwise
+    the channel can't make new ones. Nothing here touches the chain.
+
+    Per channel the player keeps the latest state both parties signed, in its
+    own perspective, and the counterparty's signature of it, which is what
+    `Channel.update` needs in a dispute.
+
+    A payee refuses to cancel a payment to it once it knows the preimage
+    (`add_preimage`), it could still claim the payment on chain.
+    """
+
+    account = attr.ib()
+    # channel id -> latest agreed state, own perspective
+    states = attr.ib(factory=dict)
+    # channel id -> latest agreed state signed by the counterparty
+    signed_states = attr.ib(factory=dict)
+    counterparties = attr.ib(factory=dict)
+    # channel id -> own proposal waiting for a countersignature
+    proposals = attr.ib(factory=dict)
+    _locks = attr.ib(factory=dict, repr=False)
+    # optional `routing.ChannelGraph`, kept up to date with agreed states
+    graph = attr.ib(default=None, repr=False, cmp=False)
+    # preimage hash -> preimage, of payments to us we can claim
+    preimages = attr.ib(factory=dict, repr=False)
+
+    def add_channel(self, state, counterparty):
+        """Start from `state` (e. g. `Channel.get_state`) with `counterparty`."""
+        self._locks.setdefault(state.channel_id, threading.Lock())
+        with self._locks[state.channel_id]:
+            self.states[state.channel_id] = state
+            self.counterparties[state.channel_id] = counterparty
+            if self.graph is not None:
+                self.graph.add_channel(state, self.account.address, counterparty)
+
+    def add_preimage(self, preimage):
+        """Remember a preimage we generated or learned, e. g. from a route."""
+        self.preimages[keccak(preimage)] = preimage
+
+    def _lock(self, channel_id):
+        try:
+            return self._locks[channel_id]
+        except KeyError:
+            raise PaymentError(f"unknown channel {channel_id}") from None
+
+    def _propose(self, channel_id, command, transition):
+        with self._lock(channel_id):
+            if channel_id in self.proposals:
+                raise PaymentError(f"proposal for channel {channel_id} pending")
+            state = self.states[channel_id]
+            new_state = transition(state)
+            new_state = new_state.with_command(state.changed_slot(new_state), command)
+            proposal = new_state.sign(self.account.privateKey)
+            self.proposals[channel_id] = proposal
+            return proposal
+
+    def make_payment(self, channel_id, amount, preimage, expiry):
+        recipient = self.counterparties.get(channel_id)
+        return self._propose(
+            channel_id,
+            "open",
+            lambda state: state.conditional_payment(
+                recipient=recipient, amount=amount, expiry=expiry, preimage=preimage
+            ),
+        )
 
-    def receive_payment(self, payment: Payment) -> None:
-        # validate payment signature + deposits of other party
-        raise NotImplementedError
+    def complete_payment(self, channel_id, slot=None):
+        return self._propose(
+            channel_id, "complete", lambda state: state.complete_payment(slot)
+        )
 
-    def make_payment(self, channel_id, amount) -> Payment:
-        raise NotImplementedError
+    def cancel_payment(self, channel_id, slot=None):
+        return self._propose(
+            channel_id, "cancel", lambda state: state.cancel_payment(slot)
+        )
+
+    def receive_payment(self, proposal):
+        """Validate a proposal of the counterparty, return our signature."""
+        channel_id = proposal.channel_id
+        with self._lock(channel_id):
+            proposal.verify_signature(self.counterparties[channel_id])
+            slot, command = proposal.command()
+            if command not in COMMANDS:
+                raise PaymentError(f"proposal needs a command, got {command}")
+            # validate in the perspective of the sender
+            sender_state = self.states[channel_id].to_other()
+            if slot != sender_state.changed_slot(proposal):
+                raise PaymentError(f"command in slot {slot}, another slot changed")
+            sender_state.validate(
+                proposal.to_unsigned(), command=command, recipient=self.account.address
+            )
+            preimage_hash = sender_state.payments[slot].preimage_hash
+            if command == "cancel" and preimage_hash in self.preimages:
+                raise PaymentError("won't cancel a payment we can claim")
+
+            new_state = proposal.to_unsigned().to_other()
+            self._agree(new_state, proposal)
+            return new_state.sign(self.account.privateKey)
+
+    def receive_countersignature(self, countersigned):
+        channel_id = countersigned.channel_id
+        with self._lock(channel_id):
+            proposal = self.proposals.get(channel_id)
+            if proposal is None:
+                raise PaymentError(f"no proposal for channel {channel_id}")
+            countersigned.verify_signature(self.counterparties[channel_id])
+            new_state = proposal.to_unsigned()
+            if countersigned.to_unsigned().to_other() != new_state:
+                raise PaymentError("countersigned state differs from proposal")
+            del self.proposals[channel_id]
+            self._agree(new_state, countersigned)
+
+    def abandon_proposal(self, channel_id):
+        """Forget the pending proposal of a channel, e. g. after the payee
+        rejected it. The agreed state stays as it was.
+        """
+        with self._lock(channel_id):
+            self.proposals.pop(channel_id, None)
+
+    def _agree(self, state, signed_state):
+        self.states[state.channel_id] = state
+        self.signed_states[state.channel_id] = signed_state
+        if self.graph is not None:
+            self.graph.update_state(state, self.account.address)
+
+    def find_path(self, target, amount, k=1):
+        """Shortest route to `target` that can carry `amount`, or None."""
+        if self.graph is None:
+            raise PaymentError("no routing graph")
+        routes = self.graph.find_paths(self.account.address, target, amount, k)
+        return routes[0] if routes else None
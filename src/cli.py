@@ -1,7 +1,7 @@
+import argparse
 import glob
 import json
 import os
-import sys
 from collections import defaultdict
 from configparser import ConfigParser
 
@@ -20,7 +20,15 @@ def cli():
     cnfparser.read(".flake8")
     line_length = int(cnfparser["flake8"]["max-line-length"])
 
-    contract_fname = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Generate contract wrappers.")
+    parser.add_argument("contracts", help="combined JSON output of solc")
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="add <function>_calldata methods with precomputed encoders",
+    )
+    args = parser.parse_args()
+    contract_fname = args.contracts
 
     with open(contract_fname) as filehandle:
         contracts = json.load(filehandle)
@@ -41,7 +49,7 @@ def cli():
 
         py_fname = basename.replace(".sol", ".py")
         abi = json.loads(contract["abi"])
-        class_def = make_python_contract(contract_name, abi)
+        class_def = make_python_contract(contract_name, abi, fast=args.fast)
 
         files[py_fname].append(class_def)
 
@@ -49,7 +57,7 @@ def cli():
 
         path = os.path.join(CONTRACTS_DIR, fname)
         new_paths.append(path)
-        source_code = astor.to_source(wrap_module(class_defs))
+        source_code = astor.to_source(wrap_module(class_defs, fast=args.fast))
         formatted_source_code = black.format_str(source_code, line_length)
 
         with open(path, "w") as filehandle:
@@ -1,4 +1,5 @@
 from ast import (
+    alias,
     arg,
     arguments,
     Assign,
@@ -6,11 +7,16 @@ from ast import (
     Call,
     ClassDef,
     FunctionDef,
+    ImportFrom,
+    List,
     Return,
     Name,
     Module,
+    Str,
 )
 
+from eth_utils import keccak
+
 
 def make_function(name, args):
     my_args = arguments(
@@ -47,6 +53,43 @@ def make_function(name, args):
     return FunctionDef(name=name, args=my_args, body=my_body, decorator_list=[])
 
 
+def make_selector(name, types):
+    return "0x" + keccak(text=f"{name}({','.join(types)})")[:4].hex()
+
+
+def make_encoder(name, types):
+    """Class attribute with the precomputed `calldata.Function` of `name`."""
+    return Assign(
+        targets=[Name(id=f"_{name}")],
+        value=Call(
+            func=Attribute(value=Name(id="calldata"), attr="Function"),
+            args=[
+                Str(s=make_selector(name, types)),
+                List(elts=[Str(s=type_str) for type_str in types]),
+            ],
+            keywords=[],
+        ),
+    )
+
+
+def make_calldata_function(name, args):
+    """Method `<name>_calldata` returning the encoded call of `name`."""
+    function_def = make_function(f"{name}_calldata", args)
+    function_def.body = [
+        Return(
+            value=Call(
+                func=Attribute(
+                    value=Attribute(value=Name(id="self"), attr=f"_{name}"),
+                    attr="encode",
+                ),
+                args=[Name(id=my_arg or "arg") for my_arg in args],
+                keywords=[],
+            )
+        )
+    ]
+    return function_def
+
+
 def make_init():
     name = "__init__"
     args = arguments(
@@ -66,11 +109,20 @@ def make_init():
     return FunctionDef(name=name, args=args, body=body, decorator_list=[])
 
 
-def wrap_module(class_defs):
-    return Module(body=class_defs)
+def wrap_module(class_defs, fast=False):
+    body = list(class_defs)
+    if fast:
+        names = [alias(name="calldata", asname=None)]
+        body.insert(0, ImportFrom(module=None, names=names, level=2))
+    return Module(body=body)
 
 
-def make_python_contract(contract_name, abi):
+def make_python_contract(contract_name, abi, fast=False):
+    """Wrapper class of a contract.
+
+    With `fast` every function `f` also gets `f_calldata`, which encodes the
+    call with a precomputed selector instead of going through web3.
+    """
 
     functions = {}
     # events = {}  # XXX todo
@@ -88,13 +140,18 @@ def make_python_contract(contract_name, abi):
                 if len(item["inputs"]) > len(functions[name]["inputs"]):
                     functions[name] = item
 
-    init_def = make_init()
-    function_defs = [
-        make_function(name, [arg["name"] for arg in item["inputs"]])
-        for name, item in sorted(functions.items())
-    ]
+    encoder_defs = []
+    function_defs = []
+    for name, item in sorted(functions.items()):
+        args = [arg["name"] for arg in item["inputs"]]
+        function_defs.append(make_function(name, args))
+        types = [arg["type"] for arg in item["inputs"]]
+        # no fast path for structs of the experimental ABI encoder
+        if fast and not any(type_str.startswith("tuple") for type_str in types):
+            encoder_defs.append(make_encoder(name, types))
+            function_defs.append(make_calldata_function(name, args))
 
-    body = [init_def] + function_defs
+    body = encoder_defs + [make_init()] + function_defs
 
     class_def = ClassDef(bases=[], name=contract_name, body=body, decorator_list=[])
 
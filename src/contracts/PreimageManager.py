@@ -5,5 +5,11 @@ class PreimageManager:
     def revealedBefore(self, h, T):
         return self._contract.functions.revealedBefore(h, T)
 
+    def revealedBeforeMany(self, hs, T):
+        return self._contract.functions.revealedBeforeMany(hs, T)
+
     def submitPreimage(self, x):
         return self._contract.functions.submitPreimage(x)
+
+    def submitPreimages(self, xs):
+        return self._contract.functions.submitPreimages(xs)
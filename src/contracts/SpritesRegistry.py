@@ -31,9 +31,15 @@ class SpritesRegistry:
     def getDeposit(self, channelID):
         return self._contract.functions.getDeposit(channelID)
 
+    def getPlayers(self, channelID):
+        return self._contract.functions.getPlayers(channelID)
+
     def getState(self, channelID):
         return self._contract.functions.getState(channelID)
 
+    def getStates(self, channelIDs, perspective):
+        return self._contract.functions.getStates(channelIDs, perspective)
+
     def getStatus(self, channelID):
         return self._contract.functions.getStatus(channelID)
 
@@ -59,10 +65,10 @@ class SpritesRegistry:
         credits,
         withdrawals,
         round,
-        preimageHash,
-        recipient,
-        amount,
-        expiry,
+        preimageHashes,
+        recipients,
+        amounts,
+        expiries,
     ):
         return self._contract.functions.update(
             channelID,
@@ -70,12 +76,15 @@ class SpritesRegistry:
             credits,
             withdrawals,
             round,
-            preimageHash,
-            recipient,
-            amount,
-            expiry,
+            preimageHashes,
+            recipients,
+            amounts,
+            expiries,
         )
 
+    def updateMany(self, words):
+        return self._contract.functions.updateMany(words)
+
     def verifyUpdate(
         self,
         channelID,
@@ -83,10 +92,10 @@ class SpritesRegistry:
         credits,
         withdrawals,
         round,
-        preimageHash,
-        recipient,
-        amount,
-        expiry,
+        preimageHashes,
+        recipients,
+        amounts,
+        expiries,
     ):
         return self._contract.functions.verifyUpdate(
             channelID,
@@ -94,10 +103,10 @@ class SpritesRegistry:
             credits,
             withdrawals,
             round,
-            preimageHash,
-            recipient,
-            amount,
-            expiry,
+            preimageHashes,
+            recipients,
+            amounts,
+            expiries,
         )
 
     def withdraw(self, channelID):
@@ -0,0 +1,59 @@
+"""Fetching and decoding of `SpritesRegistry` event logs."""
+from collections import namedtuple
+
+from eth_abi import decode_abi
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+# values of the registry's `Status` enum
+STATUS_OK = 0
+STATUS_PENDING = 1
+
+# All arguments are unindexed, they are decoded from the log data.
+EVENT_TYPES = {
+    "EventInit": ["uint256"],
+    "EventUpdate": ["uint256", "int256"],
+    "EventPending": ["uint256", "uint256", "uint256"],
+    "EventDeposit": ["uint256"],
+    "EventFinalize": ["uint256"],
+}
+EVENT_TOPICS = {
+    name: HexBytes(keccak(text=f"{name}({','.join(types)})"))
+    for name, types in EVENT_TYPES.items()
+}
+EVENT_NAMES = {topic: name for name, topic in EVENT_TOPICS.items()}
+
+Event = namedtuple(
+    "Event", "name channel_id args block_number transaction_hash log_index"
+)
+
+
+def decode_log(log):
+    """Return the `Event` of a registry log or None for other logs."""
+    name = EVENT_NAMES.get(HexBytes(log["topics"][0])) if log["topics"] else None
+    if name is None:
+        return None
+    channel_id, *args = decode_abi(EVENT_TYPES[name], HexBytes(log["data"]))
+    return Event(
+        name,
+        channel_id,
+        tuple(args),
+        log["blockNumber"],
+        log["transactionHash"],
+        log["logIndex"],
+    )
+
+
+def get_events(web3, address, from_block, to_block="latest", names=None):
+    """Registry events in the block range (inclusive) in chain order."""
+    topics = [EVENT_TOPICS[name].hex() for name in (names or EVENT_TYPES)]
+    logs = web3.eth.getLogs(
+        {
+            "address": address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [topics],
+        }
+    )
+    events = (decode_log(log) for log in logs)
+    return [event for event in events if event is not None]
@@ -2,6 +2,10 @@ class TransactionFailed(Exception):
     pass
 
 
+class TransactionTimeout(Exception):
+    pass
+
+
 class StateValidationError(Exception):
     pass
 
@@ -32,3 +36,11 @@ class PaymentError(ForbiddenStateChange):
 
 class BadSignature(Exception):
     pass
+
+
+class CorruptRecord(Exception):
+    pass
+
+
+class PeerError(Exception):
+    pass
@@ -0,0 +1,212 @@
+"""SQLite index of the channels of a `SpritesRegistry`.
+
+`EventInit` only carries the channel id, the players and the token are
+decoded from the calldata of the `createChannel` transaction.
+Logs are fetched in block ranges that grow while they are quick to fetch
+and shrink when the node refuses or returns too many logs. Every range is
+committed together with its checkpoint, so indexing resumes where it stopped.
+"""
+import logging
+import sqlite3
+import time
+from collections import namedtuple
+
+from eth_abi import decode_abi
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+
+from .events import STATUS_PENDING, get_events
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1_000
+MIN_CHUNK_SIZE = 1
+MAX_CHUNK_SIZE = 100_000
+# shrink ranges that return more logs than this
+MAX_LOGS = 5_000
+# seconds, ranges that are fetched faster than this grow
+FAST_FETCH = 0.5
+POLL_INTERVAL = 1.0
+INDEXED_EVENTS = ["EventInit", "EventUpdate", "EventPending"]
+CREATE_CHANNEL_SELECTOR = keccak(text="createChannel(address,address)")[:4]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id INTEGER PRIMARY KEY,
+    left TEXT,
+    right TEXT,
+    token TEXT,
+    status INTEGER NOT NULL DEFAULT 0,
+    deadline INTEGER NOT NULL DEFAULT 0,
+    round INTEGER NOT NULL DEFAULT -1,
+    created_block INTEGER NOT NULL,
+    updated_block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channels_left ON channels (left);
+CREATE INDEX IF NOT EXISTS channels_right ON channels (right);
+CREATE INDEX IF NOT EXISTS channels_token ON channels (token);
+CREATE INDEX IF NOT EXISTS channels_status_deadline ON channels (status, deadline);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    registry TEXT NOT NULL,
+    block INTEGER NOT NULL
+);
+"""
+
+COLUMNS = "channel_id left right token status deadline round created_block"
+ChannelRecord = namedtuple("ChannelRecord", COLUMNS)
+SELECT = f"SELECT {', '.join(COLUMNS.split())} FROM channels"
+
+
+def decode_create_channel(transaction):
+    """Return `(left, right, token)` of a `createChannel` transaction."""
+    data = HexBytes(transaction["input"])
+    if data[:4] != CREATE_CHANNEL_SELECTOR:
+        return None, None, None
+    right, token = decode_abi(["address", "address"], data[4:])
+    return (
+        to_checksum_address(transaction["from"]),
+        to_checksum_address(right),
+        to_checksum_address(token),
+    )
+
+
+class Indexer:
+    def __init__(
+        self,
+        web3,
+        registry,
+        path=":memory:",
+        start_block=0,
+        confirmations=0,
+        chunk_size=CHUNK_SIZE,
+    ):
+        self.web3 = web3
+        self.address = registry._contract.address
+        self.confirmations = confirmations
+        self.chunk_size = chunk_size
+        self.db = sqlite3.connect(path)
+        with self.db:
+            self.db.executescript(SCHEMA)
+        self._init_checkpoint(start_block - 1)
+
+    def _init_checkpoint(self, block):
+        row = self.db.execute("SELECT registry FROM checkpoint").fetchone()
+        if row is None:
+            with self.db:
+                self.db.execute(
+                    "INSERT INTO checkpoint VALUES (0, ?, ?)", (self.address, block)
+                )
+        elif row[0] != self.address:
+            raise ValueError(f"index is for registry {row[0]} not {self.address}")
+
+    @property
+    def checkpoint(self):
+        """Last block that is completely indexed."""
+        return self.db.execute("SELECT block FROM checkpoint").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    # Indexing
+
+    def _fetch(self, from_block, to_block):
+        """Events in the range, or None if the range should be smaller."""
+        try:
+            events = get_events(
+                self.web3, self.address, from_block, to_block, INDEXED_EVENTS
+            )
+        except ValueError as exc:
+            # e. g. geth's "query returned more than 10000 results"
+            if from_block == to_block:
+                raise
+            log.debug("getLogs %s-%s failed: %s", from_block, to_block, exc)
+            return None
+        if len(events) > MAX_LOGS and from_block < to_block:
+            return None
+        return events
+
+    def _apply(self, event):
+        if event.name == "EventInit":
+            transaction = self.web3.eth.getTransaction(event.transaction_hash)
+            left, right, token = decode_create_channel(transaction)
+            if left is None:
+                log.warning("can't decode players of channel %s", event.channel_id)
+            self.db.execute(
+                "INSERT OR REPLACE INTO channels "
+                "(channel_id, left, right, token, created_block, updated_block) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (event.channel_id, left, right, token, *[event.block_number] * 2),
+            )
+        elif event.name == "EventUpdate":
+            self.db.execute(
+                "UPDATE channels SET round = ?, updated_block = ? "
+                "WHERE channel_id = ?",
+                # rounds are int256, too big for SQLite in theory
+                (str(event.args[0]), event.block_number, event.channel_id),
+            )
+        elif event.name == "EventPending":
+            self.db.execute(
+                "UPDATE channels SET status = ?, deadline = ?, updated_block = ? "
+                "WHERE channel_id = ?",
+                (STATUS_PENDING, event.args[1], event.block_number, event.channel_id),
+            )
+
+    def run_once(self):
+        """Index up to the current block, return the number of new blocks."""
+        head = self.web3.eth.blockNumber - self.confirmations
+        start = self.checkpoint + 1
+        from_block = start
+        while from_block <= head:
+            to_block = min(from_block + self.chunk_size - 1, head)
+            started = time.monotonic()
+            events = self._fetch(from_block, to_block)
+            if events is None:
+                self.chunk_size = max(self.chunk_size // 2, MIN_CHUNK_SIZE)
+                continue
+            with self.db:
+                for event in events:
+                    self._apply(event)
+                self.db.execute("UPDATE checkpoint SET block = ?", (to_block,))
+            log.debug("indexed %s-%s: %s events", from_block, to_block, len(events))
+            if time.monotonic() - started < FAST_FETCH:
+                self.chunk_size = min(self.chunk_size * 2, MAX_CHUNK_SIZE)
+            from_block = to_block + 1
+        return max(head - start + 1, 0)
+
+    def run(self, poll_interval=POLL_INTERVAL, stop=None):
+        """Keep indexing new blocks until `stop()` returns True."""
+        while stop is None or not stop():
+            if not self.run_once():
+                time.sleep(poll_interval)
+
+    # Queries
+
+    def _select(self, where="", params=()):
+        rows = self.db.execute(f"{SELECT} {where} ORDER BY channel_id", params)
+        return [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row):
+        *values, round, created_block = row
+        return ChannelRecord(*values, int(round), created_block)
+
+    def get_channel(self, channel_id):
+        records = self._select("WHERE channel_id = ?", (channel_id,))
+        return records[0] if records else None
+
+    def channels_of(self, address):
+        address = to_checksum_address(address)
+        return self._select("WHERE left = ? OR right = ?", (address, address))
+
+    def channels_by_token(self, token):
+        return self._select("WHERE token = ?", (to_checksum_address(token),))
+
+    def channels_by_status(self, status):
+        return self._select("WHERE status = ?", (status,))
+
+    def pending_before(self, block):
+        """Pending channels whose deadline is at or before `block`."""
+        return self._select(
+            "WHERE status = ? AND deadline <= ?", (STATUS_PENDING, block)
+        )
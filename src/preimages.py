@@ -0,0 +1,102 @@
+"""Merging the preimage submissions of many channels into few transactions.
+
+Preimages queued with `PreimageQueue.add` (e. g. by `Channel.submit_preimage`
+of channels sharing the queue) are sent with one `submitPreimages`
+transaction per flush. Flushing waits for the receipts, so while a
+transaction is being mined new preimages gather for the next one, that is
+at most one transaction per block.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from .exceptions import TransactionFailed
+from .util import GAS, check_receipt, chunked, wait_for_receipts
+
+log = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+# preimages per `submitPreimages` transaction, storing one costs about 25k gas
+MAX_PREIMAGES = 100
+
+
+def revealed_before(preimage_manager, preimage_hashes, block_number):
+    """Whether each hash was revealed by `block_number`, in one call."""
+    hashes = [bytes(preimage_hash) for preimage_hash in preimage_hashes]
+    return preimage_manager.revealedBeforeMany(hashes, block_number).call()
+
+
+class PreimageQueue:
+    def __init__(
+        self, web3, preimage_manager, sender, gas=GAS, max_preimages=MAX_PREIMAGES
+    ):
+        self.web3 = web3
+        self.preimage_manager = preimage_manager
+        self.sender = sender
+        self.gas = gas
+        self.max_preimages = max_preimages
+        # channels add from their own threads
+        self._lock = threading.Lock()
+        # preimage -> future of the receipt of its transaction
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, preimage):
+        """Queue `preimage`, return a future of its transaction's receipt."""
+        preimage = bytes(preimage)
+        with self._lock:
+            future = self._pending.get(preimage)
+            if future is None:
+                future = self._pending[preimage] = Future()
+            return future
+
+    def flush(self):
+        """Submit all queued preimages and wait for the receipts.
+
+        If submitting or waiting fails, the futures of all flushed preimages
+        get the exception and it is raised.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return []
+
+        batches = list(chunked(list(pending.items()), self.max_preimages))
+        try:
+            tx_hashes = []
+            for batch in batches:
+                preimages = [preimage for preimage, _ in batch]
+                call = self.preimage_manager.submitPreimages(preimages)
+                tx = {"from": self.sender, "gas": self.gas}
+                tx_hashes.append(call.transact(tx))
+            log.debug("submitted %s preimages in %s txs", len(pending), len(tx_hashes))
+            receipts = wait_for_receipts(self.web3, tx_hashes)
+        except Exception as exc:
+            for future in pending.values():
+                future.set_exception(exc)
+            raise
+        for batch, receipt in zip(batches, receipts):
+            for _, future in batch:
+                try:
+                    future.set_result(check_receipt(receipt))
+                except TransactionFailed as exc:
+                    future.set_exception(exc)
+        return receipts
+
+    def run(self, stop, poll_interval=POLL_INTERVAL):
+        """Flush until `stop()` returns True.
+
+        A failed flush is logged, its futures hold the error, so that one
+        of them doesn't stop the queue.
+        """
+        while not stop():
+            try:
+                receipts = self.flush()
+            except Exception:
+                log.exception("flushing preimages failed")
+                receipts = []
+            if not receipts:
+                time.sleep(poll_interval)
@@ -0,0 +1,113 @@
+"""Local replicas of on-chain channel state, kept current with registry events.
+
+A replica reads a channel once and afterwards only fetches the registry logs
+since the last synchronisation. `getState` is called again only after an
+event that changed the state (an update, a deposit or a finalization).
+"""
+import logging
+import time
+from collections import defaultdict
+
+import attr
+
+from .channel import Channel, ChannelState
+from .events import STATUS_PENDING, get_events
+
+log = logging.getLogger(__name__)
+
+# seconds a replica is used without checking for new events
+MAX_AGE = 1.0
+STATE_EVENTS = {"EventUpdate", "EventDeposit", "EventFinalize"}
+
+
+@attr.s(auto_attribs=True)
+class ChannelReplica:
+    """Cached state of `channel` in the perspective of the `left` player.
+
+    Values reflect the chain at least as of block `synced_block`. Reads are
+    served from the cache until it is older than `max_age` seconds or marked
+    `stale`, `refresh` rereads everything from the chain.
+    """
+
+    channel: Channel
+    max_age: float = MAX_AGE
+    state: ChannelState = None
+    status: int = None
+    deadline: int = None
+    synced_block: int = None
+    synced_at: float = None
+    stale: bool = True
+
+    @property
+    def channel_id(self):
+        return self.channel.channel_id
+
+    def age(self):
+        if self.synced_at is None:
+            return float("inf")
+        return time.monotonic() - self.synced_at
+
+    def apply(self, event):
+        if event.channel_id != self.channel_id:
+            return
+        if event.name == "EventPending":
+            self.status = STATUS_PENDING
+            self.deadline = event.args[1]
+        elif event.name in STATE_EVENTS:
+            self.stale = True
+
+    def refresh(self):
+        block_number = self.channel.web3.eth.blockNumber
+        self.status = self.channel.get_status()
+        self.deadline = self.channel.get_deadline()
+        self._read_state()
+        self._synced(block_number)
+
+    def sync(self):
+        sync_replicas([self])
+
+    def get_state(self, who=None, max_age=None):
+        """Cached state in the perspective of `who` (default `left`)."""
+        max_age = self.max_age if max_age is None else max_age
+        if self.stale or self.age() > max_age:
+            self.sync()
+        if who is not None and who.address == self.channel.right.address:
+            return self.state.to_other()
+        return self.state
+
+    def _read_state(self):
+        self.state = self.channel.get_state(self.channel.left)
+        self.stale = False
+
+    def _synced(self, block_number):
+        self.synced_block = block_number
+        self.synced_at = time.monotonic()
+
+
+def sync_replicas(replicas):
+    """Bring replicas up to date with one `getLogs` request per registry."""
+    by_registry = defaultdict(list)
+    for replica in replicas:
+        if replica.synced_block is None:
+            replica.refresh()
+        else:
+            by_registry[replica.channel.registry._contract.address].append(replica)
+
+    for address, group in by_registry.items():
+        web3 = group[0].channel.web3
+        to_block = web3.eth.blockNumber
+        from_block = min(replica.synced_block for replica in group) + 1
+        if from_block <= to_block:
+            events = get_events(web3, address, from_block, to_block)
+            log.debug("%s events in blocks %s-%s", len(events), from_block, to_block)
+            by_channel = defaultdict(list)
+            for event in events:
+                by_channel[event.channel_id].append(event)
+            for replica in group:
+                for event in by_channel[replica.channel_id]:
+                    if event.block_number > replica.synced_block:
+                        replica.apply(event)
+        for replica in group:
+            if replica.stale:
+                replica._read_state()
+            replica._synced(to_block)
@@ -0,0 +1,265 @@
+"""Capacity-aware routes through the channel graph.
+
+Every channel gives two directed edges. The capacity of an edge is what its
+sender can still pay, `deposits[0] + credits[0]` in the sender's
+perspective. Parallel channels between the same players count as one edge
+with the largest capacity. Routes are the k shortest paths by number of
+hops (Yen's algorithm on bidirectional breadth-first search) over edges
+whose capacity covers the amount.
+
+Answers are cached. When an edge changes, only the cached answers it can
+affect are dropped: on a decrease those using the edge with an amount above
+the new capacity, on an increase those whose amount the edge now covers.
+"""
+import bisect
+import heapq
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+
+from .batch import get_states
+from .events import STATUS_OK
+from .util import ZERO_ADDRESS
+
+K_PATHS = 3
+CACHE_SIZE = 10_000
+# capacity of a missing edge, below every amount
+NO_EDGE = -1
+
+Route = namedtuple("Route", "nodes channel_ids")
+
+
+def capacity_of(state):
+    return state.deposits[0] + state.credits[0]
+
+
+class ChannelGraph:
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache_size = cache_size
+        # players update the graph from the threads of their channels
+        self._lock = threading.RLock()
+        # channel id -> (player, counterparty)
+        self.players = {}
+        # sender -> receiver -> channel id -> capacity
+        self.channels = defaultdict(lambda: defaultdict(dict))
+        # sender -> receiver -> largest capacity, and receiver -> sender
+        self.adjacency = defaultdict(dict)
+        self.reverse = defaultdict(dict)
+
+        # (source, target, amount, k) -> paths as tuples of nodes
+        self._cache = OrderedDict()
+        # (sender, receiver) -> cache keys of paths using the edge
+        self._users = defaultdict(set)
+        # amount -> cache keys, and the sorted amounts
+        self._by_amount = defaultdict(set)
+        self._amounts = []
+
+    @classmethod
+    def from_registry(cls, registry, indexer, **kwargs):
+        """Graph of the open channels of `indexer`, read in bulk."""
+        graph = cls(**kwargs)
+        records = indexer.channels_by_status(STATUS_OK)
+        channel_ids = [record.channel_id for record in records]
+        # a non-player perspective gives the state of the left player
+        states = get_states(registry, channel_ids, ZERO_ADDRESS)
+        for record, state in zip(records, states):
+            graph.add_channel(state, record.left, record.right)
+        return graph
+
+    def __len__(self):
+        return len(self.players)
+
+    # Edges
+
+    def add_channel(self, state, player, counterparty):
+        """Add or replace a channel, `state` is in the perspective of `player`."""
+        with self._lock:
+            self.remove_channel(state.channel_id)
+            self.players[state.channel_id] = (player, counterparty)
+            self.update_state(state, player)
+
+    def remove_channel(self, channel_id):
+        with self._lock:
+            players = self.players.pop(channel_id, None)
+            if players is None:
+                return
+            for sender, receiver in (players, players[::-1]):
+                self.channels[sender][receiver].pop(channel_id, None)
+                self._refresh_edge(sender, receiver)
+
+    def update_state(self, state, owner):
+        """Fold in the new state of a channel, seen by `owner`."""
+        player, counterparty = self.players[state.channel_id]
+        if owner == counterparty:
+            state = state.to_other()
+        capacity = capacity_of(state)
+        other_capacity = capacity_of(state.to_other())
+        with self._lock:
+            self.channels[player][counterparty][state.channel_id] = capacity
+            self.channels[counterparty][player][state.channel_id] = other_capacity
+            self._refresh_edge(player, counterparty)
+            self._refresh_edge(counterparty, player)
+
+    def capacity(self, sender, receiver):
+        return self.adjacency.get(sender, {}).get(receiver, NO_EDGE)
+
+    def _refresh_edge(self, sender, receiver):
+        channels = self.channels[sender][receiver]
+        new = max(channels.values()) if channels else NO_EDGE
+        old = self.capacity(sender, receiver)
+        if new == old:
+            return
+        if channels:
+            self.adjacency[sender][receiver] = new
+            self.reverse[receiver][sender] = new
+        else:
+            del self.adjacency[sender][receiver]
+            del self.reverse[receiver][sender]
+            del self.channels[sender][receiver]
+        if new < old:
+            users = self._users.get((sender, receiver), ())
+            stale = [key for key in users if key[2] > new]
+        else:
+            start = bisect.bisect_right(self._amounts, old)
+            end = bisect.bisect_right(self._amounts, new)
+            stale = [
+                key
+                for amount in self._amounts[start:end]
+                for key in self._by_amount[amount]
+            ]
+        for key in stale:
+            self._evict(key)
+
+    # Cache
+
+    def _remember(self, key, paths):
+        self._cache[key] = paths
+        for path in paths:
+            for edge in zip(path, path[1:]):
+                self._users[edge].add(key)
+        amount = key[2]
+        if not self._by_amount[amount]:
+            bisect.insort(self._amounts, amount)
+        self._by_amount[amount].add(key)
+        if len(self._cache) > self.cache_size:
+            self._evict(next(iter(self._cache)))
+
+    def _evict(self, key):
+        paths = self._cache.pop(key, None)
+        if paths is None:
+            return
+        for path in paths:
+            for edge in zip(path, path[1:]):
+                users = self._users[edge]
+                users.discard(key)
+                if not users:
+                    del self._users[edge]
+        amount = key[2]
+        keys = self._by_amount[amount]
+        keys.discard(key)
+        if not keys:
+            del self._by_amount[amount]
+            del self._amounts[bisect.bisect_left(self._amounts, amount)]
+
+    # Queries
+
+    def _expand(self, frontier, parents, other_parents, forward, amount, removed):
+        """Visit the next level of one side, return it and a meeting node."""
+        removed_edges, removed_nodes = removed
+        adjacency = self.adjacency if forward else self.reverse
+        level = []
+        for node in frontier:
+            for neighbour, capacity in adjacency.get(node, {}).items():
+                edge = (node, neighbour) if forward else (neighbour, node)
+                if (
+                    capacity < amount
+                    or neighbour in parents
+                    or neighbour in removed_nodes
+                    or edge in removed_edges
+                ):
+                    continue
+                parents[neighbour] = node
+                if neighbour in other_parents:
+                    return level, neighbour
+                level.append(neighbour)
+        return level, None
+
+    def _shortest(self, source, target, amount, removed_edges, removed_nodes):
+        """Fewest hops from `source` to `target` as a list of nodes, or None.
+
+        Breadth-first from both ends, always growing the smaller frontier.
+        """
+        if source == target:
+            return [source]
+        removed = (removed_edges, removed_nodes)
+        forward, backward = {source: None}, {target: None}
+        forward_frontier, backward_frontier = [source], [target]
+        meeting = None
+        while forward_frontier and backward_frontier and meeting is None:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand(
+                    forward_frontier, forward, backward, True, amount, removed
+                )
+            else:
+                backward_frontier, meeting = self._expand(
+                    backward_frontier, backward, forward, False, amount, removed
+                )
+        if meeting is None:
+            return None
+        path = [meeting]
+        while forward[path[-1]] is not None:
+            path.append(forward[path[-1]])
+        path.reverse()
+        while backward[path[-1]] is not None:
+            path.append(backward[path[-1]])
+        return path
+
+    def _k_shortest(self, source, target, amount, k):
+        shortest = self._shortest(source, target, amount, set(), set())
+        if shortest is None:
+            return []
+        paths = [shortest]
+        candidates = []
+        seen = {tuple(shortest)}
+        while len(paths) < k:
+            previous = paths[-1]
+            for index in range(len(previous) - 1):
+                root = previous[: index + 1]
+                removed_edges = {
+                    (path[index], path[index + 1])
+                    for path in paths
+                    if path[: index + 1] == root and len(path) > index + 1
+                }
+                spur = self._shortest(
+                    root[-1], target, amount, removed_edges, set(root[:-1])
+                )
+                if spur is None:
+                    continue
+                candidate = root[:-1] + spur
+                if tuple(candidate) not in seen:
+                    seen.add(tuple(candidate))
+                    heapq.heappush(candidates, (len(candidate), candidate))
+            if not candidates:
+                break
+            paths.append(heapq.heappop(candidates)[1])
+        return paths
+
+    def _route(self, nodes):
+        channel_ids = []
+        for sender, receiver in zip(nodes, nodes[1:]):
+            channels = self.channels[sender][receiver]
+            channel_ids.append(max(channels, key=channels.get))
+        return Route(nodes, tuple(channel_ids))
+
+    def find_paths(self, source, target, amount, k=K_PATHS):
+        """Up to `k` shortest routes that can carry `amount`, shortest first."""
+        key = (source, target, amount, k)
+        with self._lock:
+            paths = self._cache.get(key)
+            if paths is None:
+                paths = self._k_shortest(source, target, amount, k)
+                paths = [tuple(path) for path in paths]
+                self._remember(key, paths)
+            else:
+                self._cache.move_to_end(key)
+            # channels are picked per query, parallel channels may have changed
+            return [self._route(path) for path in paths]
@@ -0,0 +1,126 @@
+"""Message hash signing and signature recovery with cached key objects.
+
+Uses the native secp256k1 bindings from `coincurve` when they are installed
+and falls back to `eth_keys` otherwise. Both produce the same (RFC 6979,
+low s) signatures as `eth_account.Account.signHash`.
+"""
+import functools
+from collections import namedtuple
+
+from eth_keys import keys
+from eth_utils import decode_hex, keccak, to_checksum_address
+from hexbytes import HexBytes
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+V_OFFSET = 27
+KEY_CACHE_SIZE = 1024
+
+
+class Signature(namedtuple("Signature", "messageHash r s v signature")):
+    """Same fields as the `AttributeDict` returned by `Account.signHash`.
+
+    Fields can also be read by name, ``signature["v"]``, like that dict.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return super().__getitem__(key)
+
+    def keys(self):
+        return self._fields
+
+
+def _key_bytes(private_key):
+    if isinstance(private_key, str):
+        return decode_hex(private_key)
+    if isinstance(private_key, int):
+        return private_key.to_bytes(32, "big")
+    return bytes(private_key)
+
+
+def _check_hash(msg_hash):
+    msg_hash = bytes(msg_hash)
+    if len(msg_hash) != 32:
+        raise ValueError("The message hash must be exactly 32-bytes")
+    return msg_hash
+
+
+def _signature(msg_hash, v, r, s):
+    signature = r.to_bytes(32, "big") + s.to_bytes(32, "big") + bytes([v])
+    return Signature(HexBytes(msg_hash), r, s, v, HexBytes(signature))
+
+
+def _standard_v(v):
+    if v not in (V_OFFSET, V_OFFSET + 1):
+        raise ValueError(f"v={v} not in ({V_OFFSET}, {V_OFFSET + 1})")
+    return v - V_OFFSET
+
+
+class CoincurveSigner:
+    def __init__(self, private_key):
+        self._key = coincurve.PrivateKey(_key_bytes(private_key))
+
+    def sign_hash(self, msg_hash):
+        msg_hash = _check_hash(msg_hash)
+        raw = self._key.sign_recoverable(msg_hash, hasher=None)
+        r = int.from_bytes(raw[:32], "big")
+        s = int.from_bytes(raw[32:64], "big")
+        return _signature(msg_hash, raw[64] + V_OFFSET, r, s)
+
+    @staticmethod
+    def recover_hash(msg_hash, vrs):
+        v, r, s = vrs
+        raw = r.to_bytes(32, "big") + s.to_bytes(32, "big") + bytes([_standard_v(v)])
+        public_key = coincurve.PublicKey.from_signature_and_message(
+            raw, _check_hash(msg_hash), hasher=None
+        )
+        address = keccak(public_key.format(compressed=False)[1:])[-20:]
+        return to_checksum_address(address)
+
+
+class EthKeysSigner:
+    # The path `eth_account.Account` takes, with its default backend.
+    def __init__(self, private_key):
+        self._key = keys.PrivateKey(_key_bytes(private_key))
+
+    def sign_hash(self, msg_hash):
+        msg_hash = _check_hash(msg_hash)
+        v, r, s = self._key.sign_msg_hash(msg_hash).vrs
+        return _signature(msg_hash, v + V_OFFSET, r, s)
+
+    @staticmethod
+    def recover_hash(msg_hash, vrs):
+        v, r, s = vrs
+        signature = keys.Signature(vrs=(_standard_v(v), r, s))
+        public_key = signature.recover_public_key_from_msg_hash(_check_hash(msg_hash))
+        return public_key.to_checksum_address()
+
+
+SIGNERS = {"eth-keys": EthKeysSigner}
+if coincurve is not None:
+    SIGNERS["coincurve"] = CoincurveSigner
+
+DEFAULT_BACKEND = "coincurve" if coincurve is not None else "eth-keys"
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def get_signer(private_key, backend=DEFAULT_BACKEND):
+    """Signer for `private_key`, the parsed key object is cached."""
+    return SIGNERS[backend](private_key)
+
+
+def sign_hash(msg_hash, private_key, backend=DEFAULT_BACKEND):
+    return get_signer(private_key, backend).sign_hash(msg_hash)
+
+
+def recover_hash(msg_hash, vrs, backend=DEFAULT_BACKEND):
+    return SIGNERS[backend].recover_hash(msg_hash, vrs)
@@ -0,0 +1,325 @@
+"""Durable append-only log of signed states.
+
+The log starts with a header of magic bytes, the log format version and
+the `wire.VERSION` of its records. Logs of another version are refused, as
+their records can't be read. Every record has the same size: a crc32
+followed by the `wire` encoding of the state. An in-memory index maps each
+channel to the offset of its record with the highest round.
+
+Durability modes:
+
+- ``always``: `append` returns once the record is on disk. Concurrent
+  appends share fsyncs (group commit): one thread syncs everything written
+  so far while the others wait for it.
+- ``interval``: a background thread syncs every `interval` seconds.
+- ``none``: the log is only synced on `sync`, `snapshot` and `close`.
+
+`snapshot` saves the index together with the synced log size, recovery then
+only scans the records after it. Torn records at the end of the log (a
+partial record, or corrupt records with no valid record after them) are
+truncated. A corrupt record followed by valid ones raises `CorruptRecord`,
+truncating would lose durable states.
+"""
+import logging
+import os
+import struct
+import threading
+import zlib
+
+from . import wire
+from .exceptions import CorruptRecord
+from .util import WORD_SIZE, write_int
+from .wire import read_word, to_signed
+
+log = logging.getLogger(__name__)
+
+DURABILITY_MODES = ["always", "interval", "none"]
+SYNC_INTERVAL = 0.01  # seconds
+# records appended before the index is snapshotted, None to disable
+SNAPSHOT_EVERY = 100_000
+
+MAGIC = b"SPSL"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">4sHH")  # magic, format version, wire version
+HEADER_BYTES = HEADER.pack(MAGIC, FORMAT_VERSION, wire.VERSION)
+
+CRC_SIZE = 4
+RECORD_SIZE = CRC_SIZE + wire.SIZE
+
+SNAPSHOT_HEADER = struct.Struct(">IQQ")  # crc32, log size, number of entries
+SNAPSHOT_ENTRY_SIZE = 2 * WORD_SIZE + 8  # channel id, round, offset
+
+
+def encode_record(signed_state):
+    record = bytearray(RECORD_SIZE)
+    wire.encode_into(record, CRC_SIZE, signed_state)
+    record[:CRC_SIZE] = zlib.crc32(record[CRC_SIZE:]).to_bytes(CRC_SIZE, "big")
+    return bytes(record)
+
+
+def _payload(record):
+    if len(record) != RECORD_SIZE:
+        raise CorruptRecord(f"record has {len(record)} bytes")
+    crc = int.from_bytes(record[:CRC_SIZE], "big")
+    payload = memoryview(record)[CRC_SIZE:]
+    if zlib.crc32(payload) != crc:
+        raise CorruptRecord("checksum mismatch")
+    return wire.SignedStateView(payload)
+
+
+def check_record(record):
+    """Return `(channel_id, round)` of a record or raise `CorruptRecord`."""
+    view = _payload(record)
+    return view.channel_id, view.round
+
+
+def decode_record(record):
+    return _payload(record).to_signed_state()
+
+
+def _fsync(fd):
+    getattr(os, "fdatasync", os.fsync)(fd)
+
+
+class StateLog:
+    def __init__(
+        self,
+        path,
+        durability="always",
+        interval=SYNC_INTERVAL,
+        snapshot_every=SNAPSHOT_EVERY,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        self.path = path
+        self.snapshot_path = path + ".idx"
+        self.durability = durability
+        self.snapshot_every = snapshot_every
+        self.fsyncs = 0
+
+        # channel id -> (round, offset)
+        self._index = {}
+        self._cond = threading.Condition()
+        self._syncing = False
+        self._since_snapshot = 0
+        # one snapshot at a time, they share the temporary file
+        self._snapshot_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            self._check_header()
+            self._written = self._synced = self._recover()
+        except CorruptRecord:
+            os.close(self._fd)
+            raise
+
+        self._stop = threading.Event()
+        self._syncer = None
+        if durability == "interval":
+            self._syncer = threading.Thread(
+                target=self._sync_periodically, args=(interval,), daemon=True
+            )
+            self._syncer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    # Recovery
+
+    def _check_header(self):
+        header = os.pread(self._fd, HEADER.size, 0)
+        if len(header) < HEADER.size and HEADER_BYTES.startswith(header):
+            # new log, or torn while writing the header
+            os.ftruncate(self._fd, 0)
+            os.write(self._fd, HEADER_BYTES)
+            _fsync(self._fd)
+            return
+        if len(header) < HEADER.size or not header.startswith(MAGIC):
+            raise CorruptRecord(f"{self.path} is not a state log")
+        _, format_version, wire_version = HEADER.unpack(header)
+        if (format_version, wire_version) != (FORMAT_VERSION, wire.VERSION):
+            raise CorruptRecord(
+                f"{self.path} has format {format_version}, wire {wire_version}, "
+                f"expected format {FORMAT_VERSION}, wire {wire.VERSION}"
+            )
+
+    def _load_snapshot(self, log_size):
+        try:
+            with open(self.snapshot_path, "rb") as snapshot_file:
+                data = snapshot_file.read()
+        except FileNotFoundError:
+            return HEADER.size
+        try:
+            crc, snapshot_size, count = SNAPSHOT_HEADER.unpack_from(data)
+        except struct.error:
+            count = -1
+        entries = data[SNAPSHOT_HEADER.size:]
+        if (
+            len(entries) != count * SNAPSHOT_ENTRY_SIZE
+            or zlib.crc32(data[4:]) != crc
+            or snapshot_size > log_size
+        ):
+            log.warning("ignoring invalid index snapshot %s", self.snapshot_path)
+            return HEADER.size
+        for start in range(0, len(entries), SNAPSHOT_ENTRY_SIZE):
+            channel_id = read_word(entries, start)
+            round = to_signed(read_word(entries, start + WORD_SIZE))
+            offset_start = start + 2 * WORD_SIZE
+            offset_end = offset_start + 8
+            offset = int.from_bytes(entries[offset_start:offset_end], "big")
+            self._index[channel_id] = (round, offset)
+        return snapshot_size
+
+    def _recover(self):
+        log_size = os.fstat(self._fd).st_size
+        offset = self._load_snapshot(log_size)
+        scanned = 0
+        while offset + RECORD_SIZE <= log_size:
+            record = os.pread(self._fd, RECORD_SIZE, offset)
+            try:
+                channel_id, round = check_record(record)
+            except CorruptRecord:
+                self._check_torn(offset, log_size)
+                break
+            self._index_put(channel_id, round, offset)
+            offset += RECORD_SIZE
+            scanned += 1
+        if offset < log_size:
+            log.warning("truncating %s bytes of torn log tail", log_size - offset)
+            os.ftruncate(self._fd, offset)
+            _fsync(self._fd)
+        log.debug("recovered %s channels, scanned %s records", len(self), scanned)
+        return offset
+
+    def _check_torn(self, corrupt_offset, log_size):
+        """Raise `CorruptRecord` if a valid record follows a corrupt one."""
+        offset = corrupt_offset + RECORD_SIZE
+        while offset + RECORD_SIZE <= log_size:
+            try:
+                check_record(os.pread(self._fd, RECORD_SIZE, offset))
+            except CorruptRecord:
+                offset += RECORD_SIZE
+                continue
+            raise CorruptRecord(
+                f"corrupt record at offset {corrupt_offset} of {self.path}, "
+                "followed by valid records"
+            )
+
+    # Writing
+
+    def _index_put(self, channel_id, round, offset):
+        current = self._index.get(channel_id)
+        if current is None or round >= current[0]:
+            self._index[channel_id] = (round, offset)
+
+    def append(self, signed_state):
+        self.append_many([signed_state])
+
+    def append_many(self, signed_states):
+        records = [encode_record(signed_state) for signed_state in signed_states]
+        with self._cond:
+            offset = self._written
+            data = b"".join(records)
+            if os.write(self._fd, data) != len(data):
+                raise OSError(f"short write to {self.path}")
+            for signed_state in signed_states:
+                self._index_put(signed_state.channel_id, signed_state.round, offset)
+                offset += RECORD_SIZE
+            self._written = offset
+            self._since_snapshot += len(records)
+            # only the appender crossing the threshold takes the snapshot
+            take_snapshot = (
+                self.snapshot_every and self._since_snapshot >= self.snapshot_every
+            )
+            if take_snapshot:
+                self._since_snapshot = 0
+        if self.durability == "always":
+            self._wait_synced(offset)
+        if take_snapshot:
+            self.snapshot()
+
+    def _wait_synced(self, position):
+        with self._cond:
+            while self._synced < position:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                # lead a group commit of everything written so far
+                self._syncing = True
+                target = self._written
+                self._cond.release()
+                try:
+                    _fsync(self._fd)
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._synced = max(self._synced, target)
+                self.fsyncs += 1
+
+    def sync(self):
+        self._wait_synced(self._written)
+
+    def _sync_periodically(self, interval):
+        while not self._stop.wait(interval):
+            self.sync()
+
+    def snapshot(self):
+        """Write the index, first syncing everything it refers to."""
+        with self._snapshot_lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        with self._cond:
+            if self._synced < self._written:
+                _fsync(self._fd)
+                self._synced = self._written
+                self.fsyncs += 1
+            log_size = self._synced
+            entries = [
+                (channel_id, round, offset)
+                for channel_id, (round, offset) in self._index.items()
+            ]
+            self._since_snapshot = 0
+        body = bytearray(SNAPSHOT_ENTRY_SIZE * len(entries))
+        for index, (channel_id, round, offset) in enumerate(entries):
+            start = index * SNAPSHOT_ENTRY_SIZE
+            write_int(body, start, channel_id)
+            write_int(body, start + WORD_SIZE, round)
+            offset_start = start + 2 * WORD_SIZE
+            offset_end = offset_start + 8
+            body[offset_start:offset_end] = offset.to_bytes(8, "big")
+        data = struct.pack(">QQ", log_size, len(entries)) + body
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as snapshot_file:
+            snapshot_file.write(zlib.crc32(data).to_bytes(4, "big") + data)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    # Reading
+
+    def channel_ids(self):
+        return list(self._index)
+
+    def latest(self, channel_id):
+        """The state with the highest round of a channel, or None."""
+        entry = self._index.get(channel_id)
+        if entry is None:
+            return None
+        return decode_record(os.pread(self._fd, RECORD_SIZE, entry[1]))
+
+    def close(self):
+        if self._fd is None:
+            return
+        self._stop.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        self.snapshot()
+        os.close(self._fd)
+        self._fd = None
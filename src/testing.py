@@ -0,0 +1,80 @@
+"""Test doubles shared by the tests and the benchmarks."""
+import os
+import time
+from collections import Counter
+
+from hexbytes import HexBytes
+from web3.utils.datastructures import AttributeDict
+
+
+class SimulatedNode:
+    """Stand-in for `web3` with the calls of `wait_for_receipts`.
+
+    Mines all sent transactions into one block every `block_time` seconds.
+    Receipts become available `receipt_lag` seconds after their block, like
+    on a node that is behind. Requests are counted per method in `counts`.
+    """
+
+    def __init__(self, block_time, receipt_lag=0):
+        self.eth = self
+        self.block_time = block_time
+        self.receipt_lag = receipt_lag
+        self.counts = Counter()
+        self._start = time.monotonic()
+        self._pending = []
+        # block hash -> (mined at, transaction hashes)
+        self._blocks = {}
+        self._mined = {}
+        self._filters = {}
+
+    def _mine(self):
+        now = time.monotonic()
+        while self._start + self.block_time * (len(self._blocks) + 1) <= now:
+            mined_at = self._start + self.block_time * (len(self._blocks) + 1)
+            block_hash = os.urandom(32)
+            self._blocks[block_hash] = (mined_at, self._pending)
+            for tx_hash in self._pending:
+                self._mined[tx_hash] = mined_at
+            for block_hashes in self._filters.values():
+                block_hashes.append(block_hash)
+            self._pending = []
+
+    def send(self, num_txs):
+        self._mine()
+        tx_hashes = [HexBytes(os.urandom(32)) for _ in range(num_txs)]
+        self._pending.extend(tx_hashes)
+        return tx_hashes
+
+    def getTransactionReceipt(self, tx_hash):
+        self.counts["eth_getTransactionReceipt"] += 1
+        self._mine()
+        mined_at = self._mined.get(HexBytes(tx_hash))
+        if mined_at is None or time.monotonic() < mined_at + self.receipt_lag:
+            return None
+        return AttributeDict({"transactionHash": HexBytes(tx_hash), "status": 1})
+
+    def filter(self, filter_params):
+        self.counts["eth_newBlockFilter"] += 1
+        filter_id = len(self._filters)
+        self._filters[filter_id] = []
+        return AttributeDict(
+            {
+                "filter_id": filter_id,
+                "get_new_entries": lambda: self._filter_changes(filter_id),
+            }
+        )
+
+    def _filter_changes(self, filter_id):
+        self.counts["eth_getFilterChanges"] += 1
+        self._mine()
+        block_hashes, self._filters[filter_id] = self._filters[filter_id], []
+        return block_hashes
+
+    def getBlock(self, block_hash):
+        self.counts["eth_getBlockByHash"] += 1
+        _, tx_hashes = self._blocks[block_hash]
+        return AttributeDict({"transactions": tx_hashes})
+
+    def uninstallFilter(self, filter_id):
+        self.counts["eth_uninstallFilter"] += 1
+        del self._filters[filter_id]
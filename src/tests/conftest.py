@@ -1,17 +1,21 @@
+import os
 from collections import namedtuple
+
 import eth_account
 import pytest
 from eth_utils.address import to_checksum_address
 from web3 import HTTPProvider, Web3
 from web3.middleware import geth_poa_middleware
 
-from ..channel import Channel, ChannelState, Payment
+from ..channel import Channel, ChannelState, Payment, Player
 from ..contracts.dappsys import DSToken
 from ..contracts.PreimageManager import PreimageManager
 from ..contracts.SpritesRegistry import SpritesRegistry
 from ..util import (
     GAS,
+    RequestCounter,
     check_tx,
+    connect_tester,
     deploy_contract,
     fund_account,
     fund_token,
@@ -51,22 +55,69 @@ ACCOUNTS = {
 }
 
 
+# Set SPRITES_COUNT_RPC=1 to print the number of JSON-RPC requests per method
+# at the end of the test session.
+RPC_COUNTER = RequestCounter() if os.environ.get("SPRITES_COUNT_RPC") else None
+
+# Set SPRITES_BACKEND=eth-tester to run on an in-process py-evm chain instead
+# of geth. Tests then revert the chain to a snapshot instead of redeploying.
+BACKEND = os.environ.get("SPRITES_BACKEND", "geth")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if RPC_COUNTER is None:
+        return
+    terminalreporter.section("JSON-RPC requests")
+    for method, count in RPC_COUNTER.counts.most_common():
+        terminalreporter.write_line(f"{method:<40} {count:>8}")
+    terminalreporter.write_line(f"{'total':<40} {RPC_COUNTER.total:>8}")
+
+
 @pytest.fixture(scope="session")
-def web3():
-    w3 = Web3(HTTPProvider(GETH_URL))
+def chain():
+    """Web3 and, with the eth-tester backend, the `EthereumTester`."""
+    if BACKEND == "eth-tester":
+        private_keys = [account.privateKey for account in ACCOUNTS.values()]
+        w3, tester = connect_tester(private_keys)
+    else:
+        w3, tester = Web3(HTTPProvider(GETH_URL)), None
+        # for POA dev chain, see "Geth-style Proof of Authority" in
+        # https://web3py.readthedocs.io/en/latest/middleware.html
+        w3.middleware_stack.inject(geth_poa_middleware, layer=0)
+
+    if RPC_COUNTER is not None:
+        w3.middleware_stack.add(RPC_COUNTER.middleware)
 
     # enable eth.account
     w3.eth.enable_unaudited_features()
+    return w3, tester
+
 
-    # for POA dev chain, see
-    # https://web3py.readthedocs.io/en/latest/middleware.html#geth-style-proof-of-authority
-    w3.middleware_stack.inject(geth_poa_middleware, layer=0)
-    return w3
+@pytest.fixture(scope="session")
+def web3(chain):
+    return chain[0]
+
+
+@pytest.fixture(scope="session")
+def tester(chain):
+    return chain[1]
+
+
+@pytest.fixture
+def snapshot(tester):
+    """Revert the chain after the test, if the backend supports it."""
+    if tester is None:
+        yield None
+        return
+    snapshot_id = tester.take_snapshot()
+    yield snapshot_id
+    tester.revert_to_snapshot(snapshot_id)
 
 
 # Account generation is slow, on the order of a second.
 # We reuse the accounts for the entire session but use function scoped
-# token contracts to make sure balances are zero initially.
+# token contracts (or revert to a snapshot) to make sure balances are zero
+# initially.
 
 
 @pytest.fixture
@@ -130,8 +181,7 @@ def preimage_manager(web3, deployer):
     )
 
 
-@pytest.fixture(scope="function")
-def token(web3, deployer):
+def _deploy_token(web3, deployer):
     token = deploy_contract(
         web3, deployer, "dappsys.sol", "DSToken", DSToken, args=[deployer]
     )
@@ -139,9 +189,22 @@ def token(web3, deployer):
     return token
 
 
+@pytest.fixture(scope="session")
+def tokens(web3, deployer, tester):
+    """Tokens deployed once, only if snapshots reset their balances."""
+    if tester is None:
+        return None
+    return [_deploy_token(web3, deployer) for _ in TOKEN_NAMES]
+
+
 @pytest.fixture(scope="function")
-def other_token(web3, deployer):
-    return token(web3, deployer)
+def token(web3, deployer, tokens, snapshot):
+    return tokens[0] if tokens else _deploy_token(web3, deployer)
+
+
+@pytest.fixture(scope="function")
+def other_token(web3, deployer, tokens, snapshot):
+    return tokens[1] if tokens else _deploy_token(web3, deployer)
 
 
 @pytest.fixture
@@ -311,7 +374,7 @@ def new_state(new_deposits, new_credits, new_withdrawals, new_round, new_payment
         credits=new_credits,
         withdrawals=new_withdrawals,
         round=new_round,
-        payment=new_payment,
+        payments=[new_payment],
     )
 
 
@@ -322,7 +385,7 @@ def last_state(deposits, credits, withdrawals, round, payment):
         credits=credits,
         withdrawals=withdrawals,
         round=round,
-        payment=payment,
+        payments=[payment],
     )
 
 
@@ -375,3 +438,33 @@ def other_channel_with_deposit(
 ):
     other_channel.deposit(sender=other_party, amount=deposit_amount)
     return other_channel
+
+
+@pytest.fixture
+def make_players():
+    """Factory of off-chain players alice and bob with channels between them."""
+
+    def make_players(channel_ids=(1,)):
+        alice, bob = Player(ACCOUNTS["alice"]), Player(ACCOUNTS["bob"])
+        for channel_id in channel_ids:
+            state = ChannelState(channel_id=channel_id, deposits=(10, 5))
+            alice.add_channel(state, bob.account.address)
+            bob.add_channel(state.to_other(), alice.account.address)
+        return alice, bob
+
+    return make_players
+
+
+@pytest.fixture
+def players(make_players):
+    return make_players()
+
+
+@pytest.fixture
+def exchange():
+    """Have `payee` countersign `proposal` of `payer`."""
+
+    def exchange(payer, payee, proposal):
+        payer.receive_countersignature(payee.receive_payment(proposal))
+
+    return exchange
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from web3 import HTTPProvider, Web3
+
+from ..artifacts import ArtifactRegistry
+from .conftest import ACCOUNTS
+
+ABI = [
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "getX",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "payable": False,
+        "stateMutability": "view",
+        "type": "function",
+    }
+]
+
+
+class Foo:
+    def __init__(self, contract):
+        self._contract = contract
+
+
+@pytest.fixture
+def artifacts(tmpdir):
+    path = tmpdir.join("contracts.json")
+    contract = {"abi": json.dumps(ABI), "bin": "6080"}
+    path.write(json.dumps({"contracts": {"contracts/Foo.sol:Foo": contract}}))
+    return ArtifactRegistry(str(path))
+
+
+def offline_web3():
+    return Web3(HTTPProvider("http://localhost:1"))
+
+
+def test_loads_once(artifacts, tmpdir):
+    assert artifacts.contract("Foo.sol", "Foo")["bin"] == "6080"
+    tmpdir.join("contracts.json").remove()
+    assert artifacts.abi("Foo.sol", "Foo") == ABI
+    assert artifacts.abi("Foo.sol", "Foo") is artifacts.abi("Foo.sol", "Foo")
+
+
+def test_factories_per_web3(artifacts):
+    web3, other_web3 = offline_web3(), offline_web3()
+    factory = artifacts.factory(web3, "Foo.sol", "Foo")
+    assert artifacts.factory(web3, "Foo.sol", "Foo") is factory
+    assert artifacts.factory(other_web3, "Foo.sol", "Foo") is not factory
+
+
+def test_attach(artifacts):
+    address = ACCOUNTS["alice"].address
+    web3 = offline_web3()
+    foo = artifacts.attach(web3, "Foo.sol", "Foo", Foo, address)
+    assert foo._contract.address == address
+    assert foo._contract.functions.getX
+    other = artifacts.attach(web3, "Foo.sol", "Foo", Foo, address)
+    assert other._contract is foo._contract
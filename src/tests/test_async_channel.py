@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from ..async_channel import AsyncChannel, check_tx
+from ..exceptions import TransactionTimeout
+from ..preimages import PreimageQueue
+from ..replica import ChannelReplica
+from ..testing import SimulatedNode
+from ..util import DELTA, TransactionFailed
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+@pytest.fixture
+def async_channel(channel):
+    return AsyncChannel(channel)
+
+
+@pytest.fixture
+def async_mock_channel(mock_channel):
+    return AsyncChannel(mock_channel)
+
+
+def test_async_state_matches_sync_state(channel, async_channel, acting_party):
+    assert run(async_channel.get_state(acting_party)) == channel.get_state(
+        acting_party
+    )
+
+
+def test_async_deposit(async_channel, acting_party, with_tokens, deposit_amount):
+    run(async_channel.deposit(acting_party, amount=deposit_amount))
+    assert run(async_channel.get_deposit(who=acting_party)) == deposit_amount
+
+
+def test_async_trigger_twice_fails(async_mock_channel, acting_party):
+    run(async_mock_channel.trigger(who=acting_party))
+    assert run(async_mock_channel.get_status()) == 1
+    with pytest.raises(TransactionFailed):
+        run(async_mock_channel.trigger(who=acting_party))
+
+
+def test_async_channels_run_concurrently(
+    channel, other_channel, acting_party, other_party
+):
+    async_channels = [AsyncChannel(channel), AsyncChannel(other_channel)]
+
+    async def trigger_all():
+        await asyncio.gather(*(c.trigger(who=acting_party) for c in async_channels))
+        return await asyncio.gather(*(c.get_status() for c in async_channels))
+
+    assert run(trigger_all()) == [1, 1]
+
+
+@pytest.mark.usefixtures("channel_with_deposit")
+def test_async_update(
+    channel, async_channel, acting_party, other_party, preimage, send_amount
+):
+    signed_state = run(
+        async_channel.conditional_payment(
+            sender=acting_party,
+            recipient=other_party.address,
+            amount=send_amount,
+            preimage=preimage,
+        )
+    )
+    args = signed_state.state_update_arguments()
+    run(async_channel.update(who=other_party, args=args))
+    assert channel.get_state(who=acting_party) == signed_state.to_unsigned()
+
+
+def test_async_channel_uses_replica(
+    channel, async_channel, acting_party, other_party, preimage
+):
+    replica = channel.replica = ChannelReplica(channel, max_age=60)
+    replica.refresh()
+    run(async_channel.trigger(who=acting_party))
+    assert replica.stale
+
+    signed_state = run(
+        async_channel.conditional_payment(
+            sender=acting_party,
+            recipient=other_party.address,
+            amount=0,
+            preimage=preimage,
+        )
+    )
+    assert not replica.stale
+    assert signed_state.payments[0].expiry == replica.synced_block + DELTA
+
+
+def test_async_submit_preimage_with_queue(
+    web3, channel, async_channel, preimage_manager, acting_party, preimage
+):
+    queue = channel.preimage_queue = PreimageQueue(
+        web3, preimage_manager, acting_party.address
+    )
+
+    async def submit_and_flush():
+        future = await async_channel.submit_preimage(acting_party, preimage)
+        assert len(queue) == 1
+        loop = asyncio.get_event_loop()
+        [receipt] = await loop.run_in_executor(None, queue.flush)
+        return receipt, await future
+
+    receipt, result = run(submit_and_flush())
+    assert result == receipt
+
+
+def test_check_tx_polls_until_deadline():
+    # the backoff would sleep past the lagging receipt, the last poll is at
+    # the deadline
+    node = SimulatedNode(block_time=0.2, receipt_lag=0.05)
+    [tx_hash] = node.send(1)
+    assert run(check_tx(node, tx_hash, timeout=0.28)).transactionHash == tx_hash
+
+
+def test_check_tx_times_out():
+    node = SimulatedNode(block_time=1)
+    [tx_hash] = node.send(1)
+    with pytest.raises(TransactionTimeout):
+        run(check_tx(node, tx_hash, timeout=0.05))
@@ -0,0 +1,221 @@
+import pytest
+
+from ..batch import (
+    FIELDS,
+    UPDATE_GAS,
+    UPDATE_MANY_GAS,
+    UPDATE_WORDS,
+    BatchReader,
+    get_states,
+    pack_updates,
+    state_from_words,
+    update_many,
+    update_words,
+)
+from ..channel import ChannelState, Payment
+from ..util import GAS, MAX_PAYMENTS, check_tx, check_txs
+from .conftest import ACCOUNTS
+
+
+@pytest.fixture
+def reader(web3):
+    return BatchReader(web3, batch_size=3)
+
+
+def test_batch_read_matches_channel_reads(reader, channel, other_channel, acting_party):
+    channels = [channel, other_channel]
+    results = reader.read(channels, who=acting_party)
+
+    for result, c in zip(results, channels):
+        assert set(result) == set(FIELDS)
+        assert result["state"] == c.get_state(acting_party)
+        assert result["deposit"] == c.get_deposit(who=acting_party)
+        assert result["status"] == c.get_status()
+        assert result["deadline"] == c.get_deadline()
+        assert result["withdrawn"] == c.get_withdrawn(acting_party)
+
+
+def test_batch_read_defaults_to_left(reader, channel):
+    [result] = reader.read([channel], fields=["state", "deposit"])
+    assert result["state"] == channel.get_state(channel.left)
+
+
+def test_batch_read_unknown_field(reader, channel):
+    with pytest.raises(ValueError):
+        reader.read([channel], fields=["balance"])
+
+
+def test_state_from_words():
+    payment = Payment(
+        preimage_hash=bytes(range(32)),
+        recipient=ACCOUNTS["bob"].address,
+        amount=3,
+        expiry=100,
+    )
+    state = ChannelState(
+        channel_id=5,
+        deposits=(9, 10),
+        credits=(-3, 3),
+        withdrawals=(1, 2),
+        round=-1,
+        payments=[Payment(), payment],
+    )
+    empty = [0] * (MAX_PAYMENTS - 2)
+    words = [
+        9,
+        10,
+        2 ** 256 - 3,
+        3,
+        1,
+        2,
+        2 ** 256 - 1,
+        *[0, int.from_bytes(payment.preimage_hash, "big"), *empty],
+        *[0, int(payment.recipient, 16), *empty],
+        *[0, 3, *empty],
+        *[0, 100, *empty],
+    ]
+    assert state_from_words(5, words) == state
+
+
+def test_get_states_matches_get_state(registry, channel, other_channel, acting_party):
+    channels = [channel, other_channel]
+    states = get_states(
+        registry, [c.channel_id for c in channels], acting_party.address, page_size=1
+    )
+    assert states == [c.get_state(acting_party) for c in channels]
+
+
+def test_get_states_for_non_player(registry, channel, third_party):
+    [state] = get_states(registry, [channel.channel_id], third_party.address)
+    assert state == channel.get_state(channel.left)
+
+
+def test_get_states_with_payments(registry, channel, acting_party, other_party):
+    # a gap between the slots checks the order of the payment words
+    payments = [
+        Payment(),
+        Payment(
+            preimage_hash=b"\x01" * 32,
+            recipient=other_party.address,
+            amount=1,
+            expiry=10,
+        ),
+        Payment(
+            preimage_hash=b"\x02" * 32,
+            recipient=acting_party.address,
+            amount=2,
+            expiry=20,
+        ),
+    ]
+    state = channel.get_state(acting_party).to(
+        credits=(1, 2), round=1, payments=payments
+    )
+    args = state.sign(acting_party.privateKey).state_update_arguments()
+    channel.update(other_party, args)
+    for who in (acting_party, other_party):
+        [on_chain] = get_states(registry, [channel.channel_id], who.address)
+        assert on_chain == channel.get_state(who)
+
+
+def test_update_words():
+    state = ChannelState(
+        channel_id=5,
+        credits=(-3, 3),
+        round=-1,
+        payments=[Payment(recipient=ACCOUNTS["bob"].address, amount=3)],
+    )
+    signed_state = state.sign(ACCOUNTS["alice"].privateKey)
+    words = update_words(signed_state)
+    empty = [0] * (MAX_PAYMENTS - 1)
+    assert len(words) == UPDATE_WORDS
+    assert words[:9] == [5, *signed_state.sig, 2 ** 256 - 3, 3, 0, 0, 2 ** 256 - 1]
+    assert words[9:] == [
+        *[0] * MAX_PAYMENTS,
+        *[int(ACCOUNTS["bob"].address, 16), *empty],
+        *[3, *empty],
+        *[0] * MAX_PAYMENTS,
+    ]
+
+
+def test_pack_updates_bounds_gas():
+    signed_states = [
+        ChannelState(channel_id=i).sign(ACCOUNTS["alice"].privateKey) for i in range(5)
+    ]
+    gas_limit = UPDATE_MANY_GAS + 2 * UPDATE_GAS
+    batches = list(pack_updates(signed_states, gas_limit=gas_limit))
+    assert [len(words) // UPDATE_WORDS for words in batches] == [2, 2, 1]
+    with pytest.raises(ValueError):
+        list(pack_updates(signed_states, gas_limit=UPDATE_GAS))
+
+
+def test_update_many(web3, registry, channel, other_channel, acting_party, other_party):
+    channels = [channel, other_channel]
+    signed_states = [
+        c.get_state(acting_party).to(round=1).sign(acting_party.privateKey)
+        for c in channels
+    ]
+    updated = update_many(web3, registry, signed_states, other_party.address)
+    assert updated == [c.channel_id for c in channels]
+    for c, signed_state in zip(channels, signed_states):
+        assert c.get_state(acting_party) == signed_state.to_unsigned()
+
+
+def test_update_many_skips_invalid_updates(
+    web3, registry, channel, other_channel, acting_party, other_party, third_party
+):
+    state = channel.get_state(acting_party).to(round=1)
+    other_state = other_channel.get_state(acting_party).to(round=1)
+    signed_states = [
+        state.sign(acting_party.privateKey),
+        # signed by a non-player
+        other_state.sign(third_party.privateKey),
+        # same round again
+        state.sign(acting_party.privateKey),
+    ]
+    updated = update_many(web3, registry, signed_states, other_party.address)
+    assert updated == [channel.channel_id]
+    assert other_channel.get_state(acting_party).round == -1
+
+
+def test_full_update_many_batch_stays_under_gas_bound(
+    web3, registry, mock_address, acting_party, other_party
+):
+    # worst case per update: every stored word goes from zero to non-zero
+    create = registry.createChannel(other_party.address, mock_address)
+    per_batch = (GAS - UPDATE_MANY_GAS) // UPDATE_GAS
+    tx_hashes = [
+        create.transact({"from": acting_party.address, "gas": GAS})
+        for _ in range(per_batch)
+    ]
+    channel_ids = [
+        web3.toInt(hexstr=receipt.logs[0].data)
+        for receipt in check_txs(web3, tx_hashes)
+    ]
+    payments = [
+        Payment(
+            preimage_hash=bytes([slot + 1]) * 32,
+            recipient=acting_party.address,
+            amount=slot + 1,
+            expiry=slot + 1,
+        )
+        for slot in range(MAX_PAYMENTS)
+    ]
+    signed_states = [
+        ChannelState(
+            channel_id=channel_id,
+            credits=(1, 1),
+            withdrawals=(1, 1),
+            round=1,
+            payments=payments,
+        ).sign(other_party.privateKey)
+        for channel_id in channel_ids
+    ]
+    [words] = pack_updates(signed_states)
+    assert len(words) // UPDATE_WORDS == per_batch
+
+    tx_hash = registry.updateMany(words).transact(
+        {"from": acting_party.address, "gas": GAS}
+    )
+    receipt = check_tx(web3, tx_hash)
+    assert len(receipt.logs) == per_batch
+    assert receipt.gasUsed <= UPDATE_MANY_GAS + per_batch * UPDATE_GAS
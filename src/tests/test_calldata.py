@@ -0,0 +1,51 @@
+import pytest
+from eth_abi import encode_abi
+
+from ..calldata import Function, encoder
+from .conftest import ACCOUNTS
+
+p = pytest.mark.parametrize
+
+ADDRESS = ACCOUNTS["alice"].address
+
+
+@p(
+    "types, args",
+    [
+        (["uint256", "int256", "address", "bool"], [1, -1, ADDRESS, True]),
+        (
+            ["uint256[3]", "int256[2]", "bytes32[2]"],
+            [[27, 1, 2], [-3, 3], [b"\1", b""]],
+        ),
+        (["uint8", "int8", "bytes4"], [255, -128, b"\1\2\3\4"]),
+        (["uint256[]", "address"], [[1, 2, 3], ADDRESS]),
+        (["bytes32[]", "uint256[]", "uint256"], [[b"\1" * 32], [], 7]),
+        # falls back to eth_abi
+        (["bytes", "uint256"], [b"xyz", 3]),
+    ],
+)
+def test_encoder_matches_eth_abi(types, args):
+    assert encoder(types)(args) == encode_abi(types, args)
+
+
+@p(
+    "type_str, value",
+    [
+        ("uint8", 256),
+        ("uint256", -1),
+        ("int8", 128),
+        ("bytes4", b"\0" * 5),
+        ("address", "0x1234"),
+        ("uint256[2]", [1]),
+    ],
+)
+def test_encoder_rejects_out_of_range(type_str, value):
+    with pytest.raises(ValueError):
+        encoder([type_str])([value])
+
+
+def test_function():
+    function = Function("0x0423a132", ["uint256"])
+    assert function.encode(1) == bytes.fromhex("0423a132") + (1).to_bytes(32, "big")
+    with pytest.raises(TypeError):
+        function.encode(1, 2)
@@ -0,0 +1,159 @@
+import attr
+import pytest
+
+from ..channel import EMPTY_PAYMENTS, ChannelState, Payment, SignedState
+from ..exceptions import PaymentError
+from ..util import MAX_PAYMENTS
+from .conftest import ACCOUNTS
+
+PREIMAGE = b"\x01" * 32
+
+
+@pytest.fixture
+def state():
+    return ChannelState(
+        channel_id=3,
+        deposits=[5, 7],
+        credits=[-1, 1],
+        withdrawals=[0, 2],
+        round=4,
+        payments=[Payment(amount=0)],
+    )
+
+
+def test_state_is_immutable(state):
+    with pytest.raises(attr.exceptions.FrozenInstanceError):
+        state.round = 5
+    with pytest.raises(TypeError):
+        state.credits[0] = 10
+
+
+def test_lists_are_converted_to_tuples(state):
+    assert state.deposits == (5, 7)
+    assert state.credits == (-1, 1)
+    assert state.withdrawals == (0, 2)
+
+
+def test_derived_states_share_members(state):
+    new_state = state.to(round=state.round + 1)
+    assert new_state.payments is state.payments
+    assert new_state.deposits is state.deposits
+
+    other = state.to_other()
+    assert other.payments is state.payments
+    assert other.to_other() == state
+
+
+def test_conditional_payment_leaves_original_untouched(state):
+    new_state = state.conditional_payment(
+        recipient=ACCOUNTS["bob"].address, amount=3, expiry=10, preimage=PREIMAGE
+    )
+    assert state.credits == (-1, 1)
+    assert state.payments == EMPTY_PAYMENTS
+    assert new_state.credits == (-4, 1)
+    assert new_state.payments[0].amount == 3
+    assert new_state.deposits is state.deposits
+
+
+def test_complete_payment_credits_recipient(state):
+    pending = state.conditional_payment(
+        recipient=ACCOUNTS["bob"].address, amount=3, expiry=10, preimage=PREIMAGE
+    )
+    completed = pending.complete_payment()
+    assert completed.credits == (-4, 4)
+    assert completed.payments == EMPTY_PAYMENTS
+    assert completed.round == pending.round + 1
+    pending.validate(completed, command="complete")
+
+
+def test_cancel_payment_returns_credits(state):
+    pending = state.conditional_payment(
+        recipient=ACCOUNTS["bob"].address, amount=3, expiry=10, preimage=PREIMAGE
+    )
+    cancelled = pending.cancel_payment()
+    assert cancelled.credits == state.credits
+    assert cancelled.payments == EMPTY_PAYMENTS
+    assert cancelled.round == pending.round + 1
+    pending.validate(cancelled, command="cancel")
+
+
+def open_payments(state, amounts):
+    for amount in amounts:
+        state = state.conditional_payment(
+            recipient=ACCOUNTS["bob"].address,
+            amount=amount,
+            expiry=10,
+            preimage=PREIMAGE,
+        )
+    return state
+
+
+def test_concurrent_payments_use_free_slots(state):
+    pending = open_payments(state, [1, 2])
+    assert [payment.amount for payment in pending.payments] == [1, 2, 0, 0]
+    assert pending.credits == (-4, 1)
+    assert pending.pending_slots() == [0, 1]
+
+    completed = pending.complete_payment(slot=0)
+    pending.validate(completed, command="complete")
+    assert completed.credits == (-4, 2)
+    assert completed.pending_slots() == [1]
+
+    reopened = open_payments(completed, [1])
+    completed.validate(reopened, command="open")
+    assert [payment.amount for payment in reopened.payments] == [1, 2, 0, 0]
+
+
+def test_slot_is_required_with_several_pending(state):
+    pending = open_payments(state, [1, 2])
+    with pytest.raises(PaymentError):
+        pending.complete_payment()
+    with pytest.raises(PaymentError):
+        pending.cancel_payment(slot=2)
+
+
+def test_slots_run_out(state):
+    pending = open_payments(state, [1] * MAX_PAYMENTS)
+    with pytest.raises(PaymentError):
+        open_payments(pending, [1])
+
+
+def test_only_one_slot_may_change(state):
+    twice = open_payments(state, [1, 1]).to(round=state.round + 1)
+    assert twice.credits == (-3, 1)
+    with pytest.raises(PaymentError):
+        state.validate(twice, command="open")
+
+
+def test_payments_are_padded(state):
+    assert len(state.payments) == MAX_PAYMENTS
+    with pytest.raises(ValueError):
+        state.to(payments=[Payment()] * (MAX_PAYMENTS + 1))
+    with pytest.raises(TypeError):
+        state.to(payments=[None])
+
+
+def test_command_is_set_on_one_slot(state):
+    pending = open_payments(state, [1, 2]).with_command(1, "open")
+    assert pending.command() == (1, "open")
+    completed = pending.complete_payment(slot=0).with_command(0, "complete")
+    assert completed.command() == (0, "complete")
+    assert [payment.command for payment in completed.payments[1:]] == [None] * 3
+
+
+def test_trusted_construction_equals_validated(state):
+    fields = attr.astuple(state, recurse=False)
+    assert ChannelState.trusted(*fields) == state
+    assert ChannelState.trusted(channel_id=3) == ChannelState(channel_id=3)
+
+
+def test_signed_state_roundtrip(state):
+    signed = state.sign(ACCOUNTS["alice"].privateKey)
+    assert isinstance(signed, SignedState)
+    assert isinstance(signed.sig, tuple)
+    assert signed.to_unsigned() == state
+    assert signed.recover_address() == ACCOUNTS["alice"].address
+
+
+def test_states_are_hashable(state):
+    assert len({state, state.to(), state.to_other()}) == 2
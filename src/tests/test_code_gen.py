@@ -4,8 +4,10 @@ import os
 
 import astor
 import pytest
+from web3 import HTTPProvider, Web3
 
-from src import code_gen
+from src import calldata, code_gen
+from src.tests.conftest import ACCOUNTS
 
 
 @pytest.fixture
@@ -29,3 +31,51 @@ def test_code_gen(manually_converted, abi):
 
     for orig, gen in itertools.zip_longest(original_lines, generated_lines):
         assert orig == gen
+
+
+UPDATE_ABI = [
+    {
+        "constant": False,
+        "inputs": [
+            {"name": "channelID", "type": "uint256"},
+            {"name": "sig", "type": "uint256[3]"},
+            {"name": "credits", "type": "int256[2]"},
+            {"name": "recipients", "type": "address[2]"},
+        ],
+        "name": "update",
+        "outputs": [],
+        "payable": False,
+        "stateMutability": "nonpayable",
+        "type": "function",
+    },
+    {
+        "constant": False,
+        "inputs": [{"name": "words", "type": "uint256[]"}],
+        "name": "updateMany",
+        "outputs": [{"name": "applied", "type": "uint256"}],
+        "payable": False,
+        "stateMutability": "nonpayable",
+        "type": "function",
+    },
+]
+
+
+def test_fast_wrapper_matches_web3():
+    class_def = code_gen.make_python_contract("Registry", UPDATE_ABI, fast=True)
+    namespace = {"calldata": calldata}
+    exec(astor.to_source(code_gen.wrap_module([class_def])), namespace)
+    registry = namespace["Registry"](None)
+
+    contract = Web3(HTTPProvider("http://localhost:1")).eth.contract(abi=UPDATE_ABI)
+    recipients = [ACCOUNTS["alice"].address, ACCOUNTS["bob"].address]
+    args = (5, [27, 1, 2], [-3, 3], recipients)
+    expected = contract.encodeABI("update", args)
+    assert "0x" + registry.update_calldata(*args).hex() == expected
+    expected = contract.encodeABI("updateMany", [[1, 2, 3]])
+    assert "0x" + registry.updateMany_calldata([1, 2, 3]).hex() == expected
+
+
+def test_fast_module_imports_calldata():
+    class_def = code_gen.make_python_contract("Registry", UPDATE_ABI, fast=True)
+    source = astor.to_source(code_gen.wrap_module([class_def], fast=True))
+    assert source.startswith("from .. import calldata\n")
@@ -0,0 +1,73 @@
+import pytest
+from eth_abi import encode_abi
+
+from ..events import STATUS_PENDING
+from ..indexer import CREATE_CHANNEL_SELECTOR, Indexer, decode_create_channel
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"].address
+BOB = ACCOUNTS["bob"].address
+
+
+def test_decode_create_channel(mock_address):
+    data = CREATE_CHANNEL_SELECTOR + encode_abi(
+        ["address", "address"], [BOB, mock_address]
+    )
+    transaction = {"from": ALICE.lower(), "input": data.hex()}
+    assert decode_create_channel(transaction) == (ALICE, BOB, mock_address)
+
+
+def test_decode_other_transaction():
+    transaction = {"from": ALICE, "input": "0x12345678"}
+    assert decode_create_channel(transaction) == (None, None, None)
+
+
+@pytest.fixture
+def indexer(web3, registry, tmpdir):
+    indexer = Indexer(
+        web3, registry, str(tmpdir.join("index.db")), web3.eth.blockNumber
+    )
+    yield indexer
+    indexer.close()
+
+
+def test_index_new_channel(web3, indexer, channel, token):
+    indexer.run_once()
+    record = indexer.get_channel(channel.channel_id)
+    assert (record.left, record.right) == (channel.left.address, channel.right.address)
+    assert record.token == token._contract.address
+    assert record.round == -1
+    assert record in indexer.channels_of(channel.right.address)
+    assert indexer.channels_by_token(token._contract.address) == [record]
+
+
+def test_index_pending_channel(web3, indexer, channel, acting_party):
+    channel.trigger(who=acting_party)
+    indexer.run_once()
+    record = indexer.get_channel(channel.channel_id)
+    assert record.status == STATUS_PENDING
+    assert record.deadline == channel.get_deadline()
+    assert record in indexer.channels_by_status(STATUS_PENDING)
+    assert record in indexer.pending_before(record.deadline)
+    assert record not in indexer.pending_before(record.deadline - 1)
+
+
+def test_index_resumes_from_checkpoint(web3, registry, indexer, channel, tmpdir):
+    indexer.run_once()
+    checkpoint = indexer.checkpoint
+    indexer.close()
+
+    resumed = Indexer(web3, registry, str(tmpdir.join("index.db")))
+    assert resumed.checkpoint == checkpoint
+    assert resumed.get_channel(channel.channel_id) is not None
+    resumed.close()
+
+
+def test_index_small_chunks(web3, registry, channel, other_channel):
+    indexer = Indexer(
+        web3, registry, start_block=web3.eth.blockNumber - 20, chunk_size=1
+    )
+    head = web3.eth.blockNumber
+    indexer.run_once()
+    assert indexer.checkpoint >= head
+    assert indexer.get_channel(other_channel.channel_id) is not None
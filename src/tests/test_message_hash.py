@@ -0,0 +1,69 @@
+import random
+
+import pytest
+from eth_account import Account
+
+from ..channel import MESSAGE_INPUTS, ChannelState, Payment
+from ..util import (
+    MESSAGE_LENGTH,
+    ZERO_ADDRESS,
+    hash_message,
+    hash_state_message,
+    pack,
+    pack_message,
+)
+
+INT_EDGES = [0, 1, -1, 2 ** 255, -(2 ** 255)]
+
+
+def reference_message_hash(state):
+    state_data = state.state_data()
+    message_parts = (state_data[k] for k in MESSAGE_INPUTS)
+    return hash_message(pack(message_parts))
+
+
+def random_int(rng):
+    return rng.choice([rng.choice(INT_EDGES), rng.randint(-(2 ** 64), 2 ** 64)])
+
+
+def random_state(rng):
+    payment = Payment(
+        preimage_hash=bytes(rng.getrandbits(8) for _ in range(32)),
+        recipient=rng.choice([ZERO_ADDRESS, Account.create().address]),
+        amount=random_int(rng),
+        expiry=random_int(rng),
+    )
+    return ChannelState(
+        channel_id=abs(random_int(rng)),
+        deposits=[random_int(rng), random_int(rng)],
+        credits=[random_int(rng), random_int(rng)],
+        withdrawals=[random_int(rng), random_int(rng)],
+        round=random_int(rng),
+        payments=[payment],
+    )
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_message_hash_matches_reference(seed):
+    state = random_state(random.Random(seed))
+    assert state.message_hash() == reference_message_hash(state)
+
+
+def test_default_state_matches_reference():
+    state = ChannelState()
+    assert state.message_hash() == reference_message_hash(state)
+
+
+def test_pack_message_matches_pack():
+    state = random_state(random.Random(0))
+    state_data = state.state_data()
+    packed = pack(state_data[k] for k in MESSAGE_INPUTS)
+    assert pack_message(*state.message_inputs()) == packed
+    assert len(packed) == MESSAGE_LENGTH
+
+
+@pytest.mark.parametrize("value", [2 ** 255 + 1, -(2 ** 255) - 1])
+def test_out_of_range_int_fails(value):
+    inputs = ChannelState(round=0).message_inputs()
+    with pytest.raises(ValueError):
+        hash_state_message(value, *inputs[1:])
@@ -2,9 +2,10 @@
 import pytest
 
 from .conftest import FUND_TOKEN_AMOUNT
-from ..channel import Payment
+from ..channel import EMPTY_PAYMENTS
 from ..util import (
     DELTA,
+    MAX_PAYMENTS,
     ZERO_ADDRESS,
     ZERO_PREIMAGE_HASH,
     TransactionFailed,
@@ -28,16 +29,17 @@ def test_channel_can_create_channel(
 
 def test_channel_initial_state(channel, acting_party):
     state = channel.get_state(who=acting_party)
-    assert state.deposits == [0, 0]
-    assert state.credits == [0, 0]
-    assert state.withdrawals == [0, 0]
+    assert state.deposits == (0, 0)
+    assert state.credits == (0, 0)
+    assert state.withdrawals == (0, 0)
     assert state.round == -1
 
-    payment = state.payment
-    assert payment.preimage_hash == ZERO_PREIMAGE_HASH
-    assert payment.expiry == 0
-    assert payment.amount == 0
-    assert payment.recipient == ZERO_ADDRESS
+    assert len(state.payments) == MAX_PAYMENTS
+    for payment in state.payments:
+        assert payment.preimage_hash == ZERO_PREIMAGE_HASH
+        assert payment.expiry == 0
+        assert payment.amount == 0
+        assert payment.recipient == ZERO_ADDRESS
 
 
 def test_deposit_can_deposit(channel, acting_party, with_tokens, deposit_amount):
@@ -221,9 +223,9 @@ def test_finalize_finalize_succeeds_after_deadline(web3, mock_channel, acting_pa
     state = mock_channel.get_state(who=acting_party)
 
     # channel had no deposits or payments, should all be empty still
-    assert state.withdrawals == [0, 0]
-    assert state.credits == [0, 0]
-    assert state.payment == Payment()
+    assert state.withdrawals == (0, 0)
+    assert state.credits == (0, 0)
+    assert state.payments == EMPTY_PAYMENTS
 
 
 def test_finalize_dispute_payment_completes_on_chain(
@@ -248,9 +250,40 @@ def test_finalize_dispute_payment_completes_on_chain(
 
     state = channel.get_state(who=acting_party)
 
-    assert state.deposits == [deposit_amount, 0]
-    assert state.credits == [-deposit_amount, 0]
-    assert state.withdrawals == [deposit_amount - send_amount, send_amount]
+    assert state.deposits == (deposit_amount, 0)
+    assert state.credits == (-deposit_amount, 0)
+    assert state.withdrawals == (deposit_amount - send_amount, send_amount)
+
+
+def test_finalize_resolves_concurrent_payments(
+    web3, acting_party, other_party, channel_with_deposit, deposit_amount
+):
+    channel = channel_with_deposit
+    preimages = [bytes([i + 1]) * 32 for i in range(MAX_PAYMENTS)]
+    amounts = [2] * MAX_PAYMENTS
+    state = channel.get_state(acting_party)
+    for amount, preimage in zip(amounts, preimages):
+        state = state.conditional_payment(
+            recipient=other_party.address,
+            amount=amount,
+            expiry=web3.eth.blockNumber + DELTA,
+            preimage=preimage,
+        )
+    signed_state = state.sign(acting_party.privateKey)
+    channel.update(who=other_party, args=signed_state.state_update_arguments())
+    assert channel.get_state(acting_party) == state
+
+    # only every other payment completes
+    revealed = amounts[::2]
+    for preimage in preimages[::2]:
+        channel.submit_preimage(who=other_party, preimage=preimage)
+    channel.trigger(who=other_party)
+    wait_blocks(web3, DELTA + 1)
+    channel.finalize(who=other_party)
+
+    state = channel.get_state(who=acting_party)
+    assert state.payments == EMPTY_PAYMENTS
+    assert state.withdrawals == (deposit_amount - sum(revealed), sum(revealed))
 
 
 # TODO decribe all scenarios (submit/not submit, wait/no wait ... )
@@ -280,9 +313,9 @@ def test_finalize_dispute_payment_cancels_off_chain(
 
     state = channel.get_state(who=acting_party)
 
-    assert state.deposits == [deposit_amount, 0]
-    assert state.credits == [-deposit_amount, 0]
-    assert state.withdrawals == [deposit_amount, 0]
+    assert state.deposits == (deposit_amount, 0)
+    assert state.credits == (-deposit_amount, 0)
+    assert state.withdrawals == (deposit_amount, 0)
 
 
 def test_finalize_unauthorized_party_cannot_finalize(mock_channel, other_party):
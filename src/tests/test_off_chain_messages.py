@@ -77,8 +77,8 @@ def test_complete_payment_valid(last_state, new_state):
 def test_complete_payment(last_state, new_state):
     checks = [
         new_state.round > last_state.round,
-        last_state.payment.amount != 0,
-        new_state.payment.amount == 0,
+        last_state.payments[0].amount != 0,
+        new_state.payments[0].amount == 0,
         last_state.deposits == new_state.deposits,
         last_state.withdrawals == new_state.withdrawals,
     ]
@@ -107,8 +107,8 @@ def test_cancel_payment_valid(last_state, new_state):
 def test_cancel_payment(last_state, new_state):
     checks = [
         new_state.round > last_state.round,
-        last_state.payment.amount != 0,
-        new_state.payment.amount == 0,
+        last_state.payments[0].amount != 0,
+        new_state.payments[0].amount == 0,
         last_state.deposits == new_state.deposits,
         last_state.withdrawals == new_state.withdrawals,
     ]
@@ -0,0 +1,193 @@
+import threading
+
+import pytest
+
+from ..channel import Payment
+from ..exceptions import BadSignature, ForbiddenStateChange, Overpayment, PaymentError
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"]
+BOB = ACCOUNTS["bob"]
+CHARLIE = ACCOUNTS["charlie"]
+PREIMAGE = b"\x01" * 32
+EXPIRY = 100
+
+
+def test_open_and_complete_payment(players, exchange):
+    alice, bob = players
+    exchange(alice, bob, alice.make_payment(1, 3, PREIMAGE, EXPIRY))
+    assert alice.states[1].credits == (-3, 0)
+    assert alice.states[1].payments[0].amount == 3
+
+    exchange(alice, bob, alice.complete_payment(1))
+    assert alice.states[1].credits == (-3, 3)
+    assert alice.states[1].round == 2
+    assert bob.states[1] == alice.states[1].to_other()
+
+
+def test_agreed_states_are_signed_by_counterparty(players, exchange):
+    alice, bob = players
+    exchange(alice, bob, alice.make_payment(1, 3, PREIMAGE, EXPIRY))
+    alice.signed_states[1].verify_signature(BOB.address)
+    bob.signed_states[1].verify_signature(ALICE.address)
+    assert alice.signed_states[1].to_unsigned().to_other() == alice.states[1]
+
+
+def test_cancel_payment(players, exchange):
+    alice, bob = players
+    exchange(alice, bob, alice.make_payment(1, 3, PREIMAGE, EXPIRY))
+    exchange(alice, bob, alice.cancel_payment(1))
+    assert alice.states[1].credits == (0, 0)
+    assert bob.states[1].credits == (0, 0)
+
+
+def test_proposal_without_command_is_rejected(players):
+    alice, bob = players
+    # a payment to alice with nothing reserved for it
+    payment = Payment(amount=1000, recipient=ALICE.address)
+    state = alice.states[1].to(round=1, payments=[payment])
+    with pytest.raises(PaymentError):
+        bob.receive_payment(state.sign(ALICE.privateKey))
+    with pytest.raises(PaymentError):
+        bob.receive_payment(state.with_command(0, "steal").sign(ALICE.privateKey))
+    assert bob.states[1].round == 0
+
+
+def test_update_must_not_change_payments(players):
+    alice, bob = players
+    state = alice.states[1]
+    new_state = state.to(round=1, payments=[Payment(amount=1, recipient=ALICE.address)])
+    with pytest.raises(ForbiddenStateChange):
+        state.validate(new_state)
+
+
+def test_payee_refuses_cancel_with_known_preimage(players, exchange):
+    alice, bob = players
+    exchange(alice, bob, alice.make_payment(1, 3, PREIMAGE, EXPIRY))
+    bob.add_preimage(PREIMAGE)
+    with pytest.raises(PaymentError):
+        bob.receive_payment(alice.cancel_payment(1))
+    assert bob.states[1].credits == (0, -3)
+
+
+def test_overpayment_is_rejected(players):
+    alice, bob = players
+    proposal = alice.make_payment(1, 11, PREIMAGE, EXPIRY)
+    with pytest.raises(Overpayment):
+        bob.receive_payment(proposal)
+    assert bob.states[1].round == 0
+
+
+def test_proposal_signed_by_someone_else_is_rejected(players):
+    alice, bob = players
+    proposal = alice.make_payment(1, 3, PREIMAGE, EXPIRY)
+    forged = proposal.to_unsigned().sign(CHARLIE.privateKey)
+    with pytest.raises(BadSignature):
+        bob.receive_payment(forged)
+
+
+def test_payment_to_someone_else_is_rejected(players):
+    alice, bob = players
+    alice.counterparties[1] = CHARLIE.address
+    proposal = alice.make_payment(1, 3, PREIMAGE, EXPIRY)
+    with pytest.raises(PaymentError):
+        bob.receive_payment(proposal)
+
+
+def test_one_proposal_at_a_time(players):
+    alice, bob = players
+    alice.make_payment(1, 3, PREIMAGE, EXPIRY)
+    with pytest.raises(PaymentError):
+        alice.make_payment(1, 1, PREIMAGE, EXPIRY)
+
+
+def test_abandon_proposal(players, exchange):
+    alice, bob = players
+    alice.make_payment(1, 3, PREIMAGE, EXPIRY)
+    alice.abandon_proposal(1)
+    assert alice.states[1].round == 0
+    exchange(alice, bob, alice.make_payment(1, 1, PREIMAGE, EXPIRY))
+    assert alice.states[1].credits == (-1, 0)
+
+
+def test_countersignature_must_match_proposal(players):
+    alice, bob = players
+    alice.make_payment(1, 3, PREIMAGE, EXPIRY)
+    other = bob.states[1].to(round=1).sign(BOB.privateKey)
+    with pytest.raises(PaymentError):
+        alice.receive_countersignature(other)
+
+
+def test_unknown_channel(players):
+    alice, bob = players
+    with pytest.raises(PaymentError):
+        alice.complete_payment(2)
+
+
+def test_payments_in_flight_in_one_channel(players, exchange):
+    alice, bob = players
+    for amount in [1, 2, 3]:
+        exchange(alice, bob, alice.make_payment(1, amount, PREIMAGE, EXPIRY))
+    assert alice.states[1].pending_slots() == [0, 1, 2]
+
+    # complete and cancel out of order
+    with pytest.raises(PaymentError):
+        alice.complete_payment(1)
+    exchange(alice, bob, alice.complete_payment(1, slot=1))
+    exchange(alice, bob, alice.cancel_payment(1, slot=0))
+    assert alice.states[1].credits == (-5, 2)
+    assert bob.states[1] == alice.states[1].to_other()
+    assert alice.states[1].pending_slots() == [2]
+
+
+def test_completing_payment_to_proposer_is_rejected(players, exchange):
+    alice, bob = players
+    exchange(bob, alice, bob.make_payment(1, 2, PREIMAGE, EXPIRY))
+    # alice must not settle bob's payment to her on bob's behalf
+    proposal = alice.states[1].complete_payment()
+    proposal = proposal.with_command(0, "complete").sign(ALICE.privateKey)
+    with pytest.raises(PaymentError):
+        bob.receive_payment(proposal)
+
+
+def test_command_must_be_on_changed_slot(players, exchange):
+    alice, bob = players
+    exchange(alice, bob, alice.make_payment(1, 2, PREIMAGE, EXPIRY))
+    # opens a payment to alice in slot 1, the command is on bob's payment
+    state = alice.states[1].conditional_payment(
+        recipient=ALICE.address, amount=1, expiry=EXPIRY, preimage=PREIMAGE
+    )
+    proposal = state.with_command(0, "open").sign(ALICE.privateKey)
+    with pytest.raises(PaymentError):
+        bob.receive_payment(proposal)
+
+
+def test_validate_checks_recipient(players):
+    alice, _ = players
+    state = alice.states[1]
+    new_state = state.conditional_payment(
+        recipient=ALICE.address, amount=1, expiry=EXPIRY, preimage=PREIMAGE
+    )
+    state.validate(new_state, command="open")
+    with pytest.raises(PaymentError):
+        state.validate(new_state, command="open", recipient=BOB.address)
+
+
+def test_concurrent_payments(make_players, exchange):
+    channel_ids = range(4)
+    alice, bob = make_players(channel_ids)
+
+    def pay(channel_id):
+        for _ in range(5):
+            exchange(alice, bob, alice.make_payment(channel_id, 1, PREIMAGE, EXPIRY))
+            exchange(alice, bob, alice.complete_payment(channel_id))
+
+    threads = [threading.Thread(target=pay, args=(i,)) for i in channel_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for channel_id in channel_ids:
+        assert alice.states[channel_id].credits == (-5, 5)
+        assert bob.states[channel_id].credits == (5, -5)
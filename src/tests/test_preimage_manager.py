@@ -1,3 +1,103 @@
+import pytest
+from eth_utils import keccak
+
+from ..preimages import PreimageQueue, revealed_before
+from ..util import GAS, check_tx
+
+
 def test_preimage_manager(web3, channel, preimage_manager, acting_party, preimage):
     channel.submit_preimage(who=acting_party, preimage=preimage)
     assert preimage_manager.revealedBefore(preimage, web3.eth.blockNumber)
+
+
+def test_submit_preimages(web3, preimage_manager, acting_party):
+    preimages = [bytes([i + 1]) * 32 for i in range(3)]
+    tx_hash = preimage_manager.submitPreimages(preimages[:2]).transact(
+        {"from": acting_party.address, "gas": GAS}
+    )
+    check_tx(web3, tx_hash)
+    hashes = [keccak(preimage) for preimage in preimages]
+    block_number = web3.eth.blockNumber
+    assert revealed_before(preimage_manager, hashes, block_number) == [
+        True,
+        True,
+        False,
+    ]
+    assert revealed_before(preimage_manager, hashes, block_number - 1) == [False] * 3
+
+
+def test_submit_preimages_keeps_first_reveal(web3, preimage_manager, acting_party):
+    preimage = b"\x01" * 32
+    submit = preimage_manager.submitPreimages([preimage, preimage])
+    check_tx(web3, submit.transact({"from": acting_party.address, "gas": GAS}))
+    revealed_at = web3.eth.blockNumber
+    check_tx(web3, submit.transact({"from": acting_party.address, "gas": GAS}))
+    assert revealed_before(preimage_manager, [keccak(preimage)], revealed_at) == [True]
+
+
+def test_preimage_queue_merges_channels(
+    web3, channel, other_channel, preimage_manager, acting_party
+):
+    queue = PreimageQueue(web3, preimage_manager, acting_party.address)
+    channel.preimage_queue = other_channel.preimage_queue = queue
+    preimages = [b"\x0a" * 32, b"\x0b" * 32]
+    futures = [
+        c.submit_preimage(who=acting_party, preimage=preimage)
+        for c, preimage in zip([channel, other_channel], preimages)
+    ]
+    # same preimage again
+    futures.append(channel.submit_preimage(who=acting_party, preimage=preimages[0]))
+    assert len(queue) == 2
+
+    [receipt] = queue.flush()
+    assert [future.result() for future in futures] == [receipt] * 3
+    hashes = [keccak(preimage) for preimage in preimages]
+    assert revealed_before(preimage_manager, hashes, receipt.blockNumber) == [
+        True,
+        True,
+    ]
+    assert queue.flush() == []
+
+
+class FailingManager:
+    """`PreimageManager` stub whose transactions can't be sent."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def submitPreimages(self, preimages):
+        return self
+
+    def transact(self, transaction):
+        self.calls += 1
+        raise ValueError("nonce too low")
+
+
+def test_failed_submission_fails_futures():
+    manager = FailingManager()
+    queue = PreimageQueue(None, manager, "0x0", max_preimages=1)
+    futures = [queue.add(bytes([i + 1]) * 32) for i in range(3)]
+    with pytest.raises(ValueError, match="nonce too low"):
+        queue.flush()
+    assert manager.calls == 1
+    for future in futures:
+        with pytest.raises(ValueError, match="nonce too low"):
+            future.result(timeout=0)
+    assert len(queue) == 0
+
+
+def test_run_continues_after_failed_flush():
+    manager = FailingManager()
+    queue = PreimageQueue(None, manager, "0x0")
+    futures = []
+
+    def stop():
+        # queue a preimage before each of two flushes
+        if len(futures) == 2:
+            return True
+        futures.append(queue.add(bytes([len(futures) + 1]) * 32))
+        return False
+
+    queue.run(stop, poll_interval=0)
+    assert manager.calls == 2
+    assert all(isinstance(future.exception(0), ValueError) for future in futures)
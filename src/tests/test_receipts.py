@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from ..exceptions import TransactionTimeout
+from ..testing import SimulatedNode
+from ..util import (
+    ChainClock,
+    RequestCounter,
+    check_txs,
+    noop_tx,
+    wait_blocks,
+    wait_for_receipts,
+)
+
+
+@pytest.fixture
+def request_counter(web3):
+    counter = RequestCounter()
+    web3.middleware_stack.add(counter.middleware)
+    yield counter
+    web3.middleware_stack.remove(counter.middleware)
+
+
+def test_wait_for_many_receipts(web3):
+    tx_hashes = [noop_tx(web3) for _ in range(5)]
+    receipts = check_txs(web3, tx_hashes)
+    assert [receipt.transactionHash for receipt in receipts] == tx_hashes
+
+
+def test_wait_for_receipts_does_not_spin(web3, request_counter):
+    tx_hashes = [noop_tx(web3) for _ in range(5)]
+    request_counter.counts.clear()
+    wait_for_receipts(web3, tx_hashes)
+    # a tight polling loop would make hundreds of requests
+    assert request_counter.counts["eth_getTransactionReceipt"] <= 3 * len(tx_hashes)
+
+
+def test_wait_for_unknown_receipt_times_out(web3):
+    with pytest.raises(TransactionTimeout):
+        wait_for_receipts(web3, [os.urandom(32)], timeout=0.1)
+
+
+def test_wait_blocks(web3):
+    start = web3.eth.blockNumber
+    wait_blocks(web3, 3)
+    assert web3.eth.blockNumber >= start + 3
+
+
+def test_chain_clock_falls_back_to_transactions(web3):
+    clock = ChainClock(web3)
+    clock.can_mine = False
+    start = web3.eth.blockNumber
+    clock.mine(3)
+    assert web3.eth.blockNumber >= start + 3
+
+
+def test_wait_for_receipts_with_block_filter():
+    node = SimulatedNode(block_time=0.05)
+    tx_hashes = node.send(10)
+    receipts = wait_for_receipts(node, tx_hashes, timeout=1)
+    assert [receipt.transactionHash for receipt in receipts] == tx_hashes
+    assert node.counts["eth_getTransactionReceipt"] <= 2 * len(tx_hashes)
+
+
+def test_wait_for_receipts_node_lagging_behind_block():
+    # the receipts are not there yet when the block is first seen
+    node = SimulatedNode(block_time=0.05, receipt_lag=0.1)
+    tx_hashes = node.send(2)
+    receipts = wait_for_receipts(node, tx_hashes, timeout=1)
+    assert [receipt.transactionHash for receipt in receipts] == tx_hashes
+
+
+def test_wait_for_receipts_polls_until_deadline():
+    # the backoff would sleep past the block, the last poll is at the deadline
+    node = SimulatedNode(block_time=0.2)
+    tx_hashes = node.send(2)
+    assert len(wait_for_receipts(node, tx_hashes, timeout=0.25)) == 2
@@ -0,0 +1,92 @@
+import pytest
+from eth_abi import encode_abi
+
+from ..channel import Channel
+from ..events import EVENT_TOPICS, decode_log
+from ..replica import STATUS_PENDING, ChannelReplica, sync_replicas
+from ..util import DELTA, RequestCounter, check_tx
+
+
+def make_log(name, *args, block_number=1):
+    types = {"EventUpdate": ["uint256", "int256"]}.get(name, ["uint256"] * len(args))
+    return {
+        "topics": [EVENT_TOPICS[name]],
+        "data": encode_abi(types, args),
+        "blockNumber": block_number,
+        "transactionHash": b"\x00" * 32,
+        "logIndex": 0,
+    }
+
+
+def test_decode_log():
+    event = decode_log(make_log("EventUpdate", 3, -1))
+    assert (event.name, event.channel_id, event.args) == ("EventUpdate", 3, (-1,))
+
+
+def test_decode_log_ignores_other_logs():
+    assert decode_log({"topics": [b"\x01" * 32], "data": b""}) is None
+
+
+def test_apply_events():
+    channel = Channel(None, None, None, None, 0, None, None)
+    replica = ChannelReplica(channel, stale=False, synced_block=0)
+    replica.apply(decode_log(make_log("EventPending", 0, 5, 15)))
+    assert (replica.status, replica.deadline) == (STATUS_PENDING, 15)
+    assert not replica.stale
+
+    replica.apply(decode_log(make_log("EventUpdate", 1, 2)))
+    assert not replica.stale
+    replica.apply(decode_log(make_log("EventUpdate", 0, 2)))
+    assert replica.stale
+
+
+@pytest.fixture
+def request_counter(web3):
+    counter = RequestCounter()
+    web3.middleware_stack.add(counter.middleware)
+    yield counter
+    web3.middleware_stack.remove(counter.middleware)
+
+
+@pytest.fixture
+def replica(channel):
+    channel.replica = ChannelReplica(channel, max_age=60)
+    channel.replica.refresh()
+    return channel.replica
+
+
+def test_replica_state(channel, replica):
+    assert replica.get_state() == channel.get_state(channel.left)
+    assert replica.get_state(channel.right) == channel.get_state(channel.right)
+
+
+def test_replica_sees_deposit(
+    channel, replica, acting_party, deposit_amount, with_tokens
+):
+    channel.deposit(sender=acting_party, amount=deposit_amount)
+    assert replica.get_state(acting_party).deposits[0] == deposit_amount
+
+
+def test_replica_sees_other_clients(web3, channel, replica, acting_party):
+    # a transaction by another client only shows after a sync
+    tx_hash = channel.registry.trigger(channel.channel_id).transact(
+        {"from": acting_party.address}
+    )
+    check_tx(web3, tx_hash)
+    assert replica.status == 0
+
+    sync_replicas([replica])
+    assert replica.status == STATUS_PENDING
+    assert replica.deadline == channel.get_deadline()
+    assert replica.synced_block >= web3.eth.getTransactionReceipt(tx_hash).blockNumber
+
+
+def test_payment_with_replica_makes_no_requests(
+    channel, replica, acting_party, other_party, preimage, request_counter
+):
+    request_counter.counts.clear()
+    signed_state = channel.conditional_payment(
+        sender=acting_party, recipient=other_party.address, amount=0, preimage=preimage
+    )
+    assert request_counter.total == 0
+    assert signed_state.payments[0].expiry == replica.synced_block + DELTA
@@ -0,0 +1,141 @@
+import pytest
+
+from ..channel import ChannelState, Player
+from ..exceptions import PaymentError
+from ..routing import NO_EDGE, ChannelGraph, Route
+from .conftest import ACCOUNTS
+
+PREIMAGE = b"\x01" * 32
+EXPIRY = 100
+
+p = pytest.mark.parametrize
+
+
+def state(channel_id, deposit, other_deposit=0, credit=0):
+    return ChannelState(
+        channel_id=channel_id,
+        deposits=(deposit, other_deposit),
+        credits=(credit, -credit),
+    )
+
+
+@pytest.fixture
+def graph():
+    r"""
+    a - b - d
+     \     /
+      - c -
+       \
+        e - d
+    """
+    graph = ChannelGraph()
+    graph.add_channel(state(1, 10), "a", "b")
+    graph.add_channel(state(2, 10), "b", "d")
+    graph.add_channel(state(3, 5), "a", "c")
+    graph.add_channel(state(4, 5), "c", "d")
+    graph.add_channel(state(5, 10), "c", "e")
+    graph.add_channel(state(6, 10), "e", "d")
+    return graph
+
+
+def test_capacity_in_both_directions():
+    graph = ChannelGraph()
+    graph.add_channel(state(1, 10, other_deposit=4, credit=-3), "a", "b")
+    assert graph.capacity("a", "b") == 7
+    assert graph.capacity("b", "a") == 7
+    assert graph.capacity("b", "c") == NO_EDGE
+
+
+def test_update_in_counterparty_perspective():
+    graph = ChannelGraph()
+    graph.add_channel(state(1, 10), "a", "b")
+    graph.update_state(state(1, 0, other_deposit=10, credit=4), "b")
+    assert graph.capacity("b", "a") == 4
+    assert graph.capacity("a", "b") == 6
+
+
+def test_shortest_path(graph):
+    route = graph.find_paths("a", "d", 3, k=1)[0]
+    assert route.nodes in {("a", "b", "d"), ("a", "c", "d")}
+    assert graph.find_paths("a", "d", 6, k=1) == [Route(("a", "b", "d"), (1, 2))]
+
+
+@p("amount, expected", [(1, 3), (6, 1), (11, 0)])
+def test_k_shortest_paths(graph, amount, expected):
+    routes = graph.find_paths("a", "d", amount, k=5)
+    assert len(routes) == expected
+    assert len({route.nodes for route in routes}) == expected
+    assert [len(route.nodes) for route in routes] == sorted(
+        len(route.nodes) for route in routes
+    )
+    if expected == 3:
+        assert routes[-1] == Route(("a", "c", "e", "d"), (3, 5, 6))
+
+
+def test_parallel_channels_use_the_largest():
+    graph = ChannelGraph()
+    graph.add_channel(state(1, 5), "a", "b")
+    graph.add_channel(state(2, 8), "a", "b")
+    assert graph.capacity("a", "b") == 8
+    assert graph.find_paths("a", "b", 6)[0].channel_ids == (2,)
+    graph.remove_channel(2)
+    assert graph.find_paths("a", "b", 6) == []
+    assert graph.find_paths("a", "b", 5)[0].channel_ids == (1,)
+
+
+def test_decrease_invalidates_routes_using_the_edge(graph):
+    graph.find_paths("a", "d", 6, k=1)
+    graph.find_paths("c", "d", 6, k=1)
+    graph.update_state(state(2, 10, credit=-5), "b")
+    assert graph.find_paths("a", "d", 6, k=1) == []
+    # didn't use the edge
+    assert ("c", "d", 6, 1) in graph._cache
+
+
+def test_small_decrease_keeps_routes(graph):
+    graph.find_paths("a", "d", 6, k=1)
+    graph.update_state(state(2, 10, credit=-2), "b")
+    assert ("a", "d", 6, 1) in graph._cache
+
+
+def test_increase_invalidates_routes_it_enables(graph):
+    assert graph.find_paths("a", "d", 12) == []
+    graph.find_paths("a", "d", 2)
+    graph.update_state(state(1, 12), "a")
+    graph.update_state(state(2, 12), "b")
+    assert ("a", "d", 2, 3) in graph._cache
+    assert graph.find_paths("a", "d", 12)[0].nodes == ("a", "b", "d")
+
+
+def test_cache_is_bounded(graph):
+    graph.cache_size = 2
+    for amount in range(1, 5):
+        graph.find_paths("a", "d", amount)
+    assert len(graph._cache) == 2
+    assert graph._amounts == [3, 4]
+
+
+def test_player_find_path(exchange):
+    names = ["alice", "bob", "charlie"]
+    alice, bob, charlie = (Player(ACCOUNTS[name]) for name in names)
+    graph = ChannelGraph()
+    for player in (alice, bob, charlie):
+        player.graph = graph
+    for channel_id, (left, right) in enumerate([(alice, bob), (bob, charlie)]):
+        initial = state(channel_id, 10)
+        left.add_channel(initial, right.account.address)
+        right.add_channel(initial.to_other(), left.account.address)
+
+    route = alice.find_path(charlie.account.address, amount=5)
+    players = (alice, bob, charlie)
+    assert route.nodes == tuple(player.account.address for player in players)
+    assert route.channel_ids == (0, 1)
+
+    exchange(alice, bob, alice.make_payment(0, 6, PREIMAGE, EXPIRY))
+    assert alice.find_path(charlie.account.address, amount=5) is None
+    assert alice.find_path(charlie.account.address, amount=4) is not None
+
+
+def test_player_find_path_needs_graph():
+    with pytest.raises(PaymentError, match="no routing graph"):
+        Player(ACCOUNTS["alice"]).find_path(ACCOUNTS["bob"].address, amount=1)
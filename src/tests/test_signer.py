@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from eth_account import Account
+
+from .. import signer
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"]
+
+
+@pytest.fixture(params=sorted(signer.SIGNERS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def msg_hashes():
+    return [os.urandom(32) for _ in range(20)]
+
+
+def test_signatures_match_eth_account(backend, msg_hashes):
+    for msg_hash in msg_hashes:
+        expected = Account.signHash(msg_hash, ALICE.privateKey)
+        signature = signer.sign_hash(msg_hash, ALICE.privateKey, backend=backend)
+        assert (signature.v, signature.r, signature.s) == (
+            expected.v,
+            expected.r,
+            expected.s,
+        )
+        assert signature.signature == expected.signature
+        assert signature.messageHash == expected.messageHash
+
+
+def test_recover_matches_eth_account(backend, msg_hashes):
+    for msg_hash in msg_hashes:
+        signature = Account.signHash(msg_hash, ALICE.privateKey)
+        vrs = (signature.v, signature.r, signature.s)
+        recovered = signer.recover_hash(msg_hash, vrs, backend=backend)
+        assert recovered == Account.recoverHash(msg_hash, vrs=vrs) == ALICE.address
+
+
+def test_signer_is_cached(backend):
+    first = signer.get_signer(ALICE.privateKey, backend)
+    assert signer.get_signer(ALICE.privateKey, backend) is first
+
+
+def test_bad_hash_length_fails(backend):
+    with pytest.raises(ValueError):
+        signer.sign_hash(b"\x00" * 31, ALICE.privateKey, backend=backend)
+
+
+def test_bad_v_fails(backend):
+    with pytest.raises(ValueError):
+        signer.recover_hash(os.urandom(32), (0, 1, 1), backend=backend)
+
+
+def test_signature_fields_by_name(backend, msg_hashes):
+    expected = Account.signHash(msg_hashes[0], ALICE.privateKey)
+    signature = signer.sign_hash(msg_hashes[0], ALICE.privateKey, backend=backend)
+    for field in signature.keys():
+        assert signature[field] == expected[field]
+    assert signature[3] == signature["v"]
+    with pytest.raises(KeyError):
+        signature["count"]
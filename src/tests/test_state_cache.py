@@ -0,0 +1,77 @@
+import pytest
+
+from ..cache import LRUCache
+from ..channel import ChannelState, SignedState
+from ..exceptions import BadSignature
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"]
+
+
+@pytest.fixture
+def hash_cache():
+    yield ChannelState.enable_hash_cache(maxsize=2)
+    ChannelState.disable_hash_cache()
+
+
+@pytest.fixture
+def address_cache():
+    yield SignedState.enable_address_cache(maxsize=2)
+    SignedState.disable_address_cache()
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.info() == (3, 0, 1, 2, 2)
+
+
+def test_lru_cache_counts_misses():
+    cache = LRUCache(maxsize=1)
+    assert cache.get("a") is None
+    assert cache.get_or_compute("a", lambda: 1) == 1
+    assert cache.get_or_compute("a", lambda: 2) == 1
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_cache_needs_positive_maxsize():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+
+def test_message_hash_cache(hash_cache):
+    state = ChannelState(round=1)
+    expected = state.message_hash()
+    assert state.message_hash() == expected
+    # equal states share the entry
+    assert ChannelState(round=1).message_hash() == expected
+    assert (hash_cache.hits, hash_cache.misses) == (2, 1)
+
+    for round in range(2, 5):
+        ChannelState(round=round).message_hash()
+    assert len(hash_cache) == 2
+    assert hash_cache.evictions == 2
+
+
+def test_message_hash_cache_disabled():
+    assert ChannelState._hash_cache is None
+    assert ChannelState(round=1).message_hash() == ChannelState(round=1).message_hash()
+
+
+def test_recovered_address_cache(address_cache):
+    signed_state = ChannelState(round=1).sign(ALICE.privateKey)
+    assert signed_state.recover_address() == ALICE.address
+    assert signed_state.recover_address() == ALICE.address
+    assert (address_cache.hits, address_cache.misses) == (1, 1)
+
+    tampered = signed_state.to(sig=(signed_state.sig[0], 1, 1))
+    with pytest.raises(BadSignature):
+        tampered.verify_signature(ALICE.address)
+    assert address_cache.misses == 2
@@ -0,0 +1,211 @@
+import os
+import threading
+
+import pytest
+
+from ..channel import ChannelState, Payment
+from ..exceptions import CorruptRecord
+from ..statelog import (
+    HEADER,
+    MAGIC,
+    RECORD_SIZE,
+    StateLog,
+    decode_record,
+    encode_record,
+)
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"]
+BOB = ACCOUNTS["bob"]
+
+p = pytest.mark.parametrize
+
+
+def signed(channel_id=1, round=0, **kwargs):
+    state = ChannelState(channel_id=channel_id, round=round, **kwargs)
+    return state.sign(ALICE.privateKey)
+
+
+@pytest.fixture
+def path(tmpdir):
+    return str(tmpdir.join("states.log"))
+
+
+def flip_byte(path, offset):
+    with open(path, "r+b") as log_file:
+        log_file.seek(offset)
+        byte = log_file.read(1)[0]
+        log_file.seek(offset)
+        log_file.write(bytes([byte ^ 1]))
+
+
+def test_record_roundtrip():
+    payment = Payment(
+        preimage_hash=b"\x01" * 32,
+        recipient=BOB.address,
+        amount=3,
+        expiry=77,
+        command="open",
+    )
+    signed_state = signed(
+        channel_id=2 ** 200,
+        round=5,
+        deposits=(9, 10),
+        credits=(-3, 0),
+        withdrawals=(1, 2),
+        payments=[payment],
+    )
+    record = encode_record(signed_state)
+    assert len(record) == RECORD_SIZE
+    assert decode_record(record) == signed_state
+
+
+def test_corrupt_record():
+    record = bytearray(encode_record(signed()))
+    record[100] ^= 1
+    with pytest.raises(CorruptRecord):
+        decode_record(bytes(record))
+
+
+def test_invalid_durability(path):
+    with pytest.raises(ValueError):
+        StateLog(path, durability="sometimes")
+
+
+@p("durability", ["always", "interval", "none"])
+def test_latest_has_highest_round(path, durability):
+    with StateLog(path, durability=durability) as state_log:
+        state_log.append(signed(round=2))
+        state_log.append_many([signed(round=1), signed(channel_id=2)])
+        assert state_log.latest(1) == signed(round=2)
+        assert state_log.latest(2) == signed(channel_id=2)
+        assert state_log.latest(3) is None
+        assert sorted(state_log.channel_ids()) == [1, 2]
+
+
+@p("snapshot_every", [None, 2])
+def test_recover(path, snapshot_every):
+    state_log = StateLog(path, snapshot_every=snapshot_every)
+    for round in range(5):
+        state_log.append(signed(round=round))
+    state_log.append(signed(channel_id=2))
+    # crash: no close, no final snapshot
+    os.close(state_log._fd)
+
+    with StateLog(path) as recovered:
+        assert recovered.latest(1) == signed(round=4)
+        assert recovered.latest(2) == signed(channel_id=2)
+
+
+def test_recover_truncates_torn_tail(path):
+    state_log = StateLog(path, snapshot_every=None)
+    state_log.append_many([signed(round=0), signed(round=1)])
+    os.close(state_log._fd)
+    with open(path, "ab") as log_file:
+        log_file.write(encode_record(signed(round=2))[:100])
+
+    with StateLog(path) as recovered:
+        assert recovered.latest(1) == signed(round=1)
+        assert os.path.getsize(path) == HEADER.size + 2 * RECORD_SIZE
+        recovered.append(signed(round=3))
+    with StateLog(path) as reopened:
+        assert reopened.latest(1) == signed(round=3)
+
+
+def test_recover_truncates_corrupt_last_record(path):
+    state_log = StateLog(path, snapshot_every=None)
+    state_log.append_many([signed(round=0), signed(round=1)])
+    os.close(state_log._fd)
+    flip_byte(path, HEADER.size + RECORD_SIZE + 100)
+
+    with StateLog(path) as recovered:
+        assert recovered.latest(1) == signed(round=0)
+        assert os.path.getsize(path) == HEADER.size + RECORD_SIZE
+
+
+def test_recover_refuses_corruption_before_valid_records(path):
+    state_log = StateLog(path, snapshot_every=None)
+    state_log.append_many([signed(round=round) for round in range(3)])
+    os.close(state_log._fd)
+    flip_byte(path, HEADER.size + 100)
+    size = os.path.getsize(path)
+
+    with pytest.raises(CorruptRecord):
+        StateLog(path)
+    # nothing was truncated
+    assert os.path.getsize(path) == size
+
+
+def test_refuses_other_version(path):
+    with StateLog(path) as state_log:
+        state_log.append(signed())
+    # the wire version of the records
+    flip_byte(path, len(MAGIC) + 3)
+    with pytest.raises(CorruptRecord):
+        StateLog(path)
+
+
+def test_refuses_other_file(path):
+    with open(path, "wb") as log_file:
+        log_file.write(b"\x00" * 2 * RECORD_SIZE)
+    with pytest.raises(CorruptRecord):
+        StateLog(path)
+
+
+def test_recover_ignores_bad_snapshot(path):
+    with StateLog(path) as state_log:
+        state_log.append(signed(round=1))
+    with open(path + ".idx", "r+b") as snapshot_file:
+        snapshot_file.write(b"\xff")
+
+    with StateLog(path) as recovered:
+        assert recovered.latest(1) == signed(round=1)
+
+
+def test_group_commit(path):
+    signed_states = [signed(channel_id=i) for i in range(200)]
+    num_threads = 8
+    with StateLog(path, durability="always") as state_log:
+
+        def append(start):
+            for signed_state in signed_states[start::num_threads]:
+                state_log.append(signed_state)
+
+        threads = [
+            threading.Thread(target=append, args=(start,))
+            for start in range(num_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(state_log) == len(signed_states)
+        assert state_log.fsyncs <= len(signed_states)
+
+
+def test_concurrent_appends_and_snapshots(path):
+    num_threads, num_rounds = 8, 40
+    errors = []
+    with StateLog(path, durability="always", snapshot_every=2) as state_log:
+
+        def append(channel_id):
+            try:
+                for round in range(num_rounds):
+                    state_log.append(signed(channel_id=channel_id, round=round))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [
+            threading.Thread(target=append, args=(channel_id,))
+            for channel_id in range(num_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    with StateLog(path) as recovered:
+        for channel_id in range(num_threads):
+            assert recovered.latest(channel_id).round == num_rounds - 1
@@ -69,13 +69,13 @@ def test_token_swap_dispute(
     channel_oax.finalize(who=other_party)
 
     state_weth = channel_weth.get_state(who=acting_party)
-    assert state_weth.withdrawals == [
+    assert state_weth.withdrawals == (
         channel_weth_state.deposits[0] - amount_weth,
         channel_weth_state.deposits[1] + amount_weth,
-    ]
+    )
 
     state_oax = channel_oax.get_state(who=other_party)
-    assert state_oax.withdrawals == [
+    assert state_oax.withdrawals == (
         channel_oax_state.deposits[0] - amount_oax,
         channel_oax_state.deposits[1] + amount_oax,
-    ]
+    )
@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+
+from ..exceptions import PeerError
+from ..transport import (
+    ERROR,
+    HEADER,
+    MAX_FRAME,
+    MIN_FRAME,
+    REQUEST,
+    RESPONSE,
+    PeerConnection,
+    PeerServer,
+    encode_frame,
+    exchange,
+    read_frame,
+)
+
+PREIMAGE = b"\x01" * 32
+EXPIRY = 100
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def serve(handler, max_in_flight=16):
+    server = PeerServer(handler)
+    host, port = await server.start()
+    connection = await PeerConnection.connect(host, port, max_in_flight)
+    return server, connection
+
+
+async def shutdown(server, connection):
+    await connection.close()
+    await server.close()
+
+
+def test_frame_round_trip():
+    async def go():
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_frame(REQUEST, 7, b"payload"))
+        reader.feed_eof()
+        assert await read_frame(reader) == (REQUEST, 7, b"payload")
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frame(reader)
+
+    run(go())
+
+
+def test_oversized_frame_is_rejected():
+    async def go():
+        reader = asyncio.StreamReader()
+        reader.feed_data(HEADER.pack(MAX_FRAME + 1, REQUEST, 0))
+        with pytest.raises(PeerError):
+            await read_frame(reader)
+
+    run(go())
+
+
+@pytest.mark.parametrize("length", [0, MIN_FRAME - 1])
+def test_undersized_frame_is_rejected(length):
+    async def go():
+        reader = asyncio.StreamReader()
+        reader.feed_data(HEADER.pack(length, REQUEST, 0))
+        with pytest.raises(PeerError):
+            await read_frame(reader)
+
+    run(go())
+
+
+async def fake_peer(respond):
+    """Server answering each request with the frame `respond(request_id)`."""
+
+    async def serve(reader, writer):
+        try:
+            while True:
+                _, request_id, _ = await read_frame(reader)
+                writer.write(respond(request_id))
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    connection = await PeerConnection.connect(*server.sockets[0].getsockname())
+    return server, connection
+
+
+def test_malformed_responses_fail_their_request(players):
+    alice, _ = players
+    signed_state = alice.states[1].sign(alice.account.privateKey)
+    frames = iter(
+        [
+            lambda request_id: encode_frame(RESPONSE, request_id, b"garbage"),
+            lambda request_id: encode_frame(ERROR, request_id, b"\xff\xfe"),
+        ]
+    )
+
+    async def go():
+        server, connection = await fake_peer(
+            lambda request_id: next(frames)(request_id)
+        )
+        for match in ["malformed response", "\ufffd"]:
+            with pytest.raises(PeerError, match=match):
+                await asyncio.wait_for(connection.request(signed_state), 1)
+        assert not connection.receiver.done()
+        await connection.close()
+        server.close()
+        await server.wait_closed()
+
+    run(go())
+
+
+def test_bad_frame_fails_pending_requests(players):
+    alice, _ = players
+    signed_state = alice.states[1].sign(alice.account.privateKey)
+
+    async def go():
+        server, connection = await fake_peer(
+            lambda request_id: HEADER.pack(0, RESPONSE, request_id)
+        )
+        with pytest.raises(PeerError):
+            await asyncio.wait_for(connection.request(signed_state), 1)
+        with pytest.raises(PeerError, match="closed"):
+            await connection.request(signed_state)
+        server.close()
+        await server.wait_closed()
+
+    run(go())
+
+
+def test_payment_over_transport(make_players):
+    alice, bob = make_players()
+
+    async def go():
+        server, connection = await serve(bob.receive_payment)
+        await exchange(alice, connection, alice.make_payment(1, 3, PREIMAGE, EXPIRY))
+        await exchange(alice, connection, alice.complete_payment(1))
+        await shutdown(server, connection)
+
+    run(go())
+    assert alice.states[1].credits == (-3, 3)
+    assert bob.states[1] == alice.states[1].to_other()
+    alice.signed_states[1].verify_signature(bob.account.address)
+
+
+def test_pipelined_payments(make_players):
+    channel_ids = range(20)
+    alice, bob = make_players(channel_ids)
+
+    async def pay(connection, channel_id):
+        for _ in range(3):
+            proposal = alice.make_payment(channel_id, 1, PREIMAGE, EXPIRY)
+            await exchange(alice, connection, proposal)
+            await exchange(alice, connection, alice.complete_payment(channel_id))
+
+    async def go():
+        # fewer slots than channels, so requests wait for each other
+        server, connection = await serve(bob.receive_payment, max_in_flight=4)
+        await asyncio.gather(*[pay(connection, i) for i in channel_ids])
+        await shutdown(server, connection)
+
+    run(go())
+    for channel_id in channel_ids:
+        assert alice.states[channel_id].credits == (-3, 3)
+        assert alice.states[channel_id].round == 6
+
+
+def test_rejected_payment_raises_and_keeps_connection(make_players):
+    alice, bob = make_players()
+
+    async def go():
+        server, connection = await serve(bob.receive_payment)
+        proposal = alice.make_payment(1, 11, PREIMAGE, EXPIRY)
+        with pytest.raises(PeerError, match="Overpayment"):
+            await exchange(alice, connection, proposal)
+        await exchange(alice, connection, alice.make_payment(1, 1, PREIMAGE, EXPIRY))
+        await shutdown(server, connection)
+
+    run(go())
+    assert alice.states[1].credits == (-1, 0)
+
+
+def test_lost_connection_fails_pending_requests(make_players):
+    alice, bob = make_players()
+
+    async def hang_up(reader, writer):
+        await read_frame(reader)
+        writer.close()
+
+    async def go():
+        server = await asyncio.start_server(hang_up, "127.0.0.1", 0)
+        connection = await PeerConnection.connect(*server.sockets[0].getsockname())
+        with pytest.raises(PeerError, match="connection lost"):
+            await connection.request(alice.make_payment(1, 1, PREIMAGE, EXPIRY))
+        with pytest.raises(PeerError, match="closed"):
+            await connection.request(alice.states[1].sign(alice.account.privateKey))
+        server.close()
+        await server.wait_closed()
+
+    run(go())
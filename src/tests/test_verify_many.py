@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from ..channel import ChannelState, verify_many
+from ..exceptions import BadSignature
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"]
+BOB = ACCOUNTS["bob"]
+
+
+@pytest.fixture
+def signed_states():
+    return [
+        ChannelState(channel_id=i, round=i).sign(ALICE.privateKey) for i in range(10)
+    ]
+
+
+@pytest.fixture
+def tampered_states(signed_states):
+    states = list(signed_states)
+    states[3] = states[3].to(round=100)
+    states[7] = states[7].to(sig=(0, 0, 0))
+    return states
+
+
+def check_results(results):
+    assert len(results) == 10
+    for i, result in enumerate(results):
+        if i in (3, 7):
+            assert isinstance(result, Exception)
+        else:
+            assert result is None
+    assert isinstance(results[3], BadSignature)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_verify_many_reports_failures_per_state(
+    tampered_states, max_workers, chunk_size
+):
+    results = verify_many(
+        tampered_states,
+        [ALICE.address] * 10,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+    )
+    check_results(results)
+
+
+def test_verify_many_wrong_address(signed_states):
+    results = verify_many(signed_states, [BOB.address] * 10, max_workers=1)
+    assert all(isinstance(result, BadSignature) for result in results)
+
+
+def test_verify_many_with_executor(tampered_states):
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = verify_many(
+            tampered_states, [ALICE.address] * 10, executor=executor, chunk_size=4
+        )
+    check_results(results)
+
+
+def test_verify_many_length_mismatch(signed_states):
+    with pytest.raises(ValueError):
+        verify_many(signed_states, [ALICE.address])
@@ -0,0 +1,180 @@
+import pytest
+
+from ..channel import ChannelState
+from ..exceptions import BadSignature, TransactionTimeout
+from ..watchtower import Watchtower, shard_of
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"]
+BOB = ACCOUNTS["bob"]
+CHARLIE = ACCOUNTS["charlie"]
+
+
+class OfflineRegistry:
+    """Registry whose channels are all between alice and bob."""
+
+    def getPlayers(self, channel_id):
+        return Call([ALICE.address, BOB.address])
+
+    def update(self, *args):
+        return FailingTransaction()
+
+
+class FailingTransaction:
+    def transact(self, transaction):
+        raise ConnectionRefusedError("node down")
+
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def call(self):
+        return self.result
+
+
+@pytest.fixture
+def offline_tower():
+    return Watchtower(
+        web3=None, registry=OfflineRegistry(), from_block=0, shard=1, num_shards=2
+    )
+
+
+def test_shard_of():
+    assert [shard_of(channel_id, 3) for channel_id in range(5)] == [0, 1, 2, 0, 1]
+
+
+def test_watch_keeps_newest_state(offline_tower):
+    old = ChannelState(channel_id=1, round=1).sign(BOB.privateKey)
+    new = ChannelState(channel_id=1, round=2).sign(BOB.privateKey)
+    offline_tower.watch(new, ALICE.address)
+    offline_tower.watch(old, ALICE.address)
+    assert offline_tower.watches[1].signed_state == new
+
+
+def test_watch_needs_counterparty_signature(offline_tower):
+    signed_state = ChannelState(channel_id=1).sign(ALICE.privateKey)
+    with pytest.raises(BadSignature):
+        offline_tower.watch(signed_state, ALICE.address)
+
+
+def test_watch_needs_signature_of_player(offline_tower):
+    signed_state = ChannelState(channel_id=1).sign(CHARLIE.privateKey)
+    with pytest.raises(BadSignature):
+        offline_tower.watch(signed_state, ALICE.address)
+
+
+def test_watch_needs_player_as_submitter(offline_tower):
+    signed_state = ChannelState(channel_id=1).sign(BOB.privateKey)
+    with pytest.raises(BadSignature):
+        offline_tower.watch(signed_state, CHARLIE.address)
+
+
+def test_watch_newer_state_during_dispute(offline_tower):
+    old = ChannelState(channel_id=1, round=1).sign(BOB.privateKey)
+    offline_tower.watch(old, ALICE.address)
+    # the trigger was answered with `old`
+    dispute = (10, 1, 0.0, 5)
+    offline_tower.disputes[1] = dispute
+    offline_tower.watch(old, ALICE.address)
+    assert offline_tower.pending == []
+
+    new = ChannelState(channel_id=1, round=2).sign(BOB.privateKey)
+    offline_tower.watch(new, ALICE.address)
+    assert offline_tower.pending == [dispute]
+
+
+def test_watch_queues_dispute_once(offline_tower):
+    offline_tower.watch(ChannelState(channel_id=1).sign(BOB.privateKey), ALICE.address)
+    dispute = (10, 1, 0.0, 5)
+    offline_tower.disputes[1] = dispute
+    for round in range(1, 4):
+        new = ChannelState(channel_id=1, round=round).sign(BOB.privateKey)
+        offline_tower.watch(new, ALICE.address)
+    assert offline_tower.pending == [dispute]
+
+
+def test_watch_newer_state_after_deadline(offline_tower):
+    offline_tower.watch(ChannelState(channel_id=1).sign(BOB.privateKey), ALICE.address)
+    offline_tower.disputes[1] = (10, 1, 0.0, 5)
+    offline_tower.synced_block = 11
+    new = ChannelState(channel_id=1, round=1).sign(BOB.privateKey)
+    offline_tower.watch(new, ALICE.address)
+    assert offline_tower.pending == []
+
+
+def test_step_survives_timeout(offline_tower, monkeypatch):
+    def poll():
+        raise TransactionTimeout("no receipts")
+
+    monkeypatch.setattr(offline_tower, "poll", poll)
+    assert offline_tower.step() == []
+
+
+def test_step_requeues_after_node_error(offline_tower, monkeypatch):
+    offline_tower.watch(ChannelState(channel_id=1).sign(BOB.privateKey), ALICE.address)
+    dispute = (10, 1, 0.0, 5)
+    offline_tower.unwatched[3] = (12, 3, 0.0, 6)
+    offline_tower.disputes[1] = dispute
+    offline_tower._queue(dispute)
+    offline_tower.watch(ChannelState(channel_id=3).sign(BOB.privateKey), ALICE.address)
+    monkeypatch.setattr(offline_tower, "poll", lambda: 0)
+    assert offline_tower.step() == []
+    assert sorted(offline_tower.pending) == [dispute, (12, 3, 0.0, 6)]
+    assert offline_tower.step() == []
+    assert len(offline_tower.pending) == 2
+
+
+def test_watch_other_shard(offline_tower):
+    signed_state = ChannelState(channel_id=2).sign(BOB.privateKey)
+    with pytest.raises(ValueError):
+        offline_tower.watch(signed_state, ALICE.address)
+
+
+@pytest.fixture
+def tower(web3, registry):
+    return Watchtower(web3, registry)
+
+
+def test_tower_answers_trigger(tower, channel, acting_party, other_party):
+    signed_state = ChannelState(channel_id=channel.channel_id, round=0).sign(
+        acting_party.privateKey
+    )
+    tower.watch(signed_state, other_party.address)
+    channel.trigger(who=acting_party)
+
+    assert tower.poll() == 1
+    [reaction] = tower.respond()
+    assert reaction.channel_id == channel.channel_id
+    assert reaction.submitted_before_deadline
+    assert channel.get_state(acting_party) == signed_state.to_unsigned()
+
+
+def test_tower_skips_outdated_state(tower, channel, acting_party, other_party, web3):
+    old_state = ChannelState(channel_id=channel.channel_id, round=0).sign(
+        acting_party.privateKey
+    )
+    tower.watch(old_state, other_party.address)
+    new_state = old_state.to_unsigned().to(round=1).sign(acting_party.privateKey)
+    channel.update(who=other_party, args=new_state.state_update_arguments())
+    channel.trigger(who=acting_party)
+
+    tower.poll()
+    assert tower.respond() == []
+
+
+def test_tower_resubmits_newer_state(tower, channel, acting_party, other_party):
+    old_state = ChannelState(channel_id=channel.channel_id, round=0).sign(
+        acting_party.privateKey
+    )
+    tower.watch(old_state, other_party.address)
+    channel.trigger(who=acting_party)
+    tower.poll()
+    tower.respond()
+
+    new_state = old_state.to_unsigned().to(round=1).sign(acting_party.privateKey)
+    tower.watch(new_state, other_party.address)
+    tower.poll()
+    [reaction] = tower.respond()
+    assert reaction.submitted_before_deadline
+    assert channel.get_state(acting_party) == new_state.to_unsigned()
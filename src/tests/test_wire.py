@@ -0,0 +1,80 @@
+import pytest
+
+from .. import wire
+from ..channel import ChannelState, Payment
+from ..util import COMMANDS, pack_message
+from .conftest import ACCOUNTS
+
+ALICE = ACCOUNTS["alice"]
+BOB = ACCOUNTS["bob"]
+
+
+@pytest.fixture
+def signed_state():
+    payment = Payment(
+        preimage_hash=b"\x02" * 32,
+        recipient=BOB.address,
+        amount=3,
+        expiry=77,
+        command="complete",
+    )
+    state = ChannelState(
+        channel_id=12,
+        deposits=(9, 10),
+        credits=(-3, 3),
+        withdrawals=(1, 2),
+        round=-1,
+        payments=[Payment(amount=1, command="open"), payment],
+    )
+    return state.sign(ALICE.privateKey)
+
+
+def test_roundtrip(signed_state):
+    encoded = wire.encode(signed_state)
+    assert len(encoded) == wire.SIZE == 838
+    assert wire.decode(encoded) == signed_state
+
+
+def test_view_fields(signed_state):
+    view = wire.SignedStateView(wire.encode(signed_state))
+    assert (view.channel_id, view.round) == (12, -1)
+    assert view.credits == signed_state.credits
+    assert view.withdrawals == signed_state.withdrawals
+    assert view.deposits == signed_state.deposits
+    assert view.payments == signed_state.payments
+    assert view.payment(1) == signed_state.payments[1]
+    assert view.sig == signed_state.sig
+
+
+def test_view_message_is_not_copied(signed_state):
+    buffer = bytearray(wire.encode(signed_state))
+    view = wire.SignedStateView(buffer)
+    assert view.message().obj is buffer
+    assert view.message() == pack_message(*signed_state.message_inputs())
+    assert view.message_hash() == signed_state.message_hash()
+
+
+def test_encode_into(signed_state):
+    buffer = bytearray(2 * wire.SIZE)
+    wire.encode_into(buffer, wire.SIZE, signed_state)
+    assert wire.decode(buffer[wire.SIZE:]) == signed_state
+
+
+def test_reject_other_version(signed_state):
+    encoded = bytearray(wire.encode(signed_state))
+    encoded[0] = wire.VERSION + 1
+    with pytest.raises(ValueError):
+        wire.SignedStateView(encoded)
+
+
+def test_reject_wrong_size(signed_state):
+    with pytest.raises(ValueError):
+        wire.SignedStateView(wire.encode(signed_state)[:-1])
+
+
+@pytest.mark.parametrize("command_byte", [len(COMMANDS) + 1, 255])
+def test_reject_unknown_command(signed_state, command_byte):
+    encoded = bytearray(wire.encode(signed_state))
+    encoded[wire.COMMAND_OFFSET + 1] = command_byte
+    with pytest.raises(ValueError):
+        wire.decode(encoded)
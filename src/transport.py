@@ -0,0 +1,169 @@
+"""Asyncio TCP transport for signed state updates between players.
+
+Frames are length prefixed::
+
+    length (4 bytes) | kind (1 byte) | request id (4 bytes) | payload
+
+Requests carry a `wire` encoded `SignedState` and are answered with the
+peer's countersignature or an error. A connection pipelines requests: many
+can be in flight and responses are matched by request id.
+
+Backpressure: a client has at most `max_in_flight` requests outstanding and
+waits for the socket buffer to drain after every write. The server handles
+a connection's requests in order and drains after every response, so a
+client that stops reading also stops the server from reading its requests.
+"""
+import asyncio
+import itertools
+import logging
+import struct
+
+from . import wire
+from .exceptions import PeerError
+
+log = logging.getLogger(__name__)
+
+HEADER = struct.Struct(">IBI")  # length of the rest, kind, request id
+LENGTH_SIZE = 4
+MIN_FRAME = HEADER.size - LENGTH_SIZE
+MAX_FRAME = 1 << 16
+MAX_IN_FLIGHT = 256
+
+REQUEST, RESPONSE, ERROR = 1, 2, 3
+
+
+def encode_frame(kind, request_id, payload):
+    length = MIN_FRAME + len(payload)
+    return HEADER.pack(length, kind, request_id) + payload
+
+
+async def read_frame(reader):
+    """Return `(kind, request_id, payload)`, raise `IncompleteReadError` at EOF."""
+    header = await reader.readexactly(HEADER.size)
+    length, kind, request_id = HEADER.unpack(header)
+    if not MIN_FRAME <= length <= MAX_FRAME:
+        raise PeerError(f"frame of {length} bytes not in [{MIN_FRAME}, {MAX_FRAME}]")
+    payload = await reader.readexactly(length - MIN_FRAME)
+    return kind, request_id, payload
+
+
+class PeerServer:
+    """Answers requests with `handler(signed_state)`, e. g.
+    `Player.receive_payment`.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._serve, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def _respond(self, payload):
+        try:
+            return RESPONSE, wire.encode(self.handler(wire.decode(payload)))
+        except Exception as exc:  # report to the peer, keep the connection
+            log.debug("request failed: %r", exc)
+            return ERROR, f"{type(exc).__name__}: {exc}".encode()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                kind, request_id, payload = await read_frame(reader)
+                if kind != REQUEST:
+                    raise PeerError(f"unexpected frame kind {kind}")
+                response_kind, response = self._respond(payload)
+                writer.write(encode_frame(response_kind, request_id, response))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        except (PeerError, ConnectionError) as exc:
+            log.warning("closing connection: %s", exc)
+        finally:
+            writer.close()
+
+
+class PeerConnection:
+    """Client side of a connection, `request` can be awaited concurrently."""
+
+    def __init__(self, reader, writer, max_in_flight=MAX_IN_FLIGHT):
+        self.reader = reader
+        self.writer = writer
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.responses = {}
+        self.request_ids = itertools.count()
+        self.receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host, port, max_in_flight=MAX_IN_FLIGHT):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, max_in_flight)
+
+    @staticmethod
+    def _resolve(future, kind, payload):
+        if kind == RESPONSE:
+            try:
+                future.set_result(wire.decode(payload))
+            except ValueError as exc:
+                future.set_exception(PeerError(f"malformed response: {exc}"))
+        elif kind == ERROR:
+            future.set_exception(PeerError(payload.decode(errors="replace")))
+        else:
+            raise PeerError(f"unexpected frame kind {kind}")
+
+    async def _receive(self):
+        try:
+            while True:
+                kind, request_id, payload = await read_frame(self.reader)
+                future = self.responses.pop(request_id, None)
+                if future is None or future.cancelled():
+                    continue
+                self._resolve(future, kind, payload)
+        except (asyncio.IncompleteReadError, ConnectionError) as exc:
+            error = PeerError(f"connection lost: {exc!r}")
+        except PeerError as exc:
+            error = exc
+        # the stream can't be trusted anymore
+        self.writer.close()
+        for future in self.responses.values():
+            if not future.done():
+                future.set_exception(error)
+        self.responses.clear()
+
+    async def request(self, signed_state):
+        """Send `signed_state`, return the peer's countersigned state."""
+        async with self.in_flight:
+            if self.receiver.done():
+                raise PeerError("connection closed")
+            request_id = next(self.request_ids) % (1 << 32)
+            future = asyncio.get_event_loop().create_future()
+            self.responses[request_id] = future
+            self.writer.write(
+                encode_frame(REQUEST, request_id, wire.encode(signed_state))
+            )
+            await self.writer.drain()
+            return await future
+
+    async def close(self):
+        self.writer.close()
+        await self.receiver
+
+
+async def exchange(player, connection, proposal):
+    """Send a proposal of `player` and store the countersignature.
+
+    If the peer rejects the proposal or the connection fails, the proposal
+    is abandoned so that the channel can make a new one.
+    """
+    try:
+        countersigned = await connection.request(proposal)
+    except PeerError:
+        player.abandon_proposal(proposal.channel_id)
+        raise
+    player.receive_countersignature(countersigned)
+    return countersigned
@@ -1,24 +1,48 @@
 import functools
-import json
 import logging
 import os
+import time
+import weakref
+from collections import Counter
 
-from eth_account import Account
 from eth_account.messages import defunct_hash_message
-from tenacity import after_log, retry, retry_if_exception_type
+from eth_utils import keccak, remove_0x_prefix
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
+from web3.middleware import geth_poa_middleware
 from web3.utils import encoding
 
-from .exceptions import TransactionFailed
+from .artifacts import ARTIFACTS
+from .exceptions import TransactionFailed, TransactionTimeout
+from .signer import sign_hash
+
+try:
+    from eth_tester import EthereumTester, PyEVMBackend
+    from web3.providers.eth_tester import EthereumTesterProvider
+except ImportError:
+    EthereumTester = None
 
 log = logging.getLogger(__name__)
 
 GAS = 4_000_000
 LOTS = 10 ** 18
 DELTA = 10  # needs to match contract DELTA
+MAX_PAYMENTS = 4  # needs to match contract MAX_PAYMENTS
 ZERO_PREIMAGE_HASH = bytes(32)
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 COMMANDS = ["open", "complete", "cancel"]
 
+RECEIPT_TIMEOUT = 120  # seconds
+RECEIPT_POLL_MIN = 0.01
+RECEIPT_POLL_MAX = 1.0
+
+# Signed channel state messages are 6 + 4 * MAX_PAYMENTS (flattened) 32 byte
+# words, see `SpritesRegistry.compute_hash`.
+WORD_SIZE = 32
+MESSAGE_WORDS = 6 + 4 * MAX_PAYMENTS
+MESSAGE_LENGTH = WORD_SIZE * MESSAGE_WORDS
+MESSAGE_PREFIX = b"\x19Ethereum Signed Message:\n" + str(MESSAGE_LENGTH).encode()
+
 
 def to_bytes(primitive):
 
@@ -55,6 +79,88 @@ def pack(args):
     return b"".join(pad(to_bytes(arg)) for arg in flatten(args))
 
 
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        end = start + size
+        yield items[start:end]
+
+
+ZERO_WORD = bytes(WORD_SIZE)
+
+
+def write_int(buffer, offset, value):
+    # Same range check and two's complement encoding as `to_bytes`.
+    end = offset + WORD_SIZE
+    if not value:
+        # most payment slots are empty
+        buffer[offset:end] = ZERO_WORD
+        return
+    if value < -(1 << 255) or value > (1 << 255):
+        raise ValueError(f"int {value} out of range")
+    buffer[offset:end] = (value % (1 << 256)).to_bytes(WORD_SIZE, "big")
+
+
+def _write_bytes(buffer, offset, value):
+    if len(value) > WORD_SIZE:
+        raise ValueError(f"{value} longer than {WORD_SIZE} bytes")
+    end = offset + WORD_SIZE
+    start = end - len(value)
+    buffer[start:end] = value
+
+
+@functools.lru_cache(maxsize=1024)
+def _address_bytes(address):
+    return bytes.fromhex(remove_0x_prefix(address))
+
+
+def write_message(
+    buffer,
+    offset,
+    channel_id,
+    credits,
+    withdrawals,
+    round,
+    preimage_hashes,
+    recipients,
+    amounts,
+    expiries,
+):
+    # Same layout as `pack` produces for the flattened message inputs.
+    write_int(buffer, offset, channel_id)
+    write_int(buffer, offset + 32, credits[0])
+    write_int(buffer, offset + 64, credits[1])
+    write_int(buffer, offset + 96, withdrawals[0])
+    write_int(buffer, offset + 128, withdrawals[1])
+    write_int(buffer, offset + 160, round)
+    offset += 192
+    for preimage_hash in preimage_hashes:
+        _write_bytes(buffer, offset, preimage_hash)
+        offset += WORD_SIZE
+    for recipient in recipients:
+        _write_bytes(buffer, offset, _address_bytes(recipient))
+        offset += WORD_SIZE
+    for amount in amounts:
+        write_int(buffer, offset, amount)
+        offset += WORD_SIZE
+    for expiry in expiries:
+        write_int(buffer, offset, expiry)
+        offset += WORD_SIZE
+
+
+def pack_message(*message_inputs):
+    buffer = bytearray(MESSAGE_LENGTH)
+    write_message(buffer, 0, *message_inputs)
+    return bytes(buffer)
+
+
+def hash_state_message(*message_inputs):
+    """Equivalent to `hash_message(pack(message_inputs))` for channel states."""
+    buffer = bytearray(len(MESSAGE_PREFIX) + MESSAGE_LENGTH)
+    buffer[: len(MESSAGE_PREFIX)] = MESSAGE_PREFIX
+    write_message(buffer, len(MESSAGE_PREFIX), *message_inputs)
+    return HexBytes(keccak(buffer))
+
+
 def generate_preimage():
     return os.urandom(32)
 
@@ -68,7 +174,7 @@ def hash_message(msg_bytes):
 
 
 def sign(hash_to_sign, private_key):
-    return Account.signHash(hash_to_sign, private_key)
+    return sign_hash(hash_to_sign, private_key)
 
 
 def check_status(fun):
@@ -80,17 +186,134 @@ def check_status(fun):
     return wrapper
 
 
-@retry(
-    retry=retry_if_exception_type(AttributeError), after=after_log(log, logging.DEBUG)
-)
-def check_tx(web3, tx_hash):
-    receipt = web3.eth.getTransactionReceipt(tx_hash)
+def _block_filter(web3):
+    try:
+        return web3.eth.filter("latest")
+    except ValueError:
+        log.debug("node does not support block filters, polling receipts")
+        return None
+
+
+def _fetch_receipts(web3, tx_hashes, receipts):
+    for tx_hash in tx_hashes:
+        receipt = web3.eth.getTransactionReceipt(tx_hash)
+        if receipt is not None:
+            receipts[tx_hash] = receipt
+
+
+def _poll_receipts(web3, missing, receipts, block_filter, mined):
+    if block_filter is None:
+        _fetch_receipts(web3, missing, receipts)
+        return
+
+    # Only look up receipts of transactions in newly mined blocks, and of
+    # those mined before whose receipt the node didn't have yet.
+    for block_hash in block_filter.get_new_entries():
+        block = web3.eth.getBlock(block_hash)
+        mined.update(HexBytes(tx_hash) for tx_hash in block.transactions)
+    _fetch_receipts(web3, mined & set(missing), receipts)
+
+
+def wait_for_receipts(web3, tx_hashes, timeout=RECEIPT_TIMEOUT):
+    """Wait until all transactions are mined and return their receipts.
+
+    With more than one transaction a block filter is installed (if the node
+    supports it) so that each new block resolves all receipts mined in it.
+    Otherwise receipts are polled. Polling backs off exponentially from
+    `RECEIPT_POLL_MIN` to `RECEIPT_POLL_MAX` seconds and gives up with
+    `TransactionTimeout` after `timeout` seconds. Receipts of transactions
+    seen in a block but not yet available from the node are polled directly.
+    """
+    tx_hashes = [HexBytes(tx_hash) for tx_hash in tx_hashes]
+    deadline = time.monotonic() + timeout
+    block_filter = _block_filter(web3) if len(set(tx_hashes)) > 1 else None
+    receipts = {}
+    # transactions seen in a block, the node may lag behind with the receipt
+    mined = set()
+    try:
+        # Transactions might have been mined before the filter was installed.
+        _fetch_receipts(web3, set(tx_hashes), receipts)
+        delay = RECEIPT_POLL_MIN
+        while len(receipts) < len(set(tx_hashes)):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                missing = [h.hex() for h in tx_hashes if h not in receipts]
+                raise TransactionTimeout(f"no receipts after {timeout}s: {missing}")
+            time.sleep(min(delay, remaining))
+            delay = min(2 * delay, RECEIPT_POLL_MAX)
+            missing = [tx_hash for tx_hash in tx_hashes if tx_hash not in receipts]
+            _poll_receipts(web3, missing, receipts, block_filter, mined)
+    finally:
+        if block_filter is not None:
+            web3.eth.uninstallFilter(block_filter.filter_id)
+
+    return [receipts[tx_hash] for tx_hash in tx_hashes]
+
+
+def check_receipt(receipt):
     if receipt.status != 1:
         raise TransactionFailed(f"TX status 0: {receipt}")
-
     return receipt
 
 
+def check_tx(web3, tx_hash, timeout=RECEIPT_TIMEOUT):
+    (receipt,) = wait_for_receipts(web3, [tx_hash], timeout=timeout)
+    return check_receipt(receipt)
+
+
+def check_txs(web3, tx_hashes, timeout=RECEIPT_TIMEOUT):
+    receipts = wait_for_receipts(web3, tx_hashes, timeout=timeout)
+    return [check_receipt(receipt) for receipt in receipts]
+
+
+class RequestCounter:
+    """web3 middleware counting JSON-RPC requests per method.
+
+    Add it with `web3.middleware_stack.add(counter.middleware)`.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def middleware(self, make_request, web3):
+        def middleware(method, params):
+            self.counts[method] += 1
+            return make_request(method, params)
+
+        return middleware
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+def connect(url):
+    web3 = Web3(HTTPProvider(url))
+    web3.eth.enable_unaudited_features()
+    # for the POA dev chain
+    web3.middleware_stack.inject(geth_poa_middleware, layer=0)
+    return web3
+
+
+def connect_tester(private_keys=()):
+    """Web3 on an in-process py-evm chain and its `EthereumTester`.
+
+    The accounts of `private_keys` are unlocked, the tester can
+    `take_snapshot` and `revert_to_snapshot`. Needs eth-tester.
+    """
+    if EthereumTester is None:
+        raise RuntimeError("connect_tester needs eth-tester with py-evm")
+    # the default block gas limit is below `GAS`, the genesis parameters are
+    # internal to eth-tester, hence the pinned version in the Pipfile
+    genesis = PyEVMBackend._generate_genesis_params(overrides={"gas_limit": 2 * GAS})
+    tester = EthereumTester(PyEVMBackend(genesis_parameters=genesis))
+    for private_key in private_keys:
+        tester.add_account(private_key)
+    web3 = Web3(EthereumTesterProvider(tester))
+    web3.eth.enable_unaudited_features()
+    return web3, tester
+
+
 def tx_args(web3, sender=None, gas=GAS, **kwargs):
     sender = sender or _default_account(web3)
     return {"from": sender, "gas": GAS, **kwargs}
@@ -123,18 +346,14 @@ def fund_account(web3, guy, account):
 
 
 def load_contract(fname, name):
-    with open("out/contracts.json") as filehandle:
-        contracts = json.load(filehandle)
-    path = os.path.join("contracts", f"{fname}:{name}")
-    return contracts["contracts"][path]
+    return ARTIFACTS.contract(fname, name)
 
 
 def deploy_contract(web3, deployer, fname, name, cls, args=()):
 
     log.debug("deploying contract %s %s with args %s", fname, name, args)
 
-    contract = load_contract(fname, name)
-    Contract = web3.eth.contract(abi=contract["abi"], bytecode=contract["bin"])
+    Contract = ARTIFACTS.factory(web3, fname, name)
 
     deploy_hash = Contract.constructor(*args).transact({"from": deployer, "gas": GAS})
     receipt = check_tx(web3, deploy_hash)
@@ -148,10 +367,50 @@ def deploy_contract(web3, deployer, fname, name, cls, args=()):
     return cls(web3_contract)
 
 
+def attach_contract(web3, fname, name, cls, address):
+    return ARTIFACTS.attach(web3, fname, name, cls, address)
+
+
 def noop_tx(web3):
     return web3.eth.sendTransaction(tx_args(web3, to=_default_account(web3)))
 
 
+class ChainClock:
+    """Advances the chain by blocks, dispute deadlines are block numbers.
+
+    Uses `evm_mine` if the node has it (eth-tester), otherwise sends a burst
+    of no-op transactions and waits for all receipts at once.
+    """
+
+    def __init__(self, web3):
+        self.web3 = web3
+        # unknown until tried
+        self.can_mine = None
+
+    def mine(self, num_blocks):
+        """Return once `num_blocks` more blocks are mined."""
+        target = self.web3.eth.blockNumber + num_blocks
+        if num_blocks > 0 and self.can_mine is not False:
+            try:
+                self.web3.testing.mine(num_blocks)
+                self.can_mine = True
+            except ValueError:
+                log.debug("no evm_mine, falling back to no-op transactions")
+                self.can_mine = False
+        # a node may also mine several transactions into one block
+        missing = target - self.web3.eth.blockNumber
+        while missing > 0:
+            check_txs(self.web3, [noop_tx(self.web3) for _ in range(missing)])
+            missing = target - self.web3.eth.blockNumber
+
+
+# web3 -> whether its node can mine on request, not the clock itself as that
+# references web3
+_can_mine = weakref.WeakKeyDictionary()
+
+
 def wait_blocks(web3, num_blocks):
-    for _ in range(num_blocks):
-        noop_tx(web3)
+    clock = ChainClock(web3)
+    clock.can_mine = _can_mine.get(web3)
+    clock.mine(num_blocks)
+    _can_mine[web3] = clock.can_mine
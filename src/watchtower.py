@@ -0,0 +1,290 @@
+"""Watchtower that answers `trigger`s with the newest co-signed state.
+
+After a `trigger` the counterparty has until the deadline to `update` the
+channel with its newest state before anyone can `finalize`. The watchtower
+keeps that state for every watched channel, polls `EventPending` and submits
+the updates ordered by deadline. All updates of a poll are sent before their
+receipts are awaited, so a burst of triggers costs one round of waiting.
+
+Channels are sharded by `channel_id % num_shards`, `ShardedWatchtower` runs
+one `Watchtower` per worker process.
+"""
+import heapq
+import logging
+import multiprocessing
+import queue
+import time
+from collections import namedtuple
+
+from .contracts.SpritesRegistry import SpritesRegistry
+from .events import get_events
+from .exceptions import BadSignature, TransactionFailed, TransactionTimeout
+from .util import GAS, attach_contract, check_receipt, connect, wait_for_receipts
+
+log = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.1
+
+Watch = namedtuple("Watch", "signed_state submitter")
+Reaction = namedtuple(
+    "Reaction", "channel_id seconds event_block mined_block submitted_before_deadline"
+)
+
+
+def shard_of(channel_id, num_shards):
+    return channel_id % num_shards
+
+
+class Watchtower:
+    """Watches the channels of one shard.
+
+    `signed_state` must be signed by the counterparty of `submitter`, the
+    player whose (unlocked) account sends the update. A newer state watched
+    during a dispute is submitted as well.
+    """
+
+    def __init__(
+        self, web3, registry, from_block=None, shard=0, num_shards=1, gas=GAS
+    ):
+        self.web3 = web3
+        self.registry = registry
+        self.shard = shard
+        self.num_shards = num_shards
+        self.gas = gas
+        self.synced_block = (
+            web3.eth.blockNumber if from_block is None else from_block - 1
+        )
+        self.watches = {}
+        self.best_rounds = {}
+        # channel id -> (left, right) address
+        self.players = {}
+        # (deadline, channel_id, seen_at, event_block)
+        self.pending = []
+        # channel id -> its entry in `pending`, other entries are stale
+        self.queued = {}
+        # latest trigger of each watched channel, by channel id
+        self.disputes = {}
+        # triggers of channels that were not watched yet, by channel id
+        self.unwatched = {}
+        self.reactions = []
+
+    def is_mine(self, channel_id):
+        return shard_of(channel_id, self.num_shards) == self.shard
+
+    def counterparty(self, channel_id, submitter):
+        players = self.players.get(channel_id)
+        if players is None:
+            players = self.registry.getPlayers(channel_id).call()
+            self.players[channel_id] = players
+        if submitter not in players:
+            raise BadSignature(f"{submitter} is not a player of channel {channel_id}")
+        left, right = players
+        return right if submitter == left else left
+
+    def watch(self, signed_state, submitter):
+        channel_id = signed_state.channel_id
+        if not self.is_mine(channel_id):
+            raise ValueError(f"channel {channel_id} not in shard")
+        signed_state.verify_signature(self.counterparty(channel_id, submitter))
+        current = self.watches.get(channel_id)
+        if current is not None and signed_state.round <= current.signed_state.round:
+            return
+        self.watches[channel_id] = Watch(signed_state, submitter)
+        if channel_id in self.unwatched:
+            self.disputes[channel_id] = self.unwatched.pop(channel_id)
+            self._queue(self.disputes[channel_id])
+        elif channel_id in self.disputes:
+            # answered with an older state, submit the newer one unless the
+            # deadline has passed
+            entry = self.disputes[channel_id]
+            if entry[0] >= self.synced_block:
+                self._queue(entry)
+
+    def _queue(self, entry):
+        channel_id = entry[1]
+        if self.queued.get(channel_id) == entry:
+            return
+        self.queued[channel_id] = entry
+        heapq.heappush(self.pending, entry)
+
+    def poll(self):
+        """Queue pending channels from new events, return their number."""
+        to_block = self.web3.eth.blockNumber
+        if to_block <= self.synced_block:
+            return 0
+        events = get_events(
+            self.web3,
+            self.registry._contract.address,
+            self.synced_block + 1,
+            to_block,
+            ["EventPending", "EventUpdate"],
+        )
+        seen_at = time.monotonic()
+        num_pending = 0
+        for event in events:
+            if not self.is_mine(event.channel_id):
+                continue
+            if event.name == "EventUpdate":
+                self.best_rounds[event.channel_id] = event.args[0]
+            else:
+                deadline = event.args[1]
+                entry = (deadline, event.channel_id, seen_at, event.block_number)
+                if event.channel_id in self.watches:
+                    self.disputes[event.channel_id] = entry
+                    self._queue(entry)
+                    num_pending += 1
+                else:
+                    self.unwatched[event.channel_id] = entry
+        self.synced_block = to_block
+        return num_pending
+
+    def _needs_update(self, channel_id):
+        watch = self.watches[channel_id]
+        best_round = self.best_rounds.get(channel_id, -1)
+        return watch.signed_state.round > best_round
+
+    def respond(self):
+        """Submit updates for all queued channels, earliest deadline first.
+
+        If sending or waiting fails, the channels are queued again, updates
+        that got mined meanwhile are skipped on the next try.
+        """
+        popped = []
+        submitted = []
+        try:
+            while self.pending:
+                entry = heapq.heappop(self.pending)
+                deadline, channel_id, seen_at, event_block = entry
+                if self.queued.get(channel_id) != entry:
+                    continue
+                del self.queued[channel_id]
+                if not self._needs_update(channel_id):
+                    continue
+                popped.append(entry)
+                watch = self.watches[channel_id]
+                args = watch.signed_state.state_update_arguments()
+                tx_hash = self.registry.update(*args).transact(
+                    {"from": watch.submitter, "gas": self.gas}
+                )
+                seconds = time.monotonic() - seen_at
+                submitted.append((tx_hash, channel_id, seconds, event_block, deadline))
+
+            if not submitted:
+                return []
+            receipts = wait_for_receipts(
+                self.web3, [tx_hash for tx_hash, *_ in submitted]
+            )
+        except (TransactionTimeout, ValueError, OSError):
+            for entry in popped:
+                self._queue(entry)
+            raise
+        reactions = []
+        for receipt, (_, channel_id, seconds, event_block, deadline) in zip(
+            receipts, submitted
+        ):
+            try:
+                check_receipt(receipt)
+            except TransactionFailed:
+                log.error("update of channel %s failed", channel_id)
+                continue
+            mined_block = receipt.blockNumber
+            in_time = mined_block <= deadline
+            reactions.append(
+                Reaction(channel_id, seconds, event_block, mined_block, in_time)
+            )
+        self.reactions.extend(reactions)
+        return reactions
+
+    def step(self):
+        """Poll and respond once, return the reactions.
+
+        Failed or timed out transactions and node errors (`ValueError` from
+        JSON-RPC, `OSError` from the connection) are logged, so that one of
+        them doesn't stop the watchtower.
+        """
+        try:
+            self.poll()
+            return self.respond()
+        except (TransactionFailed, TransactionTimeout, ValueError, OSError):
+            log.exception("watchtower of shard %s failed to respond", self.shard)
+            return []
+
+    def run(self, stop, poll_interval=POLL_INTERVAL):
+        """Poll and respond until `stop()` returns True."""
+        while not stop():
+            if not self.step():
+                time.sleep(poll_interval)
+
+
+def _serve(url, registry_address, shard, num_shards, watches, reactions, stop):
+    web3 = connect(url)
+    registry = attach_contract(
+        web3,
+        "SpritesRegistry.sol",
+        "SpritesRegistry",
+        SpritesRegistry,
+        registry_address,
+    )
+    tower = Watchtower(web3, registry, shard=shard, num_shards=num_shards)
+    # signal that the worker is watching
+    reactions.put(None)
+
+    while not stop.is_set():
+        try:
+            while True:
+                signed_state, submitter = watches.get_nowait()
+                try:
+                    tower.watch(signed_state, submitter)
+                except BadSignature:
+                    log.exception("not watching channel %s", signed_state.channel_id)
+        except queue.Empty:
+            pass
+        responded = tower.step()
+        for reaction in responded:
+            reactions.put(reaction)
+        if not responded:
+            time.sleep(POLL_INTERVAL)
+
+
+class ShardedWatchtower:
+    """One watchtower process per shard, each with its own connection."""
+
+    def __init__(self, url, registry_address, num_shards):
+        self.num_shards = num_shards
+        self.stop_event = multiprocessing.Event()
+        self.reaction_queue = multiprocessing.Queue()
+        self.watch_queues = [multiprocessing.Queue() for _ in range(num_shards)]
+        self.processes = [
+            multiprocessing.Process(
+                target=_serve,
+                args=(
+                    url,
+                    registry_address,
+                    shard,
+                    num_shards,
+                    self.watch_queues[shard],
+                    self.reaction_queue,
+                    self.stop_event,
+                ),
+                daemon=True,
+            )
+            for shard in range(num_shards)
+        ]
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        for _ in self.processes:
+            self.reaction_queue.get()
+
+    def watch(self, signed_state, submitter):
+        shard = shard_of(signed_state.channel_id, self.num_shards)
+        self.watch_queues[shard].put((signed_state, submitter))
+
+    def reactions(self, count, timeout=None):
+        return [self.reaction_queue.get(timeout=timeout) for _ in range(count)]
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join()
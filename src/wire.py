@@ -0,0 +1,196 @@
+"""Fixed-width binary encoding of `SignedState`.
+
+Layout (838 bytes with 4 payment slots, all integers big endian):
+
+====== ===== ===========================================================
+offset bytes
+====== ===== ===========================================================
+0      1     version
+1      704   signed message words, same as `util.pack_message`
+705    64    deposits
+769    4     command per payment slot, 0 for None else index in
+             `COMMANDS` + 1
+773    65    signature: v (1 byte), r, s
+====== ===== ===========================================================
+
+`SignedStateView` reads fields straight from a buffer, e. g. a relay can
+check the channel id and round of a message without decoding all of it.
+"""
+import functools
+
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+
+from .channel import Payment, SignedState
+from .util import (
+    COMMANDS,
+    MAX_PAYMENTS,
+    MESSAGE_LENGTH,
+    MESSAGE_PREFIX,
+    WORD_SIZE,
+    write_int,
+    write_message,
+)
+
+# 2: payment slots
+VERSION = 2
+
+MESSAGE_OFFSET = 1
+DEPOSITS_OFFSET = MESSAGE_OFFSET + MESSAGE_LENGTH
+COMMAND_OFFSET = DEPOSITS_OFFSET + 2 * WORD_SIZE
+SIG_OFFSET = COMMAND_OFFSET + MAX_PAYMENTS
+R_OFFSET = SIG_OFFSET + 1
+S_OFFSET = R_OFFSET + WORD_SIZE
+SIZE = S_OFFSET + WORD_SIZE
+
+# word indices within the message, each payment field has MAX_PAYMENTS words
+CHANNEL_ID, CREDITS, WITHDRAWALS, ROUND = 0, 1, 3, 5
+PREIMAGE_HASHES = 6
+RECIPIENTS = PREIMAGE_HASHES + MAX_PAYMENTS
+AMOUNTS = RECIPIENTS + MAX_PAYMENTS
+EXPIRIES = AMOUNTS + MAX_PAYMENTS
+ADDRESS_SIZE = 20
+
+# checksumming hashes the address, the same few recipients recur a lot
+_checksum_address = functools.lru_cache(maxsize=1024)(to_checksum_address)
+
+
+def read_word(buffer, offset):
+    end = offset + WORD_SIZE
+    return int.from_bytes(buffer[offset:end], "big")
+
+
+def to_signed(word):
+    return word - (1 << 256) if word >> 255 else word
+
+
+def _message_word(buffer, index):
+    return read_word(buffer, MESSAGE_OFFSET + index * WORD_SIZE)
+
+
+def encode_into(buffer, offset, signed_state):
+    """Write the encoding of `signed_state` into `buffer` at `offset`."""
+    buffer[offset] = VERSION
+    write_message(buffer, offset + MESSAGE_OFFSET, *signed_state.message_inputs())
+    deposits_offset = offset + DEPOSITS_OFFSET
+    write_int(buffer, deposits_offset, signed_state.deposits[0])
+    write_int(buffer, deposits_offset + WORD_SIZE, signed_state.deposits[1])
+    command_offset = offset + COMMAND_OFFSET
+    for slot, payment in enumerate(signed_state.payments):
+        command = payment.command
+        buffer[command_offset + slot] = (
+            0 if command is None else COMMANDS.index(command) + 1
+        )
+    v, r, s = signed_state.sig
+    buffer[offset + SIG_OFFSET] = v
+    r_start = offset + R_OFFSET
+    s_start = offset + S_OFFSET
+    s_end = s_start + WORD_SIZE
+    buffer[r_start:s_start] = r.to_bytes(WORD_SIZE, "big")
+    buffer[s_start:s_end] = s.to_bytes(WORD_SIZE, "big")
+
+
+def encode(signed_state):
+    buffer = bytearray(SIZE)
+    encode_into(buffer, 0, signed_state)
+    return bytes(buffer)
+
+
+def decode(buffer):
+    return SignedStateView(buffer).to_signed_state()
+
+
+class SignedStateView:
+    """Lazy, read-only access to an encoded `SignedState`.
+
+    Nothing is copied on construction, each property decodes only its field.
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if len(view) != SIZE:
+            raise ValueError(f"expected {SIZE} bytes, got {len(view)}")
+        if view[0] != VERSION:
+            raise ValueError(f"unsupported version {view[0]}")
+        self._buffer = view
+
+    @property
+    def channel_id(self):
+        return _message_word(self._buffer, CHANNEL_ID)
+
+    @property
+    def round(self):
+        return to_signed(_message_word(self._buffer, ROUND))
+
+    @property
+    def credits(self):
+        return (
+            to_signed(_message_word(self._buffer, CREDITS)),
+            to_signed(_message_word(self._buffer, CREDITS + 1)),
+        )
+
+    @property
+    def withdrawals(self):
+        return (
+            _message_word(self._buffer, WITHDRAWALS),
+            _message_word(self._buffer, WITHDRAWALS + 1),
+        )
+
+    @property
+    def deposits(self):
+        return (
+            read_word(self._buffer, DEPOSITS_OFFSET),
+            read_word(self._buffer, DEPOSITS_OFFSET + WORD_SIZE),
+        )
+
+    def payment(self, slot):
+        buffer = self._buffer
+        hash_start = MESSAGE_OFFSET + (PREIMAGE_HASHES + slot) * WORD_SIZE
+        hash_end = hash_start + WORD_SIZE
+        # addresses are right aligned in their word
+        address_end = MESSAGE_OFFSET + (RECIPIENTS + slot + 1) * WORD_SIZE
+        address_start = address_end - ADDRESS_SIZE
+        command_index = buffer[COMMAND_OFFSET + slot]
+        if command_index > len(COMMANDS):
+            raise ValueError(f"unknown command {command_index} in slot {slot}")
+        return Payment.trusted(
+            buffer[hash_start:hash_end].tobytes(),
+            _checksum_address(buffer[address_start:address_end].tobytes()),
+            _message_word(buffer, AMOUNTS + slot),
+            _message_word(buffer, EXPIRIES + slot),
+            COMMANDS[command_index - 1] if command_index else None,
+        )
+
+    @property
+    def payments(self):
+        return tuple(self.payment(slot) for slot in range(MAX_PAYMENTS))
+
+    @property
+    def sig(self):
+        buffer = self._buffer
+        return (
+            buffer[SIG_OFFSET],
+            read_word(buffer, R_OFFSET),
+            read_word(buffer, S_OFFSET),
+        )
+
+    def message(self):
+        """The signed message words, a view into the buffer."""
+        return self._buffer[MESSAGE_OFFSET:DEPOSITS_OFFSET]
+
+    def message_hash(self):
+        """Same as `ChannelState.message_hash` without decoding the state."""
+        return HexBytes(keccak(MESSAGE_PREFIX + self.message()))
+
+    def to_signed_state(self):
+        return SignedState.trusted(
+            self.channel_id,
+            self.deposits,
+            self.credits,
+            self.withdrawals,
+            self.round,
+            self.payments,
+            self.sig,
+        )